@@ -8,11 +8,16 @@ import asyncio
 import os
 import httpx
 from pydantic import BaseModel
+from backend.bot import autoplay, prefetch, resolve_window, session_store
 from backend.bot import session_queue as sq
+from backend.utils import autocomplete, cooccurrence, lastfm, rate_limit, track_resolver, track_search, track_store
 
 router = APIRouter(prefix="/bot", tags=["Bot"])
 logger = logging.getLogger(__name__)
 
+# Session queue tracks per player that /players lists when no limit is given
+_PLAYERS_QUEUE_LIMIT = 50
+
 
 # Global reusable client for the image proxy to prevent SSL context recreation blocking the event loop
 _proxy_client = httpx.AsyncClient(timeout=10, follow_redirects=True)
@@ -109,6 +114,12 @@ async def get_bot_status():
                     node_info["stats"] = None
                 nodes.append(node_info)
 
+        # ── Voice module (shared Vosk model / recognizer pool) ───────────────
+        voice = None
+        if bot.listener_bot:
+            # In-process ListenerBot or the worker-process proxy
+            voice = await bot.listener_bot.voice_stats()
+
         total_players = len(bot.voice_clients)
         raw_latency   = bot.latency
         latency_ms    = round(raw_latency * 1000, 2) if raw_latency == raw_latency else None  # NaN check
@@ -122,6 +133,19 @@ async def get_bot_status():
             "users":     len(bot.users),
             "players":   total_players,
             "nodes":     nodes,
+            "voice":     voice,
+            "searchCache": track_search.stats(),
+            "autocomplete": autocomplete.stats(),
+            "resolvedTracks": track_store.stats(),
+            "trackRegistry": sq.registry_stats(),
+            "sessionSnapshots": session_store.stats(),
+            "lazyWindows": resolve_window.stats(),
+            "prefetch": prefetch.stats(),
+            "autoplay": autoplay.stats(),
+            "lastfm": lastfm.stats(),
+            "cooccurrence": cooccurrence.stats(),
+            "resolveStrategies": track_resolver.stats(),
+            "searchRateLimits": rate_limit.stats(),
             "system": {
                 "cpu_pct":      cpu_pct,
                 "ram_used_gb":  round(vm.used  / 1024**3, 1),
@@ -137,8 +161,14 @@ async def get_bot_status():
         return {"error": str(e), "botOnline": False}
 
 @router.get("/players")
-async def get_players():
-    # List all active players
+async def get_players(offset: Optional[int] = None, limit: Optional[int] = None, since_version: Optional[int] = None):
+    # List all active players.
+    # offset/limit/since_version apply to each player's session queue, as in
+    # /session-queue; versions are global, so pass the highest queueVersion seen.
+    # Without a limit only a window from the current track is listed: this is
+    # polled every second, and a full list means serialising the whole queue.
+    if limit is None:
+        limit = _PLAYERS_QUEUE_LIMIT
     players_data = []
     for vc in bot.voice_clients:
         if isinstance(vc, wavelink.Player):
@@ -164,7 +194,8 @@ async def get_players():
 
                 # Build session-aware queue for the UI (session queue is source of truth)
                 session = sq.get(vc.guild.id)
-                session_data = session.to_api()
+                delta = session.delta(since_version) if since_version is not None else None
+                session_data = delta if delta is not None else session.to_api(offset, limit)
 
                 players_data.append({
                     "guildId": str(vc.guild.id),
@@ -177,8 +208,14 @@ async def get_players():
                     "position": vc.position,
                     "volume": vc.volume,
                     "current": current,
-                    # Return session queue so the frontend always sees the full list
-                    "queue": session_data["tracks"],
+                    # Session queue (or the requested window of it) unless only ops were asked for
+                    **({"queueOps": delta["ops"]} if delta is not None else {
+                        "queue": session_data["tracks"],
+                        "queueOffset": session_data["offset"],
+                        "queueReset": since_version is not None,
+                    }),
+                    "queueTotal": session_data["total"],
+                    "queueVersion": session_data["version"],
                     "session_current_index": session_data["current_index"],
                     "settings": {
                         "shuffleEnabled": session_data.get("shuffle_enabled", False),
@@ -197,10 +234,22 @@ async def get_players():
 # ---------------------------------------------------------------------------
 
 @router.get("/session-queue")
-async def get_session_queue(guild_id: str):
-    """Returns the in-memory session queue for a guild."""
+async def get_session_queue(guild_id: str, offset: Optional[int] = None, limit: Optional[int] = None,
+                            since_version: Optional[int] = None):
+    """Returns the in-memory session queue for a guild.
+
+    offset/limit return a window of the track list (by default starting at
+    the current track). since_version returns only the ops applied after that
+    version; if they are no longer kept, the window comes back with
+    "reset": true instead.
+    """
     session = sq.get(int(guild_id))
-    return session.to_api()
+    if since_version is not None:
+        delta = session.delta(since_version)
+        if delta is not None:
+            return delta
+        return {**session.to_api(offset, limit), "reset": True}
+    return session.to_api(offset, limit)
 
 @router.get("/search")
 async def search_tracks(query: str, guildId: str):
@@ -209,7 +258,7 @@ async def search_tracks(query: str, guildId: str):
             return []
             
         # Wavelink search
-        tracks = await wavelink.Playable.search(query)
+        tracks = await track_search.search(query)
         if not tracks:
             return []
             
@@ -265,7 +314,7 @@ async def control_player(req: ControlRequest):
                     if not has_prefix and not is_url:
                         search_query = f"ytmsearch:{search_query}"
 
-                    tracks = await wavelink.Playable.search(search_query)
+                    tracks = await track_search.search(search_query)
                 except Exception as search_err:
                     logger.error(f"Wavelink search failed: {search_err}")
                     raise HTTPException(status_code=400, detail=f"Failed to load track: {str(search_err)}")
@@ -295,7 +344,7 @@ async def control_player(req: ControlRequest):
                     elif session2.current:
                         # Fallback if cog not loaded
                         search_q = f"ytmsearch:{session2.current.title} {session2.current.author}"
-                        found = await wavelink.Playable.search(search_q)
+                        found = await track_search.search(search_q)
                         if found:
                             await player.play(found[0])
                 
@@ -328,11 +377,10 @@ async def control_player(req: ControlRequest):
         elif req.action == "remove":
             session = sq.get(guild_id)
             if req.index is not None and 0 <= req.index < len(session.tracks):
-                session.tracks.pop(req.index)
-                # Adjust current_index if needed
-                if req.index < session.current_index:
-                    session.current_index -= 1
-                elif req.index == session.current_index:
+                was_current = req.index == session.current_index
+                # Keeps current_index on the same entry
+                session.remove_at(req.index)
+                if was_current:
                     # Removed the currently playing track — skip to next
                     next_track = session.current  # after pop, session.current is new track at same index
                     music_cog = bot.get_cog("Music")
@@ -344,10 +392,8 @@ async def control_player(req: ControlRequest):
         elif req.action == "playNext":
             session = sq.get(guild_id)
             if req.index is not None and 0 <= req.index < len(session.tracks):
-                track = session.tracks.pop(req.index)
-                insert_pos = session.current_index + 1
-                session.tracks.insert(insert_pos, track)
-                # Don't change current_index — next natural advance will hit insert_pos
+                # Don't change the current track — next natural advance will hit it
+                session.move_to_next(req.index)
 
         elif req.action == "previous":
             session = sq.get(guild_id)
@@ -382,6 +428,8 @@ async def control_player(req: ControlRequest):
                     session.unshuffle()
                 else:
                     session.shuffle()
+            resolve_window.kick(guild_id)
+            prefetch.schedule(guild_id)
 
         elif req.action == "repeat":
             session = sq.get(guild_id)
@@ -535,6 +583,8 @@ async def play_from_web(req: WebPlayRequest):
             queue_was_empty = (len(session.tracks) == 0)
             start_index = session.current_index
             
+            playlist_name = playlist.name
+
             async def background_load_playlist(playlist_tracks, user_id, guild_id, was_playing, queue_was_empty, start_index):
                 # Background task to load tracks without blocking the main thread
                 # We yield to the event loop frequently using asyncio.sleep
@@ -542,53 +592,65 @@ async def play_from_web(req: WebPlayRequest):
                 first_wl_track = None
                 
                 try:
-                    for i, t_db in enumerate(playlist_tracks):
-                        data = t_db.track_data
-                        info = data.get("info", data)
-                        title = info.get("title")
-                        author = info.get("author") or info.get("artist")
-                        uri = info.get("uri")
-                        
+                    async def report_progress(resolved, failed, total, lazy=False):
+                        # Dashboard shows load progress over the guild websocket
+                        from backend.api.websocket.manager import manager
+                        await manager.broadcast(str(guild_id), {
+                            "event": "PLAYLIST_LOAD_PROGRESS",
+                            "playlist": playlist_name,
+                            "resolved": resolved,
+                            "failed": failed,
+                            "total": total,
+                            "done": lazy or resolved + failed >= total,
+                            "lazy": lazy,
+                        })
+
+                    track_datas = [t_db.track_data for t_db in playlist_tracks if t_db.track_data]
+
+                    music_cog = bot.get_cog("Music")
+                    if music_cog and resolve_window.should_defer(len(track_datas)):
+                        # Long playlist: queue placeholders now and only resolve
+                        # a window of tracks ahead of playback
+                        first_idx = resolve_window.add_placeholders(guild_id, track_datas)
+                        if not was_playing and queue_was_empty:
+                            session.set_index(first_idx)
+                            player.queue.clear()
+                            await music_cog._play_session_track(player, session.current)
+                        else:
+                            resolve_window.kick(guild_id)
+                        await report_progress(0, 0, len(track_datas), lazy=True)
+                        logger.info(f"Queued {len(track_datas)} lazy tracks for guild {guild_id}.")
+                        return
+
+                    # Stored resolutions are rebuilt without a search; misses are searched
+                    # concurrently but still arrive here in playlist order
+                    async for i, wl_track in track_store.resolve_tracks(track_datas, on_progress=report_progress):
+                        if wl_track is None:
+                            continue
                         try:
-                            # Prioritize exact URL to skip expensive YouTube Search if possible
-                            # BUT force text search for YouTube to avoid Lavalink IP blocks
-                            if uri and "youtube.com" not in uri and "youtu.be" not in uri:
-                                search_q = uri
-                            elif title:
-                                search_q = f"ytmsearch:{title} {author}" if author else f"ytmsearch:{title}"
-                            else:
-                                continue
-                                
-                            found = await wavelink.Playable.search(search_q)
-                            if found:
-                                wl_track = found[0] if isinstance(found, list) else found.tracks[0]
-                                wl_track.requester = int(user_id)
-                                
-                                # Add to session
-                                sq_track = sq.from_wavelink_track(wl_track)
-                                sq_idx = session.add(sq_track)
+                            wl_track.requester = int(user_id)
+                            
+                            # Add to session
+                            sq_track = sq.from_wavelink_track(wl_track)
+                            sq_idx = session.add(sq_track)
+                            
+                            # If this is the very first track and we weren't playing, start it immediately
+                            if count == 0 and not was_playing and queue_was_empty:
+                                first_wl_track = (wl_track, sq_idx)
+                                start_index = sq_idx
                                 
-                                # If this is the very first track and we weren't playing, start it immediately
-                                if count == 0 and not was_playing and queue_was_empty:
-                                    first_wl_track = (wl_track, sq_idx)
-                                    start_index = sq_idx
+                                # Start playback
+                                session.set_index(start_index)
+                                player.queue.clear()
+                                music_cog = bot.get_cog("Music")
+                                if music_cog:
+                                    await music_cog._play_session_track(player, session.current)
+                                else:
+                                    await player.play(wl_track)
                                     
-                                    # Start playback
-                                    session.set_index(start_index)
-                                    player.queue.clear()
-                                    music_cog = bot.get_cog("Music")
-                                    if music_cog:
-                                        await music_cog._play_session_track(player, session.current)
-                                    else:
-                                        await player.play(wl_track)
-                                        
-                                count += 1
+                            count += 1
                         except Exception as e:
-                            logger.warning(f"Failed to load track '{title}': {e}")
-                            
-                        # Yield to event loop nicely after every single track lookup
-                        # This prevents the bot from "hanging" out waiting for lavalink
-                        await asyncio.sleep(0.05)
+                            logger.warning(f"Failed to load track '{wl_track.title}': {e}")
                         
                     logger.info(f"Background playlist load finished for guild {guild_id}. Queued {count} tracks.")
                 except Exception as e:
@@ -607,7 +669,7 @@ async def play_from_web(req: WebPlayRequest):
             query = req.track_query.strip()
             if not query.startswith(("http://", "https://", "ytsearch:", "ytmsearch:", "scsearch:")):
                 query = f"ytmsearch:{query}"
-            tracks = await wavelink.Playable.search(query)
+            tracks = await track_search.search(query)
             if not tracks:
                 raise HTTPException(status_code=404, detail="Track not found")
             wl_track = tracks[0] if isinstance(tracks, list) else tracks.tracks[0]
@@ -7,6 +7,7 @@ from backend.bot.core.bot import bot
 from backend.api.schemas.music import PlayRequest, MusicStatus, VolumeRequest, SeekRequest
 from backend.utils.youtube import extract_info
 from backend.bot import session_queue as sq
+from backend.utils import track_search
 from typing import cast
 
 router = APIRouter(prefix="/music", tags=["Music"])
@@ -48,7 +49,7 @@ async def play_music(request: PlayRequest, current_user: User = Depends(get_curr
         if search_query.startswith("ytsearch:") and search_query[len("ytsearch:"):].startswith("http"):
             search_query = search_query[len("ytsearch:"):].strip()
 
-        tracks = await wavelink.Playable.search(search_query)
+        tracks = await track_search.search(search_query)
         if not tracks:
             logger.warning(f"No tracks found for query: {search_query}")
             raise HTTPException(status_code=404, detail="No tracks found")
@@ -80,7 +81,7 @@ async def play_music(request: PlayRequest, current_user: User = Depends(get_curr
                 await music_cog._play_session_track(player, session2.current)
             elif session2.current:
                 search_q = f"ytmsearch:{session2.current.title} {session2.current.author}"
-                found = await wavelink.Playable.search(search_q)
+                found = await track_search.search(search_q)
                 if found:
                     wl_track = found[0] if isinstance(found, list) else found.tracks[0]
                     await player.play(wl_track)
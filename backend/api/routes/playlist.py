@@ -5,6 +5,7 @@ from sqlalchemy import select, delete
 from sqlalchemy.orm import selectinload
 from backend.database.core.db import get_db
 from backend.database.models.models import Playlist, PlaylistTrack, User
+from backend.utils import cooccurrence
 from pydantic import BaseModel
 from typing import List, Optional, Any
 from datetime import datetime
@@ -154,6 +155,8 @@ async def remove_track(playlist_id: int, track_db_id: int, db: AsyncSession = De
     stmt = delete(PlaylistTrack).where(PlaylistTrack.id == track_db_id, PlaylistTrack.playlist_id == playlist_id)
     result = await db.execute(stmt)
     await db.commit()
+    # Bulk delete bypasses the ORM events the recommender listens to
+    cooccurrence.mark_dirty(playlist_id)
     if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Track not found in playlist")
     return {"success": True}
@@ -0,0 +1,274 @@
+"""
+autoplay.py — Speculative autoplay: have the next recommendation ready early.
+
+Autoplay used to start thinking only once the queue had run out: ask
+Last.fm for similar tracks, then try up to three Lavalink searches per
+candidate in turn before anything played. Now, while the last queued track
+is playing, each guild's AutoplayBuffer works out and resolves the next
+AUTOPLAY_BUFFER recommendations in the background (each seeded from the one
+before, so consecutive autoplay picks keep drifting naturally). When the
+track ends, on_wavelink_track_end takes a ready Playable and plays it like
+any prefetched track.
+
+The buffer is rebuilt if the queue's last track changes (the user queued
+something else) and dropped when autoplay is switched off.
+
+Recommendation sources, in order:
+  1. Last.fm similar tracks (needs LASTFM_API_KEY; cached in the database,
+     see backend.utils.lastfm), each candidate resolved by racing YouTube /
+     YouTube Music searches. Once every direct neighbour has been played,
+     two-hop neighbours from the cached graph are used.
+  2. Tracks that sit near the seed in users' own playlists (see
+     backend.utils.cooccurrence); no external call when the pick has a
+     stored resolution.
+  3. A YouTube Music "mix" / "top tracks" search for the seed's artist.
+
+Env vars:
+    LASTFM_API_KEY    Enables Last.fm recommendations (optional)
+    AUTOPLAY_BUFFER   Recommendations kept ready per guild; 0 = resolve on demand (default: 2)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import re
+from collections import deque
+from typing import Optional
+
+import wavelink
+
+from backend.bot import session_queue as sq
+from backend.utils import cooccurrence, lastfm, track_resolver, track_search, track_store
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+
+def _tracks(found) -> list[wavelink.Playable]:
+    if not found:
+        return []
+    return list(found.tracks if isinstance(found, wavelink.Playlist) else found)
+
+
+def clean(title: str, author: str) -> tuple[str, str]:
+    """Strip "(Official Video)", "[Remix]", "VEVO" etc. for better Last.fm matching."""
+    clean_title = re.sub(r'[\[\(].*?[\]\)]|-.*|Official.*|Video.*|Audio.*|Lyrics.*', '', title).strip()
+    clean_author = re.sub(r'VEVO|Official|Topic', '', author, flags=re.IGNORECASE).strip()
+    return clean_title, clean_author
+
+
+# ---------------------------------------------------------------------------
+# Recommendation sources
+# ---------------------------------------------------------------------------
+
+async def _resolve_first(candidates: list[dict], exclude_titles: set[str]) -> Optional[wavelink.Playable]:
+    for candidate in candidates:
+        sim_title, sim_artist = candidate["title"], candidate["artist"]
+        if sim_title.lower() in exclude_titles:
+            continue
+        # Last.fm returns very specific artist names that sometimes trip up YouTube search,
+        # so race standard YouTube (usually best for exact title+artist) against YouTube Music.
+        strategy, found = await track_resolver.race([
+            ("ytsearch", f"ytsearch:{sim_title} {sim_artist}"),
+            ("ytmsearch", f"ytmsearch:{sim_title} {sim_artist}"),
+            ("ytsearch_audio", f"ytsearch:{sim_title} Official Audio"),
+        ])
+        tracks = _tracks(found)
+        if tracks:
+            logger.info(f"Last.fm chose: {sim_title} by {sim_artist} (Found via {strategy})")
+            return tracks[0]
+        # Don't try it again on the multi-hop pass
+        exclude_titles.add(sim_title.lower())
+    return None
+
+
+async def _from_lastfm(title: str, author: str, exclude_titles: set[str]) -> Optional[wavelink.Playable]:
+    exclude_titles = set(exclude_titles)
+    similar = await lastfm.similar(title, author)
+    if not similar:
+        return None
+    random.shuffle(similar)  # Mix them up
+    track = await _resolve_first(similar, exclude_titles)
+    if track is None:
+        # Every direct neighbour is already queued (long autoplay runs):
+        # walk the cached similarity graph a hop further, no extra API calls
+        track = await _resolve_first(await lastfm.neighbours(title, author, hops=2), exclude_titles)
+    return track
+
+
+async def _from_mix(title: str, author: str, exclude_uris: set[str]) -> Optional[wavelink.Playable]:
+    found = await track_search.search(f"ytmsearch:{title} {author} mix")
+    if not found:
+        found = await track_search.search(f"ytmsearch:{author} top tracks")
+    track_list = _tracks(found)
+    if not track_list:
+        return None
+    choices = track_list[1:12] if len(track_list) > 1 else track_list
+    valid_choices = [t for t in choices if t.uri not in exclude_uris] or choices
+    return random.choice(valid_choices)
+
+
+async def _from_playlists(title: str, author: str, exclude_titles: set[str]) -> Optional[wavelink.Playable]:
+    # Try the raw metadata first: playlist tracks are stored as played
+    data = await cooccurrence.recommend(title, author, exclude_titles)
+    if data is None:
+        data = await cooccurrence.recommend(*clean(title, author), exclude_titles)
+    if data is None:
+        return None
+    # Usually a stored resolution, so no Lavalink search either
+    track = None
+    async for _index, track in track_store.resolve_tracks([data], concurrency=1):
+        pass
+    if track is not None:
+        logger.info(f"Playlist co-occurrence chose: {track.title}")
+    return track
+
+
+async def recommend(title: str, author: str, exclude_titles: set[str], exclude_uris: set[str]) -> Optional[wavelink.Playable]:
+    """One resolved recommendation following (title, author), or None."""
+    clean_title, clean_author = clean(title, author)
+    try:
+        track = await _from_lastfm(clean_title, clean_author, exclude_titles)
+        if track is None:
+            track = await _from_playlists(title, author, exclude_titles)
+        if track is None:
+            # Fallback to Mix-based querying if Last.fm fails or is unavailable
+            track = await _from_mix(clean_title, clean_author, exclude_uris)
+        return track
+    except Exception as e:
+        logger.error(f"Autoplay failed to find next track: {e}")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Per-guild buffer
+# ---------------------------------------------------------------------------
+
+class AutoplayBuffer:
+    def __init__(self, guild_id: int, size: int):
+        self.guild_id = guild_id
+        self.size = max(0, size)
+        self.ready: deque[wavelink.Playable] = deque()
+        # URI of the track the buffered recommendations follow on from
+        self._seed_uri: Optional[str] = None
+        self._seed: tuple[str, str] = ("", "")
+        self._task: Optional[asyncio.Task] = None
+        self._added = asyncio.Event()
+
+        self.buffered = 0
+        self.served = 0
+        self.on_demand = 0
+        self.flushed = 0
+
+    def prepare(self):
+        """Top the buffer up if the session is about to need autoplay."""
+        session = sq.get(self.guild_id)
+        if not session.autoplay_enabled or not session.tracks:
+            self.flush()
+            return
+        if session.peek_next() is not None:
+            # Still queued tracks ahead; nothing to predict yet
+            return
+        last = session.tracks[-1]
+        if last.uri != self._seed_uri:
+            self.flush()
+            self._seed_uri = last.uri
+            self._seed = (last.title, last.author)
+        if len(self.ready) >= self.size or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.create_task(self._fill())
+
+    def _excluded(self) -> tuple[set[str], set[str]]:
+        session = sq.get(self.guild_id)
+        titles = {t.title.lower() for t in session.tracks} | {t.title.lower() for t in self.ready}
+        uris = {t.uri for t in session.tracks} | {t.uri for t in self.ready}
+        return titles, uris
+
+    async def _fill(self):
+        while len(self.ready) < self.size:
+            title, author = (self.ready[-1].title, self.ready[-1].author) if self.ready else self._seed
+            track = await recommend(title, author, *self._excluded())
+            if track is None:
+                break
+            self.ready.append(track)
+            self.buffered += 1
+            self._added.set()
+
+    async def take(self) -> Optional[wavelink.Playable]:
+        """Next recommendation: buffered if ready, else awaited or computed now."""
+        if not self.ready and self._task is not None and not self._task.done():
+            # Speculation is already underway; wait for its first pick
+            self._added.clear()
+            waiter = asyncio.create_task(self._added.wait())
+            await asyncio.wait({waiter, self._task}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+
+        if self.ready:
+            track = self.ready.popleft()
+            self.served += 1
+        else:
+            session = sq.get(self.guild_id)
+            if not session.tracks:
+                return None
+            last = session.tracks[-1]
+            track = await recommend(last.title, last.author, *self._excluded())
+            if track is None:
+                return None
+            self.on_demand += 1
+        # The remaining buffer continues from this pick once it is queued
+        self._seed_uri = track.uri
+        self._seed = (track.title, track.author)
+        return track
+
+    def flush(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        if self.ready:
+            self.flushed += len(self.ready)
+            self.ready.clear()
+        self._seed_uri = None
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "ready": [t.title for t in self.ready],
+            "buffered": self.buffered,
+            "served": self.served,
+            "on_demand": self.on_demand,
+            "flushed": self.flushed,
+        }
+
+
+_buffers: dict[int, AutoplayBuffer] = {}
+
+
+def _buffer(guild_id: int) -> AutoplayBuffer:
+    buffer = _buffers.get(guild_id)
+    if buffer is None:
+        buffer = _buffers[guild_id] = AutoplayBuffer(guild_id, env_number("AUTOPLAY_BUFFER", 2))
+    return buffer
+
+
+def prepare(guild_id: int):
+    """Start speculating if the guild is on its last queued track with autoplay on."""
+    session = sq.get(guild_id)
+    if not session.autoplay_enabled and guild_id not in _buffers:
+        return
+    _buffer(guild_id).prepare()
+
+
+async def take(guild_id: int) -> Optional[wavelink.Playable]:
+    return await _buffer(guild_id).take()
+
+
+def discard(guild_id: int):
+    """Drop the guild's buffer (sq.teardown calls this)."""
+    buffer = _buffers.pop(guild_id, None)
+    if buffer is not None:
+        buffer.flush()
+
+
+def stats() -> dict:
+    return {str(guild_id): b.stats() for guild_id, b in _buffers.items()}
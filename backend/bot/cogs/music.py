@@ -9,6 +9,9 @@ from backend.bot.cogs.views.music_view import MusicView
 from backend.bot.cogs.views.queue_view import QueueView
 import asyncio
 from backend.bot import session_queue as sq
+from backend.bot import autoplay, prefetch, resolve_window, session_store
+from backend.utils import autocomplete, track_resolver, track_search
+from backend.voice_module import command_matcher
 
 logger = logging.getLogger(__name__)
 
@@ -40,20 +43,10 @@ class Music(commands.Cog):
             self.guild_contexts = {}
         self.guild_contexts[guild_id] = text_channel_id
             
-        cmds = command_text.split(" ", 1)
-        action = cmds[0].lower()
-        args = cmds[1] if len(cmds) > 1 else ""
+        # Canonical action + song/argument span from the shared compiled matcher
+        action, args = command_matcher.get_matcher().parse_command(command_text)
         
-        # Fuzzy match actions because Vosk mishears often
-        # play -> placebo, bleach, blame, plane, from
-        # pause -> boss, post, poles
-        # skip -> sheep, keep, skiff
-        play_aliases = ["play", "start", "song", "গান", "baja", "placebo", "bleach", "blame", "plane", "from"]
-        stop_aliases = ["stop", "clear", "leave", "স্টপ", "বন্ধ", "stock", "stuff"]
-        skip_aliases = ["skip", "next", "স্কিপ", "পরের", "sheep", "keep", "skiff", "scape"]
-        pause_aliases = ["pause", "resume", "boss", "post", "poles", "bosses", "paws"]
-        
-        if action in play_aliases:
+        if action == "play":
             if not args:
                 await channel.send("I didn't hear what song you wanted me to play.", delete_after=5)
                 return
@@ -78,7 +71,7 @@ class Music(commands.Cog):
                 
                 # Assume raw query for now
                 search_query = f"ytsearch:{args}"
-                tracks: wavelink.Search = await wavelink.Playable.search(search_query)
+                tracks: wavelink.Search = await track_search.search(search_query)
                 
                 if tracks:
                     track = tracks[0]
@@ -97,14 +90,14 @@ class Music(commands.Cog):
             except Exception as e:
                 logger.error(f"Voice /play failed: {e}")
                 
-        elif action in stop_aliases:
+        elif action == "stop":
             await channel.send("🎙️ **Voice Command:** Stopping music.", delete_after=5)
             player: wavelink.Player = guild.voice_client
             if player:
                 player.queue.clear()
                 await player.stop()
                 await player.disconnect()
-        elif action in skip_aliases:
+        elif action == "skip":
              player: wavelink.Player = guild.voice_client
              if player and player.playing:
                  session = sq.get(guild_id)
@@ -115,7 +108,7 @@ class Music(commands.Cog):
                  else:
                      await player.stop()
                      await channel.send("🎙️ **Voice Command:** Queue ended.", delete_after=5)
-        elif action in pause_aliases:
+        elif action == "pause":
              player: wavelink.Player = guild.voice_client
              if player:
                  await player.pause(not player.paused)
@@ -147,7 +140,7 @@ class Music(commands.Cog):
                     # Disconnect
                     logger.info(f"Auto-disconnecting from guild {guild.id} due to inactivity/empty channel.")
                     player.queue.clear()
-                    sq.clear(guild.id)
+                    sq.teardown(guild.id)
                     await player.stop()
                     await player.disconnect()
                     self.inactive_since.pop(guild.id, None)
@@ -302,7 +295,7 @@ class Music(commands.Cog):
                               search_q = f"ytmsearch:{t_title} {t_uploader}" if t_uploader else f"ytmsearch:{t_title}"
                               try:
                                   # Individual search
-                                  found_tracks = await wavelink.Playable.search(search_q)
+                                  found_tracks = await track_search.search(search_q)
                                   if found_tracks:
                                       t = found_tracks[0] if isinstance(found_tracks, list) else found_tracks.tracks[0]
                                       t.requester = interaction.user.id
@@ -352,30 +345,23 @@ class Music(commands.Cog):
             query = query.replace("ytsearch:", "", 1)
 
         if not query.startswith(("http://", "https://", "ytsearch:", "ytmsearch:", "scsearch:")):
-            queries_to_try = [f"ytsearch:{query}", f"ytmsearch:{query}"]
+            # Race YouTube and YouTube Music; whichever answers first wins
+            candidates = track_resolver.text_candidates(query)
         else:
-            queries_to_try = [query]
+            candidates = [("query", query)]
             
             # If they provided a raw youtube URL but Lavalink fails to load it (due to block or sign-in),
             # we should immediately fallback to searching its title/artist via ytsearch instead.
             # But here we just have the raw string, so we'll just try to search it directly first.
 
-        tracks = None
-        for try_query in queries_to_try:
-            try:
-                tracks = await wavelink.Playable.search(try_query)
-                if tracks:
-                    break # Found something!
-            except Exception as e:
-                logger.warning(f"Failed to search '{try_query}' in /play: {e}")
-                continue
+        _strategy, tracks = await track_resolver.race(candidates)
 
         if not tracks:
             # Final fallback: if it's a direct link that failed, try searching it as text
             if query.startswith(("http://", "https://")):
                  try:
                      clean_query = query.split('&')[0] # remove playlist data just in case
-                     tracks = await wavelink.Playable.search(f"ytsearch:{clean_query}")
+                     tracks = await track_search.search(f"ytsearch:{clean_query}")
                  except:
                      pass
                      
@@ -413,56 +399,24 @@ class Music(commands.Cog):
         if was_playing:
              await self.refresh_player_interface(interaction.guild.id, force_new=False)
 
-    _autocomplete_cache = {}
-
     @play.autocomplete("query")
     async def play_autocomplete(self, interaction: discord.Interaction, current: str):
-        if not current or len(current) < 3:
-            return []
-            
-        current_lower = current.lower()
-        import time
-        
-        # Simple cache expiration (5 minutes)
-        if hasattr(self, '_autocomplete_cache') and current_lower in self._autocomplete_cache:
-            cache_time, cached_choices = self._autocomplete_cache[current_lower]
-            if time.time() - cache_time < 300:
-                return cached_choices
-                
-        try:
-            tracks = await wavelink.Playable.search(f"ytmsearch:{current}")
-            if not tracks:
-                return []
-            
-            track_list = tracks.tracks if isinstance(tracks, wavelink.Playlist) else tracks
-            
-            choices = []
-            seen = set()
-            for track in track_list:
-                name = f"{track.title[:60]} - {track.author[:30]}"
-                if name not in seen:
-                    seen.add(name)
-                    # use URI if it fits in 100 chars, else use the name itself
-                    val = track.uri if track.uri and len(track.uri) <= 100 else name
-                    choices.append(app_commands.Choice(name=name, value=val))
-                if len(choices) >= 25:
-                    break
-                    
-            if not hasattr(self, '_autocomplete_cache'):
-                self._autocomplete_cache = {}
-            self._autocomplete_cache[current_lower] = (time.time(), choices)
-            return choices
-        except Exception as e:
-            logger.error(f"Autocomplete error in /play: {e}")
-            return []
+        # Shared, prefix-aware and debounced; always answers within Discord's deadline
+        suggestions = await autocomplete.suggest(current, interaction.user.id)
+        return [app_commands.Choice(name=name, value=value) for name, value in suggestions]
 
     # ---------------------------------------------------------------------- #
     # Internal helper: resolve a TrackInfo and play it immediately            #
     # Lavalink's player.queue is NEVER used for routing — only for playing    #
     # ---------------------------------------------------------------------- #
-    async def _play_session_track(self, player: wavelink.Player, track_info: sq.TrackInfo, is_manual: bool = True):
+    async def _play_session_track(self, player: wavelink.Player, track_info: sq.TrackInfo, is_manual: bool = True,
+                                  ready: Optional[wavelink.Playable] = None, start: int = 0):
         """Load a session track via Lavalink and play it immediately.
 
+        ready: an already-resolved Playable for track_info (e.g. from the
+               autoplay buffer); skips resolution entirely.
+        start: position in milliseconds to start from (warm restart resume).
+
         is_manual=True  (default): user-initiated skip/previous — sets
                         _session_navigating so on_track_end ignores the
                         'replaced' event that fires for the interrupted track.
@@ -471,41 +425,38 @@ class Music(commands.Cog):
                         or it would swallow the next natural 'finished' event.
         """
         try:
-            found = None
-            if track_info.encoded:
-                # If we saved the base64 encoded track from lavalink, try to decode and play it directly
-                try:
-                    found = await wavelink.Playable.search(track_info.encoded)
-                except Exception:
-                    pass
-            
-            if not found and track_info.uri:
-                 # Search by exact URI
-                 try:
-                     found = await wavelink.Playable.search(track_info.uri)
-                 except Exception:
-                     pass
-                     
-            if not found:
-                # Fallback to search
-                search_q = f"ytmsearch:{track_info.title} {track_info.author}"
-                found = await wavelink.Playable.search(search_q)
-                
-            if not found:
+            wl_track = ready
+            window = resolve_window.get(player.guild.id)
+            session = sq.get(player.guild.id)
+            if wl_track is None and window is not None and session.current == track_info:
+                # Lazy session: resolve a placeholder on demand, or take the
+                # Playable the window already resolved ahead of time
+                entry_id = session.tracks.id_at(session.current_index)
+                track_info = await window.resolve_now(entry_id, track_info)
+                wl_track = window.take(track_info)
+
+            if wl_track is None:
+                # Resolved in the background while the previous track played
+                wl_track = await prefetch.take(player.guild.id, track_info)
+
+            if wl_track is None:
+                wl_track = await prefetch.resolve(track_info)
+
+            if wl_track is None:
                 logger.warning(f"Session track not found: {track_info.title}")
                 # Skip to next automatically
-                session = sq.get(player.guild.id)
                 next_track = session.advance()
                 if next_track:
                     await self._play_session_track(player, next_track, is_manual=is_manual)
                 return
-            wl_track = found[0]
             player.queue.clear()           # Lavalink queue stays empty
             if is_manual:
                 # Signal on_track_end to ignore the 'replaced' event for the
                 # track that is being interrupted right now.
                 player._session_navigating = True
-            await player.play(wl_track)
+            await player.play(wl_track, start=start)
+            # Slide the lazy resolve window to follow the new position
+            resolve_window.kick(player.guild.id)
         except Exception as e:
             logger.error(f"_play_session_track error: {e}")
 
@@ -648,7 +599,7 @@ class Music(commands.Cog):
         player: wavelink.Player = cast(wavelink.Player, interaction.guild.voice_client)
         if player:
             player.queue.clear()
-            sq.clear(interaction.guild.id)   # clear session
+            sq.teardown(interaction.guild.id)   # clear session
             await player.stop()
             await player.disconnect()
             await interaction.response.send_message("Stopped.", ephemeral=True)
@@ -752,7 +703,7 @@ class Music(commands.Cog):
         if member.id == self.bot.user.id and after.channel is None:
             guild_id = member.guild.id
             # Clear session queue
-            sq.clear(guild_id)
+            sq.teardown(guild_id)
             if hasattr(self, 'player_messages') and guild_id in self.player_messages:
                 try:
                     cid, mid = self.player_messages[guild_id]
@@ -765,6 +716,50 @@ class Music(commands.Cog):
                 self.player_messages.pop(guild_id, None)
                 logger.info(f"Cleaned up player message and session for guild {guild_id} on disconnect")
 
+    @commands.Cog.listener()
+    async def on_wavelink_node_ready(self, payload: wavelink.NodeReadyEventPayload):
+        # Pick up sessions snapshotted before a restart (no-op once resumed)
+        await self._resume_sessions()
+
+    async def _resume_sessions(self):
+        """Rejoin voice and continue playback for every fresh session snapshot."""
+        # The node usually connects before the guild cache is filled
+        await self.bot.wait_until_ready()
+        try:
+            for guild_id, state in session_store.resumable():
+                guild = self.bot.get_guild(guild_id)
+                channel = guild.get_channel(state["voice_channel_id"]) if guild else None
+                if guild is None or channel is None or guild.voice_client is not None:
+                    session_store.forget(guild_id)
+                    continue
+                session = session_store.restore(guild_id)
+                current = session.current if session else None
+                if current is None:
+                    sq.teardown(guild_id)
+                    continue
+                try:
+                    player = await channel.connect(cls=wavelink.Player)
+                except Exception as e:
+                    logger.error(f"Failed to rejoin voice in guild {guild_id} after restart: {e}")
+                    sq.teardown(guild_id)
+                    continue
+                player.autoplay = wavelink.AutoPlayMode.partial
+                if state.get("volume") is not None:
+                    await player.set_volume(state["volume"])
+                if state.get("text_channel_id"):
+                    if not hasattr(self, 'guild_contexts'):
+                        self.guild_contexts = {}
+                    self.guild_contexts[guild_id] = state["text_channel_id"]
+                if any(not t.resolved for t in session.tracks):
+                    resolve_window.attach(guild_id)
+                await self._play_session_track(player, current, is_manual=False, start=state.get("position", 0))
+                if state.get("paused"):
+                    await player.pause(True)
+                logger.info(f"Resumed session for guild {guild_id}: {current.title} ({len(session.tracks)} tracks)")
+        finally:
+            # Whatever wasn't resumed (including after an error) is snapshotted afresh
+            session_store.forget_unresumed()
+
     @commands.Cog.listener()
     async def on_wavelink_track_start(self, payload: wavelink.TrackStartEventPayload):
         player: wavelink.Player = payload.player
@@ -784,11 +779,24 @@ class Music(commands.Cog):
             "artwork": payload.track.artwork
         })
 
+        # Start resolving the next track (or autoplay pick) while this one plays
+        prefetch.schedule(guild_id)
+        autoplay.prepare(guild_id)
+
         # Only create a new message if one doesn't exist yet;
         # otherwise edit in-place to avoid spamming the channel on skip/previous.
         has_existing = bool(self.player_messages.get(guild_id))
         await self.refresh_player_interface(guild_id, force_new=not has_existing)
 
+    @commands.Cog.listener()
+    async def on_wavelink_player_update(self, payload: wavelink.PlayerUpdateEventPayload):
+        # Periodic Lavalink state update: re-check the prediction so queue
+        # edits, shuffles and repeat changes since the track started count
+        player: wavelink.Player = payload.player
+        if player and player.guild and player.playing:
+            prefetch.schedule(player.guild.id)
+            autoplay.prepare(player.guild.id)
+
     @commands.Cog.listener()
     async def on_wavelink_track_end(self, payload: wavelink.TrackEndEventPayload):
         player: wavelink.Player = payload.player
@@ -821,99 +829,10 @@ class Music(commands.Cog):
                 # _session_navigating (that flag is only for user-initiated skips).
                 await self._play_session_track(player, next_track, is_manual=False)
             elif session.autoplay_enabled and session.current:
-                # End of queue, but autoplay is enabled. Fetch recommended track.
-                last_track = session.current
+                # End of queue, but autoplay is enabled. Take the recommendation
+                # that was resolved while this track played (or find one now).
                 try:
-                    next_wl_track = None
-                    valid_choices = []
-                    
-                    import os
-                    import aiohttp
-                    import re
-                    import random
-                    import urllib.parse
-                    
-                    last_fm_api_key = os.getenv("LASTFM_API_KEY")
-                    
-                    # Clean the title for better Last.fm matching (remove (Official Video), [Remix], etc)
-                    clean_title = re.sub(r'[\[\(].*?[\]\)]|-.*|Official.*|Video.*|Audio.*|Lyrics.*', '', last_track.title).strip()
-                    clean_author = re.sub(r'VEVO|Official|Topic', '', last_track.author, flags=re.IGNORECASE).strip()
-
-                    # Try Last.fm first if API key is present
-                    if last_fm_api_key and not next_wl_track:
-                        url = f"http://ws.audioscrobbler.com/2.0/?method=track.getsimilar&artist={urllib.parse.quote_plus(clean_author)}&track={urllib.parse.quote_plus(clean_title)}&api_key={last_fm_api_key}&format=json&limit=15"
-                        try:
-                            async with aiohttp.ClientSession() as http_session:
-                                # Add user-agent to prevent 403s on AudioScrobbler
-                                headers = {'User-Agent': 'FlakeMusicBot/1.0'}
-                                async with http_session.get(url, headers=headers) as response:
-                                    if response.status == 200:
-                                        data = await response.json()
-                                        similar_tracks = data.get('similartracks', {}).get('track', [])
-                                        
-                                        if similar_tracks:
-                                            # We have Last.fm recommendations!
-                                            random.shuffle(similar_tracks) # Mix them up
-                                            existing_titles = {t.title.lower() for t in session.tracks}
-                                            
-                                            for sim_track in similar_tracks:
-                                                sim_title = sim_track.get('name')
-                                                sim_artist = sim_track.get('artist', {}).get('name')
-                                                
-                                                # Ensure both are present and not already played
-                                                if sim_title and sim_artist and sim_title.lower() not in existing_titles:
-                                                    # Try to resolve this specific track via Lavalink
-                                                    # Last.fm returns very specific artist names that sometimes trip up YouTube search.
-                                                    # We'll try ytsearch (standard youtube, usually best for exact title+artist), then ytmsearch.
-                                                    
-                                                    queries_to_try = [
-                                                        f"ytsearch:{sim_title} {sim_artist}",
-                                                        f"ytmsearch:{sim_title} {sim_artist}",
-                                                        f"ytsearch:{sim_title} Official Audio",
-                                                    ]
-                                                    
-                                                    found_valid = False
-                                                    for query in queries_to_try:
-                                                        try:
-                                                            found = await wavelink.Playable.search(query)
-                                                            if found:
-                                                                track_list = found.tracks if isinstance(found, wavelink.Playlist) else found
-                                                                if track_list:
-                                                                    next_wl_track = track_list[0]
-                                                                    logger.info(f"Last.fm chose: {sim_title} by {sim_artist} (Found via {query.split(':')[0]})")
-                                                                    found_valid = True
-                                                                    break
-                                                        except Exception as search_e:
-                                                            logger.warning(f"Lavalink search failed for '{query}': {search_e}")
-                                                            continue
-                                                    
-                                                    if found_valid:
-                                                        break # Break the outer Last.fm similar tracks loop since we found a song!
-                                    else:
-                                        logger.error(f"Last.fm API returned status {response.status}")
-                        except Exception as e:
-                            logger.error(f"Last.fm API fetch failed: {e}")
-
-                    # Fallback to Wavelink Mix-based querying if Last.fm fails or is unavailable
-                    if not next_wl_track:
-                        query = f"ytmsearch:{clean_title} {clean_author} mix"
-                        found = await wavelink.Playable.search(query)
-                        
-                        if not found:
-                            query = f"ytmsearch:{clean_author} top tracks"
-                            found = await wavelink.Playable.search(query)
-    
-                        if found:
-                            track_list = found.tracks if isinstance(found, wavelink.Playlist) else found
-                            choices = track_list[1:12] if len(track_list) > 1 else track_list
-                            
-                            existing_uris = {t.uri for t in session.tracks}
-                            valid_choices = [t for t in choices if t.uri not in existing_uris]
-                            
-                            if not valid_choices and choices:
-                                 valid_choices = choices
-                                 
-                            next_wl_track = random.choice(valid_choices) if valid_choices else choices[0]
+                    next_wl_track = await autoplay.take(guild_id)
 
                     if next_wl_track:
                         # Add to session and play
@@ -923,7 +842,7 @@ class Music(commands.Cog):
                         
                         # Advance session to this newly added track
                         session.set_index(session.current_index + 1)
-                        await self._play_session_track(player, session.current, is_manual=False)
+                        await self._play_session_track(player, session.current, is_manual=False, ready=next_wl_track)
                         
                         # Send a message to the channel saying autoplay added a song
                         if guild_id in self.guild_contexts:
@@ -12,6 +12,8 @@ import logging
 import datetime
 import asyncio
 from backend.bot import session_queue as sq
+from backend.bot import resolve_window
+from backend.utils import autocomplete, track_search, track_store
 
 logger = logging.getLogger(__name__)
 
@@ -102,7 +104,7 @@ class PlaylistCog(commands.Cog):
         tracks = None
         for try_query in queries_to_try:
             try:
-                tracks = await wavelink.Playable.search(try_query)
+                tracks = await track_search.search(try_query)
                 if tracks:
                     break
             except Exception:
@@ -112,7 +114,7 @@ class PlaylistCog(commands.Cog):
             if query.startswith(("http://", "https://")):
                  try:
                      clean_query = query.split('&')[0]
-                     tracks = await wavelink.Playable.search(f"ytsearch:{clean_query}")
+                     tracks = await track_search.search(f"ytsearch:{clean_query}")
                  except:
                      pass
                      
@@ -169,47 +171,11 @@ class PlaylistCog(commands.Cog):
             playlists = (await session.execute(stmt)).scalars().all()
         return [app_commands.Choice(name=p, value=p) for p in playlists]
 
-    _autocomplete_cache = {}
-
     @add.autocomplete("query")
     async def add_query_autocomplete(self, interaction: discord.Interaction, current: str):
-        if not current or len(current) < 3:
-            return []
-            
-        current_lower = current.lower()
-        import time
-        
-        # Simple cache expiration (5 minutes)
-        if hasattr(self, '_autocomplete_cache') and current_lower in self._autocomplete_cache:
-            cache_time, cached_choices = self._autocomplete_cache[current_lower]
-            if time.time() - cache_time < 300:
-                return cached_choices
-                
-        try:
-            tracks = await wavelink.Playable.search(f"ytmsearch:{current}")
-            if not tracks:
-                return []
-            
-            track_list = tracks.tracks if isinstance(tracks, wavelink.Playlist) else tracks
-            
-            choices = []
-            seen = set()
-            for track in track_list:
-                name = f"{track.title[:60]} - {track.author[:30]}"
-                if name not in seen:
-                    seen.add(name)
-                    # use URI if it fits in 100 chars, else use the name itself
-                    val = track.uri if track.uri and len(track.uri) <= 100 else name
-                    choices.append(app_commands.Choice(name=name, value=val))
-                if len(choices) >= 25:
-                    break
-                    
-            if not hasattr(self, '_autocomplete_cache'):
-                self._autocomplete_cache = {}
-            self._autocomplete_cache[current_lower] = (time.time(), choices)
-            return choices
-        except Exception:
-            return []
+        # Shared, prefix-aware and debounced; always answers within Discord's deadline
+        suggestions = await autocomplete.suggest(current, interaction.user.id)
+        return [app_commands.Choice(name=name, value=value) for name, value in suggestions]
 
     @playlist_group.command(name="play", description="Play a playlist")
     @app_commands.describe(name="The playlist to play")
@@ -285,47 +251,62 @@ class PlaylistCog(commands.Cog):
             first_track = None
             
             try:
-                for index, data in enumerate(t_data):
-                    info = data.get("info", data) 
-                    title = info.get("title")
-                    author = info.get("author") or info.get("artist")
-                    uri = info.get("uri")
-                    
+                async def report_progress(resolved, failed, total, lazy=False):
+                    # Dashboard shows load progress over the guild websocket
+                    from backend.api.websocket.manager import manager
+                    await manager.broadcast(str(guild_id), {
+                        "event": "PLAYLIST_LOAD_PROGRESS",
+                        "playlist": name,
+                        "resolved": resolved,
+                        "failed": failed,
+                        "total": total,
+                        "done": lazy or resolved + failed >= total,
+                        "lazy": lazy,
+                    })
+
+                music_cog = self.bot.get_cog("Music")
+                if music_cog and resolve_window.should_defer(len(t_data)):
+                    # Long playlist: queue placeholders now and only resolve
+                    # a window of tracks ahead of playback
+                    first_idx = resolve_window.add_placeholders(guild_id, t_data)
+                    if not was_playing and queue_was_empty:
+                        session.set_index(first_idx)
+                        player.queue.clear()
+                        await music_cog._play_session_track(player, session.current)
+                    else:
+                        resolve_window.kick(guild_id)
+                    await report_progress(0, 0, len(t_data), lazy=True)
+                    logger.info(f"Queued {len(t_data)} lazy tracks for guild {guild_id}.")
+
+                    await music_cog.refresh_player_interface(guild_id, force_new=False)
+                    channel = self.bot.get_channel(interaction.channel_id)
+                    if channel:
+                        await channel.send(f"✅ Queued **{len(t_data)}** tracks from **{name}** for <@{user_id}>.", delete_after=15)
+                    return
+
+                # Stored resolutions are rebuilt without a search; misses are searched
+                # concurrently but still arrive here in playlist order
+                async for index, track in track_store.resolve_tracks(t_data, on_progress=report_progress):
+                    if track is None:
+                        continue
                     try:
-                        # Prioritize exact URL to skip expensive YouTube Search if possible
-                        # BUT force text search for YouTube to avoid Lavalink IP blocks
-                        if uri and "youtube.com" not in uri and "youtu.be" not in uri:
-                            query = uri
-                        elif title:
-                            query = f"ytmsearch:{title} {author}" if author else f"ytmsearch:{title}"
-                        else:
-                            continue
-                            
-                        tracks = await wavelink.Playable.search(query)
-                        if tracks:
-                            # Wavelink may return playlist or list
-                            track = tracks[0] if isinstance(tracks, list) else tracks.tracks[0]
-                            track.requester = user_id
+                        track.requester = user_id
+                        
+                        sq_track = sq.from_wavelink_track(track)
+                        sq_idx = session.add(sq_track)
+                        
+                        if count == 0 and not was_playing and queue_was_empty:
+                            start_index = sq_idx
+                            first_track = track
                             
-                            sq_track = sq.from_wavelink_track(track)
-                            sq_idx = session.add(sq_track)
+                            # Start playback immediately on the first found track
+                            session.set_index(start_index)
+                            player.queue.clear()
+                            await player.play(first_track)
                             
-                            if count == 0 and not was_playing and queue_was_empty:
-                                start_index = sq_idx
-                                first_track = track
-                                
-                                # Start playback immediately on the first found track
-                                session.set_index(start_index)
-                                player.queue.clear()
-                                await player.play(first_track)
-                                
-                            count += 1
+                        count += 1
                     except Exception as e:
-                        logger.warning(f"Track {index}: Search load failed: {e}")
-                        
-                    # Yield to event loop nicely after every single track lookup
-                    # This prevents the bot from "hanging" while loading 1000s of tracks
-                    await asyncio.sleep(0.05)
+                        logger.warning(f"Track {index}: Failed to queue: {e}")
                     
                 logger.info(f"Finished loading background playlist for guild {guild_id}. Queued: {count}")
                 
@@ -11,6 +11,7 @@ import logging
 import discord
 import wavelink
 from backend.bot import session_queue as sq
+from backend.bot import prefetch, resolve_window
 
 logger = logging.getLogger(__name__)
 
@@ -191,7 +192,7 @@ class MusicView(discord.ui.View):
         await interaction.response.defer()
         guild_id = self.player.guild.id
         self.player.queue.clear()
-        sq.clear(guild_id)
+        sq.teardown(guild_id)
         await self.player.stop()
         await self.player.disconnect()
 
@@ -218,6 +219,8 @@ class MusicView(discord.ui.View):
             session.unshuffle()
         else:
             session.shuffle()
+        resolve_window.kick(session.guild_id)
+        prefetch.schedule(session.guild_id)
         await self._ack_and_refresh(interaction)
 
     # -- Volume Down ----------------------------------------------------
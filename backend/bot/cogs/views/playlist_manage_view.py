@@ -4,6 +4,7 @@ from sqlalchemy import select, delete
 from sqlalchemy.orm import selectinload
 from backend.database.core.db import async_session_factory
 from backend.database.models.models import Playlist, PlaylistTrack, User
+from backend.utils import track_search
 import wavelink
 import datetime
 import logging
@@ -53,7 +54,7 @@ class AddTracksModal(discord.ui.Modal, title="Add Tracks to Playlist"):
                     resolved_query = f"ytmsearch:{title} {artist}" if artist else f"ytmsearch:{title}"
 
         try:
-            tracks: wavelink.Search = await wavelink.Playable.search(resolved_query)
+            tracks: wavelink.Search = await track_search.search(resolved_query)
         except Exception as e:
             logger.warning(f"Search failed for {resolved_query}: {e}")
             await interaction.followup.send("❌ Could not search for that track.", ephemeral=True)
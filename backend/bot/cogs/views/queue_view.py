@@ -34,8 +34,8 @@ def _fmt_duration(ms: int) -> str:
     return f"{m:02d}:{s:02d}"
 
 
-def _total_duration_str(tracks: list[sq.TrackInfo]) -> str:
-    return _fmt_duration(sum(t.duration for t in tracks))
+def _total_duration_str(tracks: sq.TrackList) -> str:
+    return _fmt_duration(tracks.duration)
 
 
 def _parse_positions(raw: str) -> list[int]:
@@ -88,7 +88,7 @@ class DeleteModal(discord.ui.Modal, title="Delete Tracks from Queue"):
         positions = _parse_positions(raw)
 
         session = self.queue_view.session
-        upcoming = self.queue_view._upcoming()          # list of (global_idx, track)
+        upcoming_count = self.queue_view._upcoming_count()
 
         if not positions:
             await interaction.response.send_message(
@@ -100,28 +100,21 @@ class DeleteModal(discord.ui.Modal, title="Delete Tracks from Queue"):
         global_indices_to_remove: set[int] = set()
         invalid: list[int] = []
         for pos in positions:
-            idx = pos - 1  # convert to 0-based index into upcoming
-            if 0 <= idx < len(upcoming):
-                global_indices_to_remove.add(upcoming[idx][0])
+            if 1 <= pos <= upcoming_count:
+                global_indices_to_remove.add(session.current_index + pos)
             else:
                 invalid.append(pos)
 
         if not global_indices_to_remove:
             await interaction.response.send_message(
-                f"❌ No valid positions found (upcoming queue has {len(upcoming)} tracks).",
+                f"❌ No valid positions found (upcoming queue has {upcoming_count} tracks).",
                 ephemeral=True,
             )
             return
 
         # Remove tracks in reverse order to keep indices stable
         for gi in sorted(global_indices_to_remove, reverse=True):
-            del session.tracks[gi]
-            # Adjust current_index if a removed track was before/at it
-            if gi < session.current_index:
-                session.current_index -= 1
-            elif gi == session.current_index:
-                # Current track was deleted — clamp to valid position
-                session.current_index = min(session.current_index, len(session.tracks) - 1)
+            session.remove_at(gi)
 
         removed_count = len(global_indices_to_remove)
         warning = ""
@@ -156,13 +149,16 @@ class QueueView(discord.ui.View):
 
     # ------------------------------------------------------------------ #
 
-    def _upcoming(self) -> list[tuple[int, sq.TrackInfo]]:
-        """(global_index, track) for every track after current_index."""
-        idx = self.session.current_index
-        return [(i, t) for i, t in enumerate(self.session.tracks) if i > idx]
+    def _upcoming_count(self) -> int:
+        return max(0, len(self.session.tracks) - self.session.current_index - 1)
+
+    def _upcoming_page(self) -> list[sq.TrackInfo]:
+        """The upcoming tracks shown on the current page."""
+        first = self.session.current_index + 1 + self.page * TRACKS_PER_PAGE
+        return self.session.tracks[first:first + TRACKS_PER_PAGE]
 
     def _total_pages(self) -> int:
-        count = len(self._upcoming())
+        count = self._upcoming_count()
         return max(1, -(-count // TRACKS_PER_PAGE))   # ceiling division
 
     def _update_buttons(self):
@@ -199,15 +195,14 @@ class QueueView(discord.ui.View):
             embed.add_field(name="Now Playing:", value="*Nothing*", inline=False)
 
         # --- Upcoming Queue ---
-        upcoming = self._upcoming()
         total_pages = self._total_pages()
 
-        if upcoming:
+        if self._upcoming_count():
             start = self.page * TRACKS_PER_PAGE
-            slice_ = upcoming[start: start + TRACKS_PER_PAGE]
+            slice_ = self._upcoming_page()
 
             lines = []
-            for pos, (_, track) in enumerate(slice_, start=start + 1):
+            for pos, track in enumerate(slice_, start=start + 1):
                 icon = _source_emoji(track.uri)
                 dur = _fmt_duration(track.duration)
                 title_link = f"[{track.title}]({track.uri})" if track.uri else track.title
@@ -257,8 +252,7 @@ class QueueView(discord.ui.View):
     @discord.ui.button(emoji="🗑️", style=discord.ButtonStyle.danger, custom_id="q_delete", row=0)
     async def delete_tracks(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Open a modal so the user can type which track numbers to remove."""
-        upcoming = self._upcoming()
-        if not upcoming:
+        if not self._upcoming_count():
             await interaction.response.send_message(
                 "There are no upcoming tracks to delete.", ephemeral=True
             )
@@ -270,11 +264,9 @@ class QueueView(discord.ui.View):
     async def clear_all_upcoming(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Remove all upcoming tracks; keep the bot playing the current song."""
         session = self.session
-        ci = session.current_index
 
         # Keep only tracks up to and including the current one
-        session.tracks = session.tracks[: ci + 1]
-        session._original_tracks = []   # reset shuffle baseline
+        session.truncate_after_current()
 
         # Lavalink queue has nothing to do with our session, but clear it too
         if self.player:
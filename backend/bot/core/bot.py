@@ -6,6 +6,7 @@ import wavelink
 import logging
 from discord.ext import commands
 from itertools import cycle
+from backend.utils.env import env_number
 
 # --- MONKEY PATCH WAVELINK FOR LAVALINK V4 ---
 # Lavalink V4 requires 'channelId' in the voice state update payload
@@ -47,14 +48,19 @@ class MusicBot(commands.Bot):
         # Companion bot listener
         self.listener_bot = None
         if os.getenv("VOICE_MODULE_ENABLED", "false").lower() == "true":
-            from backend.voice_module.listener_bot import ListenerBot
+            from backend.voice_module import listener_process
             
             async def voice_callback(guild_id, text_channel_id, user_id, command_text):
                 music_cog = self.get_cog("Music")
                 if music_cog:
                     await music_cog._handle_voice_command(guild_id, text_channel_id, user_id, command_text)
 
-            self.listener_bot = ListenerBot(voice_callback, main_bot_id=0) # Will be set in on_ready
+            if listener_process.enabled():
+                # Companion runs in its own worker process; commands arrive over local IPC
+                self.listener_bot = listener_process.ListenerProcess(voice_callback, main_bot_id=0)
+            else:
+                from backend.voice_module.listener_bot import ListenerBot
+                self.listener_bot = ListenerBot(voice_callback, main_bot_id=0) # Will be set in on_ready
 
         intents = discord.Intents.default()
         intents.message_content = True
@@ -85,13 +91,7 @@ class MusicBot(commands.Bot):
         return messages or default_messages
 
     def _load_status_rotation_seconds(self):
-        raw_value = os.getenv("BOT_STATUS_ROTATION_SECONDS", "1").strip()
-        try:
-            seconds = float(raw_value)
-            return max(0.1, seconds)
-        except ValueError:
-            logger.warning("Invalid BOT_STATUS_ROTATION_SECONDS='%s'. Falling back to 1 second.", raw_value)
-            return 1.0
+        return max(0.1, env_number("BOT_STATUS_ROTATION_SECONDS", 1.0))
 
     async def setup_hook(self):
         self._verify_watermarks()
@@ -145,10 +145,8 @@ class MusicBot(commands.Bot):
     async def on_guild_remove(self, guild: discord.Guild):
         # If the main bot is removed/kicked from a guild, ensure the listener bot leaves too
         if self.listener_bot:
-            listener_guild = self.listener_bot.get_guild(guild.id)
-            if listener_guild:
-                logger.info(f"Main bot removed from {guild.name}. Forcing companion to leave.")
-                await listener_guild.leave()
+            if await self.listener_bot.leave_guild(guild.id):
+                logger.info(f"Main bot removed from {guild.name}. Forced companion to leave.")
 
     async def on_wavelink_node_ready(self, payload: wavelink.NodeReadyEventPayload):
         logger.info(f"Wavelink Node connected: {payload.node.identifier}")
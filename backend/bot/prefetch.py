@@ -0,0 +1,169 @@
+"""
+prefetch.py — Resolve the next session track while the current one plays.
+
+_play_session_track used to resolve a track only once the previous one had
+finished, leaving an audible gap between songs. Each guild now gets a
+Prefetcher that, whenever a track starts (and on every Lavalink player
+update, so queue edits, shuffles and repeat changes are picked up),
+resolves `session.peek_next()` in the background and holds the Playable.
+When the track ends, _play_session_track takes it and only has to call
+`player.play`.
+
+A prediction that turns out wrong (the user skipped elsewhere) is simply
+dropped; if the right track is still being resolved, the caller awaits the
+in-flight lookup instead of starting a new one.
+
+Env vars:
+    PREFETCH_NEXT_TRACK   Set to "false" to disable prefetching (default: true)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import wavelink
+
+from backend.bot import resolve_window
+from backend.bot import session_queue as sq
+from backend.utils import track_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    return os.getenv("PREFETCH_NEXT_TRACK", "true").strip().lower() == "true"
+
+
+def _first(found) -> Optional[wavelink.Playable]:
+    if not found:
+        return None
+    tracks = found.tracks if isinstance(found, wavelink.Playlist) else found
+    return tracks[0] if tracks else None
+
+
+async def resolve(track_info: sq.TrackInfo) -> Optional[wavelink.Playable]:
+    """Load a session track via Lavalink, racing the saved encoded track, the
+    exact URI and title/author searches (see track_resolver)."""
+    candidates = track_resolver.session_candidates(
+        track_info.title, track_info.author, track_info.uri, track_info.encoded
+    )
+    _strategy, found = await track_resolver.race(candidates)
+    return _first(found)
+
+
+class Prefetcher:
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self._track: Optional[sq.TrackInfo] = None
+        # Entry the prefetch is for; identical tracks can be queued twice
+        self._entry_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.scheduled = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+
+    def schedule(self):
+        """Start resolving the track the session would advance to next."""
+        session = sq.get(self.guild_id)
+        entry_id = session.peek_next_id()
+        if entry_id is None:
+            self._reset()
+            return
+        upcoming = session.tracks.get(entry_id)
+        if self._track is not None and self._entry_id == entry_id and self._track is upcoming:
+            return
+        if self._track is not None:
+            self.wasted += 1
+        self._reset()
+        self._track = upcoming
+        self._entry_id = entry_id
+        self._task = asyncio.create_task(self._resolve(entry_id, upcoming))
+        self.scheduled += 1
+
+    async def _resolve(self, entry_id: int, track_info: sq.TrackInfo) -> tuple[sq.TrackInfo, Optional[wavelink.Playable]]:
+        window = resolve_window.get(self.guild_id)
+        if window is not None and not track_info.resolved:
+            # Lazy placeholder: resolving swaps it for a real entry in the session
+            track_info = await window.resolve_now(entry_id, track_info)
+            self._track = track_info
+            ready = window.take(track_info)
+            if ready is not None:
+                return track_info, ready
+        return track_info, await resolve(track_info)
+
+    async def take(self, track_info: sq.TrackInfo) -> Optional[wavelink.Playable]:
+        """The prefetched Playable for `track_info`, or None if the guess was wrong."""
+        if self._task is None or self._track is None or self._track != track_info:
+            self.misses += 1
+            return None
+        task = self._task
+        self._track = None
+        self._entry_id = None
+        self._task = None
+        try:
+            _track, playable = await task
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Prefetch for guild {self.guild_id} failed: {e}")
+            playable = None
+        if playable is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return playable
+
+    def _reset(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._track = None
+        self._entry_id = None
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._track.title if self._track is not None else None,
+            "scheduled": self.scheduled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "wasted": self.wasted,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Per-guild registry
+# ---------------------------------------------------------------------------
+
+_prefetchers: dict[int, Prefetcher] = {}
+
+
+def schedule(guild_id: int):
+    """Prefetch the guild's next track (cheap if it is already prefetched)."""
+    if not enabled():
+        return
+    prefetcher = _prefetchers.get(guild_id)
+    if prefetcher is None:
+        prefetcher = _prefetchers[guild_id] = Prefetcher(guild_id)
+    prefetcher.schedule()
+
+
+async def take(guild_id: int, track_info: sq.TrackInfo) -> Optional[wavelink.Playable]:
+    prefetcher = _prefetchers.get(guild_id)
+    if prefetcher is None:
+        return None
+    return await prefetcher.take(track_info)
+
+
+def discard(guild_id: int):
+    """Drop the guild's prefetcher (sq.teardown calls this)."""
+    prefetcher = _prefetchers.pop(guild_id, None)
+    if prefetcher is not None:
+        prefetcher._reset()
+
+
+def stats() -> dict:
+    return {str(guild_id): p.stats() for guild_id, p in _prefetchers.items()}
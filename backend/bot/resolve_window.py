@@ -0,0 +1,201 @@
+"""
+resolve_window.py — Lazy playlist sessions: resolve only what is about to play.
+
+Long playlists are added to the GuildSession as unresolved placeholders
+(sq.from_track_data) built straight from the stored playlist metadata. A
+per-guild ResolveWindow keeps the current track and the next
+LAZY_RESOLVE_WINDOW entries resolved, going through track_store so stored
+resolutions cost one DB lookup and only real misses reach Lavalink.
+
+Skips, jumps and shuffles only move current_index or reorder the list; the
+window is re-read on every `kick()` (after each track starts and after a
+shuffle), so a user who skips away from track 3 of 2,000 never pays for
+tracks 200+.
+
+Resolved placeholders are swapped in place for a regular TrackInfo and the
+Playable is held until _play_session_track takes it, so the track starts
+without another search. Playables that fall out of the window are dropped.
+
+Env vars:
+    LAZY_PLAYLIST_MIN_TRACKS   Playlists at least this long load lazily; 0 disables (default: 50)
+    LAZY_RESOLVE_WINDOW        Tracks kept resolved ahead of the current one (default: 10)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Optional
+
+import wavelink
+
+from backend.bot import session_queue as sq
+from backend.utils import track_store
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+
+def should_defer(track_count: int) -> bool:
+    """Whether a playlist of `track_count` tracks should load as placeholders."""
+    min_tracks = env_number("LAZY_PLAYLIST_MIN_TRACKS", 50)
+    return min_tracks > 0 and track_count >= min_tracks
+
+
+class ResolveWindow:
+    def __init__(self, guild_id: int, size: int):
+        self.guild_id = guild_id
+        self.size = max(1, size)
+        # encoded -> Playable for resolved entries still inside the window
+        self._playables: dict[str, wavelink.Playable] = {}
+        # Entry IDs of placeholders whose search came back empty; not retried
+        self._failed: set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._dirty = False
+
+        self.resolved = 0
+        self.failed = 0
+
+    def _window(self, session: sq.GuildSession) -> list[tuple[int, sq.TrackInfo]]:
+        """(entry ID, track) for the current track and the ones after it."""
+        if not session.tracks:
+            return []
+        start = max(session.current_index, 0)
+        total = len(session.tracks)
+        count = min(self.size + 1, total)
+        window = session.tracks.entries(start, start + count)
+        if session.repeat_mode == "all" and len(window) < count:
+            window += session.tracks.entries(0, count - len(window))
+        return window
+
+    def kick(self):
+        """Re-read the window and resolve whatever in it is still a placeholder."""
+        if self._task is not None and not self._task.done():
+            # The running pass notices and starts over on the new window
+            self._dirty = True
+            return
+        self._dirty = False
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while True:
+                self._dirty = False
+                await self._resolve_window()
+                if not self._dirty:
+                    break
+        except Exception as e:
+            logger.error(f"Resolve window for guild {self.guild_id} failed: {e}")
+
+    async def _resolve_window(self):
+        session = sq.get(self.guild_id)
+        window = self._window(session)
+
+        keep = {t.encoded for _entry_id, t in window if t.encoded}
+        for encoded in [e for e in self._playables if e not in keep]:
+            del self._playables[encoded]
+
+        pending = [(entry_id, t) for entry_id, t in window if not t.resolved and entry_id not in self._failed]
+        if not pending:
+            return
+
+        results = track_store.resolve_tracks([t.source for _entry_id, t in pending])
+        try:
+            async for index, wl_track in results:
+                self._store(session, *pending[index], wl_track)
+                if self._dirty:
+                    # Skipped or shuffled mid-pass; don't finish a stale window
+                    break
+        finally:
+            await results.aclose()
+
+    def _store(self, session: sq.GuildSession, entry_id: int, placeholder: sq.TrackInfo,
+               wl_track: Optional[wavelink.Playable]) -> sq.TrackInfo:
+        if wl_track is None:
+            self._failed.add(entry_id)
+            self.failed += 1
+            return placeholder
+        resolved = sq.from_wavelink_track(wl_track)
+        session.replace(entry_id, resolved)
+        if resolved.encoded:
+            self._playables[resolved.encoded] = wl_track
+        self.resolved += 1
+        return resolved
+
+    async def resolve_now(self, entry_id: int, placeholder: sq.TrackInfo) -> sq.TrackInfo:
+        """Resolve the placeholder at `entry_id` immediately (a jump outside
+        the window, or the first track of a load). Returns the resolved entry,
+        or `placeholder` if nothing was found or the entry is gone. The caller
+        passes the entry ID because identical placeholders share one object."""
+        session = sq.get(self.guild_id)
+        queued = session.tracks.get(entry_id)
+        if queued is None or entry_id in self._failed:
+            return placeholder
+        if queued.resolved:
+            return queued
+        placeholder = queued
+        wl_track = None
+        async for _index, wl_track in track_store.resolve_tracks([placeholder.source], concurrency=1):
+            pass
+        return self._store(session, entry_id, placeholder, wl_track)
+
+    def take(self, track_info: sq.TrackInfo) -> Optional[wavelink.Playable]:
+        """Pop the ready Playable for `track_info`, if the window resolved it."""
+        if not track_info.encoded:
+            return None
+        return self._playables.pop(track_info.encoded, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "ready": len(self._playables),
+            "resolved": self.resolved,
+            "failed": self.failed,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Per-guild registry
+# ---------------------------------------------------------------------------
+
+_windows: dict[int, ResolveWindow] = {}
+
+
+def attach(guild_id: int) -> ResolveWindow:
+    """Return the guild's window, creating it when a lazy load starts."""
+    window = _windows.get(guild_id)
+    if window is None:
+        window = _windows[guild_id] = ResolveWindow(guild_id, env_number("LAZY_RESOLVE_WINDOW", 10))
+    return window
+
+
+def get(guild_id: int) -> Optional[ResolveWindow]:
+    return _windows.get(guild_id)
+
+
+def kick(guild_id: int):
+    """Move the guild's window after navigation; no-op for eager sessions."""
+    window = _windows.get(guild_id)
+    if window is not None:
+        window.kick()
+
+
+def discard(guild_id: int):
+    """Drop the guild's window (sq.teardown calls this)."""
+    window = _windows.pop(guild_id, None)
+    if window is not None and window._task is not None:
+        window._task.cancel()
+
+
+def add_placeholders(guild_id: int, track_datas: list[dict]) -> int:
+    """Append placeholders for `track_datas` to the guild session and attach
+    a window. Returns the session index of the first placeholder."""
+    session = sq.get(guild_id)
+    first = len(session.tracks)
+    for data in track_datas:
+        session.add(sq.from_track_data(data))
+    attach(guild_id)
+    return first
+
+
+def stats() -> dict:
+    return {str(guild_id): window.stats() for guild_id, window in _windows.items()}
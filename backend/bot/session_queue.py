@@ -7,26 +7,55 @@ the current playback index. This gives us:
   - Played tracks stay visible in the queue
   - Click-to-jump anywhere in the list
   - Shuffle and repeat managed here, not via Lavalink
-  - Session disappears when the bot leaves (no DB needed)
+  - Session is dropped when the bot leaves; while it plays,
+    backend.bot.session_store snapshots it so it survives a restart
+
+Long playlists may be added as unresolved placeholders (see
+from_track_data); backend.bot.resolve_window resolves them just ahead of
+playback.
+
+`GuildSession.tracks` is a TrackList: list-like, but chunked and with a
+stable ID per entry, so big imports (tens of thousands of tracks) keep
+removals, "play next" and position lookups cheap.
+
+TrackInfo objects are immutable and interned in a process-wide registry:
+the same song queued in many guilds is stored once.
 """
 
 from __future__ import annotations
+import itertools
 import random
+import sys
+import weakref
+from array import array
+from bisect import bisect_right
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Optional, Literal
+from typing import Iterable, Iterator, Optional, Literal
 
 # ---------------------------------------------------------------------------
 # Data model
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(frozen=True, slots=True, weakref_slot=True)
 class TrackInfo:
+    """One track as the session sees it. Immutable and shared: the same
+    song queued in many guilds (or twice in one) is a single object, handed
+    out by the track registry below, so code must not rely on identity to
+    tell queue entries apart; use TrackList entry IDs for that."""
+
     title: str
     author: str
     uri: str
     thumbnail: Optional[str]
     duration: int          # milliseconds
     encoded: Optional[str] = None
+    # Stored playlist track_data while this entry is an unresolved placeholder
+    source: Optional[dict] = field(default=None, repr=False, compare=False)
+
+    @property
+    def resolved(self) -> bool:
+        return self.source is None
 
     def to_dict(self) -> dict:
         return {
@@ -36,19 +65,397 @@ class TrackInfo:
             "thumbnail": self.thumbnail,
             "duration": self.duration,
             "encoded": self.encoded,
+            "resolved": self.resolved,
         }
 
 
+# ---------------------------------------------------------------------------
+# Track list
+# ---------------------------------------------------------------------------
+
+# Entries per chunk; a chunk is split once it grows past twice this
+_CHUNK_SIZE = 256
+# Entry IDs are unique process-wide, so an ID held across an await can never
+# name an entry of a different (cleared and refilled) queue
+_entry_ids = itertools.count(1)
+# Queue versions too: a version from a cleared queue is always older than the
+# new queue's first one, and one `since_version` works across all guilds
+_versions = itertools.count(1)
+# Ops kept per queue for delta updates
+_OPLOG_SIZE = 512
+# Chunk keys and stamps (see TrackList.chunk_stamps)
+_stamps = itertools.count(1)
+
+
+class _Chunk:
+    __slots__ = ("ids", "key", "stamp")
+
+    def __init__(self, ids: Optional[list[int]] = None):
+        self.ids: list[int] = ids if ids is not None else []
+        self.key = self.stamp = next(_stamps)
+
+    def touch(self):
+        self.stamp = next(_stamps)
+
+
+class TrackList:
+    """Ordered session tracks with stable per-entry IDs.
+
+    Behaves like a list of TrackInfo (len, iteration, indexing, slicing,
+    insert, pop, del) but is stored as a list of small chunks of entry IDs,
+    so inserting or removing in the middle of a 20,000-track queue only
+    shifts one chunk. Every entry gets an ID when it is added; the ID stays
+    the same while the entry moves around (shuffle, play next, removals
+    before it), and `position()` maps it back to an index without scanning
+    the whole queue.
+
+    `shuffle(start)` is lazy: it runs Fisher–Yates one position at a time,
+    only as far as something reads (the next track, the queue page being
+    shown), so shuffling a huge queue costs nothing up front.
+    """
+
+    def __init__(self, tracks: Iterable[TrackInfo] = ()):
+        self._entries: dict[int, TrackInfo] = {}
+        self._chunk_of: dict[int, _Chunk] = {}
+        self._chunks: list[_Chunk] = []
+        # Start position of each chunk, rebuilt lazily after inserts/removals
+        self._offsets: Optional[list[int]] = None
+        self._chunk_index: dict[int, int] = {}
+        # Pending shuffle: positions [_lazy_from, _lazy_end) are not drawn yet
+        self._lazy_from = 0
+        self._lazy_end = 0
+        # Queue version and the ops that led to it, for delta updates
+        self.version = next(_versions)
+        self._oldest_version = self.version
+        self._ops: deque[tuple[int, str, int, Optional[int]]] = deque()
+        self.duration = 0   # total milliseconds, kept up to date
+        for track in tracks:
+            self.append(track)
+
+    # -- internals ------------------------------------------------------- #
+
+    def _index_chunks(self) -> list[int]:
+        if self._offsets is None:
+            offsets = []
+            total = 0
+            for chunk in self._chunks:
+                offsets.append(total)
+                total += len(chunk.ids)
+            self._offsets = offsets
+            self._chunk_index = {id(chunk): ci for ci, chunk in enumerate(self._chunks)}
+        return self._offsets
+
+    def _locate(self, i: int) -> tuple[int, int]:
+        """(chunk number, offset within chunk) of position `i` (0 <= i < len)."""
+        offsets = self._index_chunks()
+        ci = bisect_right(offsets, i) - 1
+        return ci, i - offsets[ci]
+
+    def _normalise(self, i: int) -> int:
+        n = len(self._entries)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("track index out of range")
+        return i
+
+    def _new_id(self, track: TrackInfo) -> int:
+        entry_id = next(_entry_ids)
+        self._entries[entry_id] = track
+        self.duration += track.duration or 0
+        return entry_id
+
+    def _settle(self, upto: Optional[int] = None):
+        """Draw the pending shuffle up to (not including) position `upto`."""
+        end = self._lazy_end if upto is None else min(upto, self._lazy_end)
+        while self._lazy_from < end:
+            i = self._lazy_from
+            j = random.randrange(i, self._lazy_end)
+            if j != i:
+                self._swap(i, j)
+            self._lazy_from += 1
+
+    def _swap(self, i: int, j: int):
+        ci, oi = self._locate(i)
+        cj, oj = self._locate(j)
+        a, b = self._chunks[ci], self._chunks[cj]
+        a.ids[oi], b.ids[oj] = b.ids[oj], a.ids[oi]
+        self._chunk_of[a.ids[oi]] = a
+        self._chunk_of[b.ids[oj]] = b
+        a.touch()
+        b.touch()
+
+    def _position(self, entry_id: int) -> int:
+        chunk = self._chunk_of[entry_id]
+        offsets = self._index_chunks()
+        return offsets[self._chunk_index[id(chunk)]] + chunk.ids.index(entry_id)
+
+    def _unlink(self, entry_id: int) -> TrackInfo:
+        if self._lazy_from < self._lazy_end:
+            # An undrawn entry just leaves the pool; a drawn one shifts it left
+            i = self._position(entry_id)
+            if i < self._lazy_from:
+                self._lazy_from -= 1
+            if i < self._lazy_end:
+                self._lazy_end -= 1
+        chunk = self._chunk_of.pop(entry_id)
+        chunk.ids.remove(entry_id)
+        chunk.touch()
+        if not chunk.ids:
+            self._chunks.pop(self._chunk_index_of(chunk))
+        self._offsets = None
+        return self._entries[entry_id]
+
+    def _chunk_index_of(self, chunk: _Chunk) -> int:
+        self._index_chunks()
+        return self._chunk_index[id(chunk)]
+
+    def _link(self, i: int, entry_id: int) -> int:
+        """Place an existing entry ID at position `i` (clamped to the ends);
+        return the position it ended up at."""
+        # The entry is already counted in _entries but not yet in a chunk
+        size = len(self._entries) - 1
+        i = max(0, min(i, size))
+        if i < self._lazy_end:
+            self._settle(i)
+            self._lazy_from += 1
+            self._lazy_end += 1
+        if not self._chunks:
+            chunk = _Chunk()
+            self._chunks.append(chunk)
+            ci, offset = 0, 0
+        elif i == size:
+            ci = len(self._chunks) - 1
+            chunk = self._chunks[ci]
+            offset = len(chunk.ids)
+        else:
+            ci, offset = self._locate(i)
+            chunk = self._chunks[ci]
+        chunk.ids.insert(offset, entry_id)
+        chunk.touch()
+        self._chunk_of[entry_id] = chunk
+        if len(chunk.ids) > 2 * _CHUNK_SIZE:
+            tail = _Chunk(chunk.ids[_CHUNK_SIZE:])
+            del chunk.ids[_CHUNK_SIZE:]
+            for moved in tail.ids:
+                self._chunk_of[moved] = tail
+            self._chunks.insert(ci + 1, tail)
+        self._offsets = None
+        return i
+
+    def _drop(self, entry_id: int) -> TrackInfo:
+        self._log("remove", entry_id, self._position(entry_id))
+        track = self._unlink(entry_id)
+        del self._entries[entry_id]
+        self.duration -= track.duration or 0
+        return track
+
+    def _log(self, kind: str, entry_id: int, index: Optional[int] = None):
+        self.version = next(_versions)
+        if len(self._ops) >= _OPLOG_SIZE:
+            # Clients older than the dropped op can't catch up with ops any more
+            self._oldest_version = self._ops.popleft()[0]
+        self._ops.append((self.version, kind, entry_id, index))
+
+    def _reset_log(self):
+        """Record a change too big to describe as ops (shuffle, reorder, clear)."""
+        self.version = next(_versions)
+        self._ops.clear()
+        self._oldest_version = self.version
+
+    # -- list protocol --------------------------------------------------- #
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[TrackInfo]:
+        self._settle()
+        for chunk in self._chunks:
+            for entry_id in chunk.ids:
+                yield self._entries[entry_id]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(start, stop, step)]
+            return [track for _entry_id, track in self.entries(start, stop)]
+        return self._entries[self.id_at(i)]
+
+    def __setitem__(self, i: int, track: TrackInfo):
+        self.replace_id(self.id_at(i), track)
+
+    def __delitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            for j in sorted(range(start, stop, step), reverse=True):
+                self._drop(self.id_at(j))
+            return
+        self._drop(self.id_at(i))
+
+    def __repr__(self) -> str:
+        return f"TrackList({list(self)!r})"
+
+    def append(self, track: TrackInfo) -> int:
+        """Append `track`; return its entry ID."""
+        entry_id = self._new_id(track)
+        self._log("insert", entry_id, self._link(len(self._entries) - 1, entry_id))
+        return entry_id
+
+    def insert(self, i: int, track: TrackInfo) -> int:
+        """Insert `track` before position `i`; return its entry ID."""
+        if i < 0:
+            i = max(0, i + len(self._entries))
+        entry_id = self._new_id(track)
+        self._log("insert", entry_id, self._link(i, entry_id))
+        return entry_id
+
+    def pop(self, i: int = -1) -> TrackInfo:
+        return self._drop(self.id_at(i))
+
+    def clear(self):
+        self._entries.clear()
+        self._chunk_of.clear()
+        self._chunks.clear()
+        self._offsets = None
+        self._lazy_from = self._lazy_end = 0
+        self.duration = 0
+        self._reset_log()
+
+    # -- entry IDs ------------------------------------------------------- #
+
+    def id_at(self, i: int) -> int:
+        i = self._normalise(i)
+        self._settle(i + 1)
+        ci, offset = self._locate(i)
+        return self._chunks[ci].ids[offset]
+
+    def position(self, entry_id: int) -> Optional[int]:
+        """Current index of an entry, or None if it is no longer queued."""
+        if entry_id not in self._chunk_of:
+            return None
+        self._settle()
+        return self._position(entry_id)
+
+    def get(self, entry_id: int) -> Optional[TrackInfo]:
+        return self._entries.get(entry_id)
+
+    def entries(self, start: int = 0, stop: Optional[int] = None) -> list[tuple[int, TrackInfo]]:
+        """(entry ID, track) pairs for positions start..stop-1."""
+        n = len(self._entries)
+        stop = n if stop is None else min(stop, n)
+        if start >= stop:
+            return []
+        self._settle(stop)
+        out = []
+        ci, offset = self._locate(start)
+        while len(out) < stop - start:
+            ids = self._chunks[ci].ids
+            for entry_id in ids[offset:offset + (stop - start - len(out))]:
+                out.append((entry_id, self._entries[entry_id]))
+            ci += 1
+            offset = 0
+        return out
+
+    def ops_since(self, version: int) -> Optional[list[dict]]:
+        """Ops applied after `version`, oldest first, or None if the queue
+        changed too much since then (the caller must re-read it)."""
+        if version < self._oldest_version:
+            return None
+        ops = []
+        for op_version, kind, entry_id, index in self._ops:
+            if op_version <= version:
+                continue
+            op = {"op": kind, "id": entry_id, "version": op_version}
+            if index is not None:
+                op["index"] = index
+            if kind in ("insert", "replace"):
+                # Current data; a later op covers any further change to it
+                track = self._entries.get(entry_id)
+                op["track"] = track.to_dict() if track is not None else None
+            ops.append(op)
+        return ops
+
+    def ids(self) -> list[int]:
+        self._settle()
+        return [entry_id for chunk in self._chunks for entry_id in chunk.ids]
+
+    def remove_id(self, entry_id: int) -> Optional[TrackInfo]:
+        if entry_id not in self._entries:
+            return None
+        return self._drop(entry_id)
+
+    def move(self, entry_id: int, i: int):
+        """Move an entry so that it ends up at position `i`."""
+        self._unlink(entry_id)
+        self._log("move", entry_id, self._link(i, entry_id))
+
+    def replace_id(self, entry_id: int, track: TrackInfo) -> bool:
+        """Swap the track stored under `entry_id`, keeping its position."""
+        old = self._entries.get(entry_id)
+        if old is None:
+            return False
+        self._entries[entry_id] = track
+        self.duration += (track.duration or 0) - (old.duration or 0)
+        self._chunk_of[entry_id].touch()
+        self._log("replace", entry_id)
+        return True
+
+    def shuffle(self, start: int = 0):
+        """Shuffle positions start..end lazily (see the class docstring)."""
+        self._settle()
+        self._lazy_from = max(0, start)
+        self._lazy_end = len(self._entries)
+        self._reset_log()
+
+    def reorder(self, entry_ids: Iterable[int]):
+        """Lay the existing entries out in the order given (a permutation of ids())."""
+        entry_ids = list(entry_ids)
+        self._lazy_from = self._lazy_end = 0
+        self._chunks = [_Chunk(entry_ids[i:i + _CHUNK_SIZE]) for i in range(0, len(entry_ids), _CHUNK_SIZE)]
+        for chunk in self._chunks:
+            for entry_id in chunk.ids:
+                self._chunk_of[entry_id] = chunk
+        self._offsets = None
+        self._reset_log()
+
+    # -- snapshots ------------------------------------------------------- #
+    # Used by session_store; none of these draw a pending shuffle.
+
+    def chunk_stamps(self) -> list[tuple[int, int]]:
+        """(key, stamp) of every chunk, in order. A chunk keeps its key for
+        life; its stamp changes whenever its entries, their order or their
+        tracks do."""
+        return [(chunk.key, chunk.stamp) for chunk in self._chunks]
+
+    def chunk_entries(self, ci: int) -> list[tuple[int, TrackInfo]]:
+        """(entry ID, track) pairs of chunk number `ci`, as laid out now."""
+        return [(entry_id, self._entries[entry_id]) for entry_id in self._chunks[ci].ids]
+
+    @property
+    def pending_shuffle(self) -> tuple[int, int]:
+        """Positions [start, end) a lazy shuffle has not drawn yet. Together
+        with the raw layout (chunk_entries) this is the whole shuffle state:
+        the undrawn range is just the pool the next draws pick from."""
+        return self._lazy_from, self._lazy_end
+
+    def resume_shuffle(self, start: int, end: int):
+        """Continue a shuffle saved with pending_shuffle on a list rebuilt in
+        the same raw order."""
+        self._lazy_end = max(0, min(end, len(self._entries)))
+        self._lazy_from = max(0, min(start, self._lazy_end))
+
+
 @dataclass
 class GuildSession:
     guild_id: int
-    tracks: list[TrackInfo] = field(default_factory=list)
+    tracks: TrackList = field(default_factory=TrackList)
     current_index: int = -1
     repeat_mode: Literal["off", "one", "all"] = "off"
     shuffle_enabled: bool = False
     autoplay_enabled: bool = False
-    # Original track order (preserved when shuffle is toggled)
-    _original_tracks: list[TrackInfo] = field(default_factory=list)
+    # Entry IDs in original order while shuffled; 4 bytes per track
+    _original_ids: array = field(default_factory=lambda: array("I"))
 
     # ------------------------------------------------------------------ #
     # Mutation helpers
@@ -56,11 +463,42 @@ class GuildSession:
 
     def add(self, track: TrackInfo) -> int:
         """Append track; return its index."""
-        self.tracks.append(track)
+        entry_id = self.tracks.append(track)
         if self.shuffle_enabled:
-            self._original_tracks.append(track)
+            self._original_ids.append(entry_id)
         return len(self.tracks) - 1
 
+    def replace(self, entry_id: int, new: TrackInfo) -> bool:
+        """Swap the track stored under `entry_id` for `new`, keeping its
+        position in both the live and the pre-shuffle order."""
+        return self.tracks.replace_id(entry_id, new)
+
+    def remove_at(self, i: int) -> Optional[TrackInfo]:
+        """Remove the track at `i`, keeping current_index on the same entry.
+        Removing the current track leaves current_index on the one after it."""
+        if not 0 <= i < len(self.tracks):
+            return None
+        track = self.tracks.pop(i)
+        if i < self.current_index:
+            self.current_index -= 1
+        return track
+
+    def move_to_next(self, i: int) -> bool:
+        """Move the track at `i` to play right after the current one."""
+        if not 0 <= i < len(self.tracks) or i == self.current_index:
+            return False
+        entry_id = self.tracks.id_at(i)
+        if i < self.current_index:
+            self.current_index -= 1
+        self.tracks.move(entry_id, self.current_index + 1)
+        return True
+
+    def truncate_after_current(self):
+        """Drop every upcoming track, keeping those up to the current one."""
+        del self.tracks[self.current_index + 1:]
+        # Reset the shuffle baseline to what is left
+        self._original_ids = array("I", self.tracks.ids() if self.shuffle_enabled else ())
+
     def set_index(self, i: int) -> Optional[TrackInfo]:
         """Set current_index; return the track at that position (or None)."""
         if 0 <= i < len(self.tracks):
@@ -68,15 +506,10 @@ class GuildSession:
             return self.tracks[i]
         return None
 
-    def advance(self) -> Optional[TrackInfo]:
-        """Move to the next track according to repeat/shuffle state.
-        Returns the next track, or None if at end (and repeat is off)."""
-        if not self.tracks:
-            return None
-
+    def _next_index(self) -> int:
         if self.repeat_mode == "one":
             # Stay on the same track
-            return self.current
+            return self.current_index
 
         next_idx = self.current_index + 1
 
@@ -84,7 +517,26 @@ class GuildSession:
             # Loop back to the start
             next_idx = 0
 
-        return self.set_index(next_idx)
+        return next_idx
+
+    def advance(self) -> Optional[TrackInfo]:
+        """Move to the next track according to repeat/shuffle state.
+        Returns the next track, or None if at end (and repeat is off)."""
+        if not self.tracks:
+            return None
+        return self.set_index(self._next_index())
+
+    def peek_next_id(self) -> Optional[int]:
+        """Entry ID of the track advance() would move to, without moving."""
+        if not self.tracks:
+            return None
+        i = self._next_index()
+        return self.tracks.id_at(i) if 0 <= i < len(self.tracks) else None
+
+    def peek_next(self) -> Optional[TrackInfo]:
+        """The track advance() would move to, without moving."""
+        entry_id = self.peek_next_id()
+        return self.tracks.get(entry_id) if entry_id is not None else None
 
     def previous(self) -> Optional[TrackInfo]:
         """Move to the previous track; return it (or None if at start)."""
@@ -102,46 +554,70 @@ class GuildSession:
         """Shuffle the upcoming (unplayed) tracks, preserving played ones."""
         if not self.tracks:
             return
-        # Save original order (unshuffled) for toggling off
-        self._original_tracks = list(self.tracks)
+        # Save original order (unshuffled) for toggling off; only entry IDs
+        # are copied, and the tracks themselves are never duplicated
+        if not self.shuffle_enabled:
+            self._original_ids = array("I", self.tracks.ids())
         self.shuffle_enabled = True
-
-        played = self.tracks[:self.current_index + 1]
-        upcoming = self.tracks[self.current_index + 1:]
-        random.shuffle(upcoming)
-        self.tracks = played + upcoming
+        self.tracks.shuffle(self.current_index + 1)
 
     def unshuffle(self):
         """Restore original track order."""
-        if not self._original_tracks:
+        if not self._original_ids:
             return
-        current_track = self.current
-        self.tracks = list(self._original_tracks)
+        current_id = self.tracks.id_at(self.current_index) if self.current is not None else None
+        # Entries removed while shuffled are skipped
+        order = [entry_id for entry_id in self._original_ids if self.tracks.get(entry_id) is not None]
+        if len(order) < len(self.tracks):
+            known = set(order)
+            order += [entry_id for entry_id in self.tracks.ids() if entry_id not in known]
+        self.tracks.reorder(order)
         # Try to maintain current position
-        if current_track:
-            try:
-                self.current_index = self.tracks.index(current_track)
-            except ValueError:
-                self.current_index = min(self.current_index, len(self.tracks) - 1)
+        if current_id is not None:
+            self.current_index = self.tracks.position(current_id)
         self.shuffle_enabled = False
-        self._original_tracks = []
+        self._original_ids = array("I")
 
     def clear(self):
-        self.tracks = []
-        self._original_tracks = []
+        self.tracks = TrackList()
+        self._original_ids = array("I")
         self.current_index = -1
         self.repeat_mode = "off"
         self.shuffle_enabled = False
         self.autoplay_enabled = False
 
-    def to_api(self) -> dict:
+    def _api_state(self) -> dict:
         return {
-            "tracks": [t.to_dict() for t in self.tracks],
             "current_index": self.current_index,
             "repeat_mode": self.repeat_mode,
             "shuffle_enabled": self.shuffle_enabled,
+            "total": len(self.tracks),
+            "version": self.tracks.version,
         }
 
+    def to_api(self, offset: Optional[int] = None, limit: Optional[int] = None) -> dict:
+        """The session for the API. Without arguments every track is listed;
+        with `limit`, only a window of that many tracks starting at `offset`
+        (by default at the current track)."""
+        total = len(self.tracks)
+        if offset is None:
+            offset = max(self.current_index, 0) if limit is not None else 0
+        start = min(max(offset, 0), total)
+        stop = total if limit is None else start + max(limit, 0)
+        return {
+            "tracks": [{**t.to_dict(), "id": entry_id} for entry_id, t in self.tracks.entries(start, stop)],
+            "offset": start,
+            **self._api_state(),
+        }
+
+    def delta(self, since_version: int) -> Optional[dict]:
+        """Queue ops applied after `since_version` plus the current state, or
+        None if the client has to re-read the queue (see TrackList.ops_since)."""
+        ops = self.tracks.ops_since(since_version)
+        if ops is None:
+            return None
+        return {"ops": ops, **self._api_state()}
+
 
 # ---------------------------------------------------------------------------
 # Global session store
@@ -150,6 +626,10 @@ class GuildSession:
 _sessions: dict[int, GuildSession] = {}
 
 
+def active() -> list[GuildSession]:
+    return list(_sessions.values())
+
+
 def get(guild_id: int) -> GuildSession:
     """Return the session for a guild, creating it if necessary."""
     if guild_id not in _sessions:
@@ -160,11 +640,76 @@ def get(guild_id: int) -> GuildSession:
 def clear(guild_id: int):
     """Remove the session for a guild (call on bot disconnect)."""
     _sessions.pop(guild_id, None)
+    from backend.bot import session_store
+    session_store.forget(guild_id)
+
+
+def teardown(guild_id: int):
+    """Clear the session and drop everything built on it (resolve window,
+    prefetcher, autoplay buffer). Use this whenever playback ends for good."""
+    # Imported here because each of them imports this module
+    from backend.bot import autoplay, prefetch, resolve_window
+    clear(guild_id)
+    resolve_window.discard(guild_id)
+    prefetch.discard(guild_id)
+    autoplay.discard(guild_id)
+
+
+# ---------------------------------------------------------------------------
+# Track registry
+# ---------------------------------------------------------------------------
+
+# Canonical track ID -> the one live TrackInfo for it. Entries disappear by
+# themselves once no session holds the track any more.
+_registry: "weakref.WeakValueDictionary[str, TrackInfo]" = weakref.WeakValueDictionary()
+_registry_stats = {"created": 0, "shared": 0}
+
+
+def track_key(track: TrackInfo) -> str:
+    """Canonical ID: the encoded Lavalink track when resolved (it already
+    pins down every field), otherwise all of the metadata."""
+    if track.resolved and track.encoded:
+        return track.encoded
+    return "\x1f".join((
+        "=" if track.resolved else "?",
+        track.title, track.author, track.uri, track.thumbnail or "", str(track.duration),
+    ))
+
+
+def intern_track(track: TrackInfo) -> TrackInfo:
+    """Return the registry's TrackInfo equal to `track`, registering it if new."""
+    key = track_key(track)
+    existing = _registry.get(key)
+    if existing is not None:
+        _registry_stats["shared"] += 1
+        return existing
+    _registry[key] = track
+    _registry_stats["created"] += 1
+    return track
+
+
+def make_track(title: str, author: str, uri: str, thumbnail: Optional[str], duration: int,
+               encoded: Optional[str] = None, source: Optional[dict] = None) -> TrackInfo:
+    """Build a TrackInfo through the registry."""
+    # Authors and artwork URLs repeat across whole albums and playlists
+    return intern_track(TrackInfo(
+        title=title,
+        author=sys.intern(author),
+        uri=uri,
+        thumbnail=sys.intern(thumbnail) if thumbnail else thumbnail,
+        duration=duration,
+        encoded=encoded,
+        source=source,
+    ))
+
+
+def registry_stats() -> dict:
+    return {**_registry_stats, "live": len(_registry)}
 
 
 def from_wavelink_track(track) -> TrackInfo:
-    """Convert a wavelink.Playable to a TrackInfo."""
-    return TrackInfo(
+    """Convert a wavelink.Playable to a (shared) TrackInfo."""
+    return make_track(
         title=track.title or "Unknown",
         author=track.author or "Unknown",
         uri=track.uri or "",
@@ -172,3 +717,16 @@ def from_wavelink_track(track) -> TrackInfo:
         duration=track.length or 0,
         encoded=track.encoded if hasattr(track, "encoded") else None,
     )
+
+
+def from_track_data(data: dict) -> TrackInfo:
+    """Build an unresolved placeholder from a stored playlist track's data."""
+    info = data.get("info", data)
+    return make_track(
+        title=info.get("title") or "Unknown",
+        author=info.get("author") or info.get("artist") or "Unknown",
+        uri=info.get("uri") or "",
+        thumbnail=info.get("thumbnail") or info.get("artworkUrl"),
+        duration=info.get("length") or info.get("duration") or 0,
+        source=data,
+    )
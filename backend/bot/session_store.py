@@ -0,0 +1,466 @@
+"""
+session_store.py — Durable GuildSession snapshots for warm restarts.
+
+Sessions live in memory (session_queue), so a restart or deploy used to
+wipe every guild's queue, position, repeat and shuffle state even though
+Lavalink itself could have carried on. Now:
+
+  - Every SESSION_SNAPSHOT_INTERVAL seconds, sessions that changed since
+    their last snapshot are written to a local SQLite file. A guild's small
+    playback state (index, modes, voice/text channel, position, volume) is
+    one row and its track list is one row per TrackList chunk, so a playing
+    guild refreshes only its state row, and a queue change rewrites only
+    the chunks it touched (TrackList.chunk_stamps).
+  - Chunks are stored as laid out, without drawing a pending lazy shuffle:
+    the state row keeps the shuffle's undrawn range (pending_shuffle), and
+    a restored queue continues drawing from where it left off.
+  - Each chunk row is compact: each distinct track once, the entries as
+    indices into that table, then msgpack (when installed, JSON otherwise)
+    and zlib.
+  - On shutdown everything is flushed, with final playback positions, before
+    the bot disconnects; clearing a session (stop, leave, auto-disconnect)
+    deletes its snapshot.
+  - On startup only the raw rows are read. A session is decoded when the
+    Music cog resumes it (see Music._resume_sessions): it rejoins the voice
+    channel and continues the current track from its saved position,
+    reusing the saved encoded tracks so nothing has to be searched again.
+
+SQLite work, and packing/compressing chunks, runs on a single worker
+thread so it never blocks the event loop; the loop only copies the
+(entry ID, track) pairs of chunks that changed.
+
+Env vars:
+    SESSION_SNAPSHOT_PATH       SQLite file for snapshots; empty disables (default: ./backend/data/sessions.db)
+    SESSION_SNAPSHOT_INTERVAL   Seconds between incremental snapshots (default: 5)
+    SESSION_RESUME_MAX_AGE      Snapshots older than this many seconds are not resumed (default: 300)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from backend.bot import session_queue as sq
+from backend.utils.env import env_number
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_MSGPACK = b"m"
+_FORMAT_JSON = b"j"
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+def _pack(value) -> bytes:
+    if msgpack is not None:
+        raw = _FORMAT_MSGPACK + msgpack.packb(value, use_bin_type=True)
+    else:
+        raw = _FORMAT_JSON + json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw)
+
+
+def _unpack(blob: bytes):
+    raw = zlib.decompress(blob)
+    if raw[:1] == _FORMAT_MSGPACK:
+        if msgpack is None:
+            raise ValueError("snapshot was written with msgpack, which is not installed")
+        return msgpack.unpackb(raw[1:], raw=False)
+    return json.loads(raw[1:].decode("utf-8"))
+
+
+def _encode_chunk(entries: list[tuple[int, sq.TrackInfo]]) -> bytes:
+    # Each distinct track once; the entries refer to it by index
+    table: list[list] = []
+    slot_of: dict[int, int] = {}
+    order: list[int] = []
+    for _entry_id, track in entries:
+        slot = slot_of.get(id(track))
+        if slot is None:
+            slot = slot_of[id(track)] = len(table)
+            table.append([
+                track.title, track.author, track.uri, track.thumbnail,
+                track.duration, track.encoded, track.source,
+            ])
+        order.append(slot)
+    return _pack({"t": table, "q": order, "i": [entry_id for entry_id, _track in entries]})
+
+
+def _decode_tracks(session: sq.GuildSession, state: dict, chunks: dict[int, bytes], original: Optional[bytes]):
+    # Saved entry IDs belong to the old process; map them to the new ones
+    new_id: dict[int, int] = {}
+    for key in state["chunks"]:
+        data = _unpack(chunks[key])
+        tracks = [
+            sq.make_track(title, author, uri, thumbnail, duration, encoded, source)
+            for title, author, uri, thumbnail, duration, encoded, source in data["t"]
+        ]
+        for saved_id, slot in zip(data["i"], data["q"]):
+            new_id[saved_id] = session.tracks.append(tracks[slot])
+    if original is not None:
+        session._original_ids = array("I", (new_id[e] for e in _unpack(original) if e in new_id))
+    session.tracks.resume_shuffle(*state.get("lazy", (0, 0)))
+
+
+def _state(session: sq.GuildSession, guild=None, text_channel_id: Optional[int] = None) -> dict:
+    player = getattr(guild, "voice_client", None) if guild is not None else None
+    channel = getattr(player, "channel", None)
+    return {
+        "index": session.current_index,
+        "repeat": session.repeat_mode,
+        "shuffle": session.shuffle_enabled,
+        "autoplay": session.autoplay_enabled,
+        "voice_channel_id": channel.id if channel is not None else None,
+        "text_channel_id": text_channel_id,
+        "position": int(getattr(player, "position", 0) or 0) if player is not None else 0,
+        "paused": bool(getattr(player, "paused", False)) if player is not None else False,
+        "volume": getattr(player, "volume", None) if player is not None else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+class SessionStore:
+    def __init__(self, path: str, interval: float, max_age: float):
+        self.path = path
+        self.interval = max(0.5, interval)
+        self.max_age = max_age
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._bot = None
+        self._closed = False
+        # guild id -> (state blob, {chunk key: blob}, original order blob, saved_at)
+        # read at startup, decoded on resume
+        self._stored: dict[int, tuple[bytes, dict[int, bytes], Optional[bytes], float]] = {}
+        # guild id -> (id(tracks), {chunk key: stamp}) of the last stored chunks
+        self._chunks_written: dict[int, tuple[int, dict[int, int]]] = {}
+        # guild id -> copy of the last stored _original_ids
+        self._original_written: dict[int, array] = {}
+        # guild id -> last stored state dict
+        self._state_written: dict[int, dict] = {}
+
+        self.snapshots = 0
+        self.chunk_writes = 0
+        self.restored = 0
+        self.errors = 0
+
+    # -- worker thread ----------------------------------------------------- #
+
+    def _open(self) -> dict[int, tuple[bytes, dict[int, bytes], Optional[bytes], float]]:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_state ("
+            "guild_id INTEGER PRIMARY KEY, state BLOB NOT NULL, saved_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_chunks ("
+            "guild_id INTEGER NOT NULL, chunk INTEGER NOT NULL, entries BLOB NOT NULL, "
+            "PRIMARY KEY (guild_id, chunk))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_original ("
+            "guild_id INTEGER PRIMARY KEY, ids BLOB NOT NULL)"
+        )
+        # Whole-queue rows of the previous format; those snapshots can't be resumed
+        conn.execute("DROP TABLE IF EXISTS session_tracks")
+        conn.commit()
+        self._conn = conn
+        chunks: dict[int, dict[int, bytes]] = {}
+        for guild_id, key, blob in conn.execute("SELECT guild_id, chunk, entries FROM session_chunks"):
+            chunks.setdefault(guild_id, {})[key] = blob
+        original = dict(conn.execute("SELECT guild_id, ids FROM session_original").fetchall())
+        rows = conn.execute("SELECT guild_id, state, saved_at FROM session_state").fetchall()
+        return {
+            guild_id: (state, chunks.get(guild_id, {}), original.get(guild_id), saved_at)
+            for guild_id, state, saved_at in rows
+        }
+
+    def _write(self, states: list[tuple[int, bytes]], chunks: list[tuple]):
+        # Changed chunks arrive as copied (entry id, track) pairs and are
+        # packed here rather than on the event loop; TrackInfo is immutable
+        packed = [
+            (guild_id, fresh, [(guild_id, key, _encode_chunk(entries)) for key, entries in dirty],
+             [(guild_id, key) for key in gone],
+             _pack(original.tolist()) if original is not None else None)
+            for guild_id, fresh, dirty, gone, original in chunks
+        ]
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO session_state (guild_id, state, saved_at) VALUES (?, ?, ?)",
+                [(guild_id, blob, now) for guild_id, blob in states],
+            )
+            for guild_id, fresh, rows, gone, original in packed:
+                if fresh:
+                    # First write of this track list; drop rows of any earlier one
+                    self._conn.execute("DELETE FROM session_chunks WHERE guild_id = ?", (guild_id,))
+                self._conn.executemany("DELETE FROM session_chunks WHERE guild_id = ? AND chunk = ?", gone)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO session_chunks (guild_id, chunk, entries) VALUES (?, ?, ?)",
+                    rows,
+                )
+                if original is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO session_original (guild_id, ids) VALUES (?, ?)",
+                        (guild_id, original),
+                    )
+
+    def _delete(self, guild_id: int):
+        with self._conn:
+            self._conn.execute("DELETE FROM session_state WHERE guild_id = ?", (guild_id,))
+            self._conn.execute("DELETE FROM session_chunks WHERE guild_id = ?", (guild_id,))
+            self._conn.execute("DELETE FROM session_original WHERE guild_id = ?", (guild_id,))
+
+    # -- lifecycle --------------------------------------------------------- #
+
+    async def start(self, bot):
+        self._bot = bot
+        loop = asyncio.get_running_loop()
+        try:
+            self._stored = await loop.run_in_executor(self._executor, self._open)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Session snapshots disabled, could not open {self.path}: {e}")
+            return
+        if self._stored:
+            logger.info(f"Found {len(self._stored)} session snapshot(s) to resume.")
+        self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Session snapshot failed: {e}")
+
+    async def flush(self):
+        """Write every session whose state or track list changed."""
+        if self._conn is None:
+            return
+        music_cog = self._bot.get_cog("Music") if self._bot is not None else None
+        contexts = getattr(music_cog, "guild_contexts", {}) if music_cog is not None else {}
+
+        states: list[tuple[int, bytes]] = []
+        chunks: list[tuple] = []
+        state_marks: dict[int, dict] = {}
+        chunk_marks: dict[int, tuple[int, dict[int, int]]] = {}
+        original_marks: dict[int, array] = {}
+        for session in sq.active():
+            guild_id = session.guild_id
+            if not session.tracks or guild_id in self._stored:
+                # Nothing queued, or not resumed yet (don't overwrite its snapshot)
+                continue
+            guild = self._bot.get_guild(guild_id) if self._bot is not None else None
+            state = _state(session, guild, contexts.get(guild_id))
+
+            # Chunks as laid out plus the undrawn range: a pending shuffle is
+            # saved as is, never drawn here
+            tracks = session.tracks
+            stamps = tracks.chunk_stamps()
+            state["chunks"] = [key for key, _stamp in stamps]
+            state["lazy"] = list(tracks.pending_shuffle)
+            written = self._chunks_written.get(guild_id)
+            fresh = written is None or written[0] != id(tracks)
+            previous = {} if fresh else written[1]
+            # Only chunks touched since the last write are copied; _write packs them
+            dirty = [
+                (key, tracks.chunk_entries(ci))
+                for ci, (key, stamp) in enumerate(stamps) if previous.get(key) != stamp
+            ]
+            keys = set(state["chunks"])
+            gone = [key for key in previous if key not in keys]
+            original = None
+            if fresh or self._original_written.get(guild_id) != session._original_ids:
+                original = original_marks[guild_id] = array("I", session._original_ids)
+            tracks_changed = fresh or bool(dirty) or bool(gone) or original is not None
+            if tracks_changed:
+                chunks.append((guild_id, fresh, dirty, gone, original))
+                chunk_marks[guild_id] = (id(tracks), dict(stamps))
+            if tracks_changed or self._state_written.get(guild_id) != state:
+                states.append((guild_id, _pack(state)))
+                state_marks[guild_id] = state
+            await asyncio.sleep(0)
+
+        # Skip guilds cleared while we were collecting; their delete is already queued
+        live = {session.guild_id for session in sq.active()}
+        states = [row for row in states if row[0] in live]
+        chunks = [row for row in chunks if row[0] in live]
+        if not states and not chunks:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._write, states, chunks)
+        self._state_written.update(state_marks)
+        self._chunks_written.update(chunk_marks)
+        self._original_written.update(original_marks)
+        self.snapshots += len(states)
+        self.chunk_writes += sum(len(row[2]) for row in chunks)
+
+    async def close(self):
+        """Final snapshot (with playback positions), then stop writing; call on
+        shutdown before the bot leaves its voice channels."""
+        if self._closed:
+            return
+        if self._task is not None:
+            self._task.cancel()
+        try:
+            await self.flush()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Final session snapshot failed: {e}")
+        self._closed = True
+        if self._conn is not None:
+            # Queued after any pending writes/deletes, which still need the connection
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    # -- sessions ---------------------------------------------------------- #
+
+    def forget(self, guild_id: int):
+        """Drop a guild's snapshot (its session was cleared on purpose)."""
+        if self._closed:
+            # Shutting down: leaving voice channels must not erase the snapshots
+            return
+        self._stored.pop(guild_id, None)
+        self._chunks_written.pop(guild_id, None)
+        self._original_written.pop(guild_id, None)
+        self._state_written.pop(guild_id, None)
+        if self._conn is not None:
+            self._executor.submit(self._delete, guild_id)
+
+    def resumable(self) -> list[tuple[int, dict]]:
+        """(guild id, state) of fresh snapshots that were in a voice channel."""
+        now = time.time()
+        found = []
+        for guild_id, (state_blob, chunks, _original, saved_at) in list(self._stored.items()):
+            if not chunks or (self.max_age > 0 and now - saved_at > self.max_age):
+                self.forget(guild_id)
+                continue
+            try:
+                state = _unpack(state_blob)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Dropping unreadable session snapshot for guild {guild_id}: {e}")
+                self.forget(guild_id)
+                continue
+            if state.get("voice_channel_id"):
+                found.append((guild_id, state))
+            else:
+                # Not in a voice channel, so nothing to rejoin; don't let it
+                # block flush() from snapshotting the guild again
+                self.forget(guild_id)
+        return found
+
+    def forget_unresumed(self):
+        """Drop every snapshot the resume pass didn't restore, so those guilds
+        are snapshotted normally again."""
+        for guild_id in list(self._stored):
+            self.forget(guild_id)
+
+    def restore(self, guild_id: int) -> Optional[sq.GuildSession]:
+        """Rebuild the guild's session from its snapshot (decoded only now)."""
+        stored = self._stored.pop(guild_id, None)
+        if stored is None or not stored[1]:
+            return None
+        state_blob, chunks, original, _saved_at = stored
+        session = sq.get(guild_id)
+        try:
+            state = _unpack(state_blob)
+            session.clear()
+            _decode_tracks(session, state, chunks, original)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Could not restore session for guild {guild_id}: {e}")
+            session.clear()
+            return None
+        session.repeat_mode = state.get("repeat", "off")
+        session.shuffle_enabled = bool(state.get("shuffle")) and bool(session._original_ids)
+        session.autoplay_enabled = bool(state.get("autoplay"))
+        session.set_index(state.get("index", -1))
+        self.restored += 1
+        return session
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._conn is not None,
+            "backend": "msgpack" if msgpack is not None else "json",
+            "pending_resume": len(self._stored),
+            "snapshots": self.snapshots,
+            "chunk_writes": self.chunk_writes,
+            "restored": self.restored,
+            "errors": self.errors,
+        }
+
+
+_store: Optional[SessionStore] = None
+
+
+def get_store() -> Optional[SessionStore]:
+    """The process-wide store, or None if SESSION_SNAPSHOT_PATH is empty."""
+    global _store
+    if _store is None:
+        path = os.getenv("SESSION_SNAPSHOT_PATH", "./backend/data/sessions.db").strip()
+        if not path:
+            return None
+        _store = SessionStore(
+            path,
+            interval=env_number("SESSION_SNAPSHOT_INTERVAL", 5.0),
+            max_age=env_number("SESSION_RESUME_MAX_AGE", 300.0),
+        )
+    return _store
+
+
+async def start(bot):
+    store = get_store()
+    if store is not None:
+        await store.start(bot)
+
+
+async def close():
+    if _store is not None:
+        await _store.close()
+
+
+def forget(guild_id: int):
+    if _store is not None:
+        _store.forget(guild_id)
+
+
+def resumable() -> list[tuple[int, dict]]:
+    return _store.resumable() if _store is not None else []
+
+
+def forget_unresumed():
+    if _store is not None:
+        _store.forget_unresumed()
+
+
+def restore(guild_id: int) -> Optional[sq.GuildSession]:
+    return _store.restore(guild_id) if _store is not None else None
+
+
+def stats() -> dict:
+    return _store.stats() if _store is not None else {"enabled": False}
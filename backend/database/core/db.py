@@ -47,6 +47,33 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+async def upsert(session: AsyncSession, model, rows: list[dict], key: str) -> None:
+    """Insert `rows` into `model`'s table in one statement, updating the other
+    columns of any row whose unique `key` column already exists. Unlike a
+    SELECT followed by INSERT, concurrent writers of the same key can't race
+    into a unique-constraint error."""
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(model).values(rows)
+        stmt = stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in rows[0] if column != key})
+    elif dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={column: stmt.excluded[column] for column in rows[0] if column != key},
+        )
+    else:
+        raise NotImplementedError(f"upsert is not supported for the {dialect} dialect")
+    await session.execute(stmt)
+
+
 async def _fetch_table_map(conn, table, primary_keys: list[str]) -> dict[tuple, dict]:
     result = await conn.execute(select(table))
     rows = result.mappings().all()
@@ -115,6 +142,8 @@ async def _sync_dual_databases() -> None:
         • Outage data survives (NeonDB → MySQL in Phase 1).
         • MySQL is the canonical truth for everything else.
         • Deletes propagate correctly from MySQL to NeonDB.
+
+    Tables marked with info={"skip_sync": True} (rebuildable caches) are left alone.
     """
     if neon_engine is None or mysql_engine is None:
         return
@@ -124,6 +153,10 @@ async def _sync_dual_databases() -> None:
     async with neon_engine.begin() as neon_conn:
         async with mysql_engine.begin() as mysql_conn:
             for table in Base.metadata.sorted_tables:
+                if table.info.get("skip_sync"):
+                    # Cache tables are rebuilt on demand; copying them both ways is wasted work
+                    logger.info("Skipping sync for cache table %s.", table.name)
+                    continue
                 primary_keys = [col.name for col in table.primary_key.columns]
                 if not primary_keys:
                     logger.warning("Skipping sync for table %s: no primary key.", table.name)
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, BigInteger, String, Boolean, JSON, Column
+from sqlalchemy import ForeignKey, BigInteger, String, Boolean, JSON, Column, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from backend.database.core.db import Base
 
@@ -63,3 +63,31 @@ class AllowedGuild(Base):
     guild_id: Mapped[int] = mapped_column(BigInteger, unique=True)
     name: Mapped[str] = mapped_column(String(255), nullable=True) # Optional, just for display
     added_at: Mapped[str] = mapped_column(String(255), nullable=True)
+
+
+class ResolvedTrack(Base):
+    __tablename__ = "resolved_tracks"
+    # Rebuildable cache: each database keeps its own, it isn't mirrored at startup
+    __table_args__ = {"info": {"skip_sync": True}}
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    lookup_key: Mapped[str] = mapped_column(String(64), unique=True, index=True) # sha1 of normalised (title, author, uri)
+    title: Mapped[str] = mapped_column(String(512), nullable=True)
+    author: Mapped[str] = mapped_column(String(512), nullable=True)
+    uri: Mapped[str] = mapped_column(String(1024), nullable=True)
+    encoded: Mapped[str] = mapped_column(Text) # Lavalink encoded track
+    track_data: Mapped[dict] = mapped_column(JSON, nullable=True) # Full Lavalink track payload, rebuilt without a search
+    resolved_at: Mapped[str] = mapped_column(String(255), nullable=True) # ISO Timestamp
+
+
+class LastfmSimilar(Base):
+    __tablename__ = "lastfm_similar"
+    # Rebuildable cache, not mirrored between databases (see _sync_dual_databases)
+    __table_args__ = {"info": {"skip_sync": True}}
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    lookup_key: Mapped[str] = mapped_column(String(64), unique=True, index=True) # sha1 of normalised (artist, track)
+    artist: Mapped[str] = mapped_column(String(512), nullable=True)
+    track: Mapped[str] = mapped_column(String(512), nullable=True)
+    similar: Mapped[list] = mapped_column(JSON) # [{"title", "artist", "match"}, ...] as returned by track.getsimilar
+    fetched_at: Mapped[str] = mapped_column(String(255), nullable=True) # ISO Timestamp
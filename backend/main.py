@@ -16,12 +16,18 @@ logger = logging.getLogger(__name__)
 # Import Bot and Database
 from backend.bot.core.bot import bot
 from backend.database.core.db import init_db
+from backend.bot import session_store
+from backend.utils import cooccurrence, lastfm
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up FastAPI and Discord Bot...")
     await init_db()
+    # Autoplay's local recommender; built in the background from playlist_tracks
+    asyncio.create_task(cooccurrence.build())
+    # Queue snapshots from before a restart; the Music cog resumes them once Lavalink is up
+    await session_store.start(bot)
     asyncio.create_task(bot.start(os.getenv("DISCORD_TOKEN")))
     
     if os.getenv("VOICE_MODULE_ENABLED", "false").lower() == "true":
@@ -35,7 +41,12 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     logger.info("Shutting down...")
+    # Snapshot sessions before the bot leaves voice (which would clear them)
+    await session_store.close()
+    if bot.listener_bot:
+        await bot.listener_bot.close()
     await bot.close()
+    await lastfm.close()
 
 app = FastAPI(
     title="Discord Music Bot Impl",
@@ -0,0 +1,238 @@
+"""
+Offline replay benchmark for the voice pipeline.
+
+Replays recorded audio through FlakeAudioSink + SpeechRecognizer (VAD, ring
+buffers, decode executor, Vosk) without a Discord connection and reports
+throughput, latency percentiles, per-stage histograms and memory.
+
+    python backend/scripts/voice_benchmark.py samples/*.wav --speakers 4 --repeat 5
+
+Inputs are WAV files (any rate / channel count / 16-bit) or raw .pcm files,
+which are taken as Discord's 48 kHz 16-bit stereo. Each file is one
+utterance. The usual VOSK_* / VOICE_* env vars apply. A file that VAD drops
+entirely, or that isn't handled within its length + silence + --margin, is
+counted as dropped rather than timed.
+"""
+import argparse
+import asyncio
+import audioop
+import json
+import os
+import statistics
+import sys
+import time
+import wave
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.append(os.getcwd())
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from backend.voice_module.audio_sink import FlakeAudioSink
+from backend.voice_module import metrics, model_pool, vad
+from backend.voice_module.decode_executor import get_executor
+
+DISCORD_RATE = 48000
+BYTES_PER_SECOND = DISCORD_RATE * 4
+FRAME_BYTES = 3840  # 20 ms of 48 kHz 16-bit stereo
+
+
+def load_pcm(path: str) -> bytes:
+    """Return the file as Discord-format PCM (48 kHz, 16-bit, stereo)."""
+    if not path.lower().endswith(".wav"):
+        with open(path, "rb") as f:
+            return f.read()
+
+    with wave.open(path, "rb") as w:
+        width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+        pcm = w.readframes(w.getnframes())
+    if width != 2:
+        pcm = audioop.lin2lin(pcm, width, 2)
+    if channels == 2:
+        pcm = audioop.tomono(pcm, 2, 0.5, 0.5)
+    elif channels != 1:
+        raise ValueError(f"{path}: unsupported channel count {channels}")
+    if rate != DISCORD_RATE:
+        pcm, _state = audioop.ratecv(pcm, 2, 1, rate, DISCORD_RATE, None)
+    return audioop.tostereo(pcm, 2, 1, 1)
+
+
+class Clip:
+    """One replay of a file by one speaker. Done once it has been fully fed and
+    every utterance that started while feeding it has been handled."""
+
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.fed = False
+        self.utterances = 0
+        self.pending = 0
+
+    def settle(self):
+        if self.fed and not self.pending:
+            self.event.set()
+
+    def utterance_done(self, _task=None):
+        self.pending -= 1
+        self.settle()
+
+
+class BenchSink(FlakeAudioSink):
+    """Attributes each utterance to the clip that was being fed when it started,
+    so a pause inside a clip can't signal the next one."""
+
+    def __init__(self, callback, guild_id: int = 0):
+        super().__init__(callback, guild_id=guild_id)
+        # Clip currently being fed, per speaker
+        self.feeding: dict[int, Clip] = {}
+        # Clip the speaker's open utterance belongs to
+        self.speaking: dict[int, Clip] = {}
+
+    def utterance_started(self, user_id: int):
+        clip = self.speaking[user_id] = self.feeding[user_id]
+        clip.utterances += 1
+        clip.pending += 1
+
+    def utterance_ended(self, user_id: int, task: asyncio.Task | None):
+        clip = self.speaking.pop(user_id)
+        if task is None:
+            clip.utterance_done()
+        else:
+            task.add_done_callback(clip.utterance_done)
+
+
+def _feed(sink: BenchSink, user, pcm: bytes, realtime: bool):
+    # Runs on a worker thread, like voice_recv's packet router
+    started = time.monotonic()
+    for i, offset in enumerate(range(0, len(pcm) - FRAME_BYTES + 1, FRAME_BYTES)):
+        if realtime:
+            delay = started + i * 0.02 - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        sink.write(user, SimpleNamespace(pcm=pcm[offset:offset + FRAME_BYTES]))
+
+
+async def run(args) -> dict:
+    clips = [(path, load_pcm(path)) for path in args.files]
+    audio_seconds = sum(len(pcm) for _path, pcm in clips) / BYTES_PER_SECOND
+
+    transcripts: list[tuple[int, str]] = []
+
+    async def on_transcript(user_id, transcript):
+        transcripts.append((user_id, transcript))
+
+    sink = BenchSink(on_transcript, guild_id=0)
+    sink.start(asyncio.get_running_loop())
+    sink.silence_threshold = args.silence
+    sink.hotword_silence_threshold = min(sink.hotword_silence_threshold, args.silence)
+
+    # Load the model up front so it isn't counted as utterance latency
+    rss_start = model_pool._rss_mb()
+    await asyncio.to_thread(model_pool.get_model)
+    rss_model = model_pool._rss_mb()
+    metrics.reset()
+
+    latencies: list[float] = []
+    dropped = 0
+
+    async def speaker(n: int):
+        nonlocal dropped
+        user = SimpleNamespace(id=n + 1, bot=False)
+        for _ in range(args.repeat):
+            for _path, pcm in clips:
+                clip = sink.feeding[user.id] = Clip()
+                await asyncio.to_thread(_feed, sink, user, pcm, args.realtime)
+                fed_at = time.monotonic()
+                # Frames reach the sink through the loop ahead of this resume, so
+                # if VAD kept none of them no utterance is pending and this is done
+                clip.fed = True
+                clip.settle()
+                timeout = len(pcm) / BYTES_PER_SECOND + args.silence + args.margin
+                try:
+                    await asyncio.wait_for(clip.event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    dropped += 1
+                    continue
+                if not clip.utterances:
+                    dropped += 1
+                    continue
+                # Processing latency: end of audio -> handled, minus the silence wait
+                latencies.append(max(0.0, time.monotonic() - fed_at - args.silence))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(speaker(n) for n in range(args.speakers)))
+    wall = time.perf_counter() - started
+    sink.cleanup()
+
+    utterances = len(latencies)
+    ordered = sorted(latencies)
+
+    def pct(q: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    rss_end = model_pool._rss_mb()
+    return {
+        "utterances": utterances,
+        "transcribed": len(transcripts),
+        "dropped": dropped,
+        "audio_seconds": round(audio_seconds * args.repeat * args.speakers, 2),
+        "wall_seconds": round(wall, 3),
+        "utterances_per_sec": round(utterances / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(pct(0.50), 2),
+            "p99": round(pct(0.99), 2),
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+        "memory_mb": {
+            "rss_start": rss_start,
+            "rss_after_model": rss_model,
+            "rss_end": rss_end,
+        },
+        "stages": metrics.stats(),
+        "decode": get_executor().stats(),
+        "vad": vad.stats(),
+        "samples": [t for _u, t in transcripts[:5]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded audio through the voice pipeline.")
+    parser.add_argument("files", nargs="+", help="WAV or raw 48 kHz stereo s16le .pcm files, one utterance each")
+    parser.add_argument("--speakers", type=int, default=1, help="concurrent simulated speakers (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="times each speaker replays every file (default: 3)")
+    parser.add_argument("--silence", type=float, default=0.3,
+                        help="end-of-utterance silence threshold in seconds (production uses 2.0)")
+    parser.add_argument("--margin", type=float, default=30.0,
+                        help="seconds past clip length + silence before a clip counts as dropped (default: 30)")
+    parser.add_argument("--realtime", action="store_true", help="pace frames at 20 ms like a live call")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    lat = report["latency_ms"]
+    print(f"Utterances:       {report['utterances']} ({report['transcribed']} transcribed, {report['dropped']} dropped)")
+    print(f"Audio replayed:   {report['audio_seconds']} s in {report['wall_seconds']} s")
+    print(f"Throughput:       {report['utterances_per_sec']} utterances/sec")
+    print(f"Latency (ms):     p50 {lat['p50']}  p99 {lat['p99']}  mean {lat['mean']}  max {lat['max']}")
+    mem = report["memory_mb"]
+    print(f"RSS (MB):         start {mem['rss_start']}  model {mem['rss_after_model']}  end {mem['rss_end']}")
+    print("Stages (ms):")
+    for stage, hist in report["stages"].items():
+        print(f"  {stage:<24} n={hist['count']:<6} mean {hist['mean_ms']:<8} p50 {hist['p50_ms']:<8} p99 {hist['p99_ms']:<8} max {hist['max_ms']}")
+    if report["samples"]:
+        print("Sample transcripts:")
+        for text in report["samples"]:
+            print(f"  {text}")
+
+
+if __name__ == "__main__":
+    main()
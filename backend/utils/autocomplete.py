@@ -0,0 +1,207 @@
+"""
+autocomplete.py — Shared track autocomplete for /play and /playlist add.
+
+Discord sends an autocomplete request on every keystroke and drops any
+answer that takes longer than 3 seconds. Both commands now go through
+`suggest()`, which:
+
+  - Keeps a bounded LRU (with TTL) of suggestions per normalised input.
+  - Reuses results for a prefix: while typing "never gonna", the results
+    for "never" are filtered locally, and only if too few still match does
+    a new search run.
+  - Debounces per user: a request waits AUTOCOMPLETE_DEBOUNCE seconds
+    before searching, and a newer keystroke from the same user supersedes
+    it. A superseded request stops waiting and answers from local results
+    at once; any lookup already sent to Lavalink carries on only to fill
+    the caches.
+  - Answers within AUTOCOMPLETE_DEADLINE seconds no matter what, falling
+    back to whatever the prefix cache has.
+
+Env vars:
+    AUTOCOMPLETE_CACHE_SIZE   Cached inputs (default: 256)
+    AUTOCOMPLETE_CACHE_TTL    Seconds suggestions stay cached (default: 300)
+    AUTOCOMPLETE_DEBOUNCE     Seconds to wait for the user to stop typing (default: 0.3)
+    AUTOCOMPLETE_DEADLINE     Seconds before answering with what we have (default: 2.5)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import wavelink
+
+from backend.utils import track_search
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+# Discord shows at most 25 choices
+MAX_CHOICES = 25
+MIN_QUERY_LENGTH = 3
+# A cached prefix is good enough if at least this many results still match
+_MIN_LOCAL_MATCHES = 5
+
+
+def _normalise(query: str) -> str:
+    return " ".join(query.split()).lower()
+
+
+def _choices(result) -> list[tuple[str, str]]:
+    track_list = result.tracks if isinstance(result, wavelink.Playlist) else result
+    choices = []
+    seen = set()
+    for track in track_list:
+        name = f"{track.title[:60]} - {track.author[:30]}"
+        if name not in seen:
+            seen.add(name)
+            # use URI if it fits in 100 chars, else use the name itself
+            val = track.uri if track.uri and len(track.uri) <= 100 else name
+            choices.append((name, val))
+        if len(choices) >= MAX_CHOICES:
+            break
+    return choices
+
+
+def _filter(choices: list[tuple[str, str]], query: str) -> list[tuple[str, str]]:
+    words = query.split()
+    return [c for c in choices if all(word in c[0].lower() for word in words)]
+
+
+class AutocompleteService:
+    def __init__(self, max_size: int = 256, ttl: float = 300.0, debounce: float = 0.3, deadline: float = 2.5):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.debounce = max(0.0, debounce)
+        self.deadline = max(0.1, deadline)
+        # normalised input -> (expires_at, [(name, value), ...])
+        self._entries: OrderedDict[str, tuple[float, list[tuple[str, str]]]] = OrderedDict()
+        # user id -> event set when that user's newer keystroke arrives
+        self._latest: dict[int, asyncio.Event] = {}
+
+        self.hits = 0
+        self.prefix_hits = 0
+        self.searches = 0
+        self.superseded = 0
+        self.deadline_misses = 0
+
+    def _get(self, key: str) -> Optional[list[tuple[str, str]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[0]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: str, choices: list[tuple[str, str]]):
+        self._entries[key] = (time.monotonic() + self.ttl, choices)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _from_prefix(self, key: str) -> Optional[list[tuple[str, str]]]:
+        """Locally filtered results of the longest cached prefix of `key`."""
+        for end in range(len(key) - 1, MIN_QUERY_LENGTH - 1, -1):
+            cached = self._get(key[:end].rstrip())
+            if cached is not None:
+                return _filter(cached, key)
+        return None
+
+    async def _search(self, key: str) -> list[tuple[str, str]]:
+        self.searches += 1
+        result = await track_search.search(f"ytmsearch:{key}")
+        choices = _choices(result) if result else []
+        self._put(key, choices)
+        return choices
+
+    async def suggest(self, query: str, user_id: Optional[int] = None) -> list[tuple[str, str]]:
+        """(name, value) suggestions for `query`, always within the deadline."""
+        started = time.monotonic()
+        key = _normalise(query or "")
+        if len(key) < MIN_QUERY_LENGTH:
+            return []
+
+        cached = self._get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        local = self._from_prefix(key)
+        if local is not None and len(local) >= _MIN_LOCAL_MATCHES:
+            self.prefix_hits += 1
+            return local
+
+        superseded = asyncio.Event()
+        if user_id is not None:
+            previous = self._latest.get(user_id)
+            if previous is not None:
+                previous.set()
+            self._latest[user_id] = superseded
+
+        waiter = asyncio.create_task(superseded.wait())
+        try:
+            if self.debounce:
+                await asyncio.wait({waiter}, timeout=self.debounce)
+            if superseded.is_set():
+                self.superseded += 1
+                return local or []
+
+            # Runs on its own so the cache still fills if we stop waiting
+            search = asyncio.create_task(self._search(key))
+            search.add_done_callback(lambda t: t.cancelled() or t.exception())
+            remaining = self.deadline - (time.monotonic() - started)
+            done, _ = await asyncio.wait(
+                {search, waiter}, timeout=max(0.0, remaining), return_when=asyncio.FIRST_COMPLETED
+            )
+            if search in done:
+                if search.exception() is not None:
+                    logger.error(f"Autocomplete search failed: {search.exception()}")
+                    return local or []
+                return search.result()
+            if waiter in done:
+                self.superseded += 1
+            else:
+                self.deadline_misses += 1
+            return local or []
+        finally:
+            waiter.cancel()
+            if user_id is not None and self._latest.get(user_id) is superseded:
+                del self._latest[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "prefix_hits": self.prefix_hits,
+            "searches": self.searches,
+            "superseded": self.superseded,
+            "deadline_misses": self.deadline_misses,
+        }
+
+
+_service: Optional[AutocompleteService] = None
+
+
+def get_service() -> AutocompleteService:
+    """Return the process-wide autocomplete service, creating it from env on first use."""
+    global _service
+    if _service is None:
+        _service = AutocompleteService(
+            max_size=env_number("AUTOCOMPLETE_CACHE_SIZE", 256),
+            ttl=env_number("AUTOCOMPLETE_CACHE_TTL", 300.0),
+            debounce=env_number("AUTOCOMPLETE_DEBOUNCE", 0.3),
+            deadline=env_number("AUTOCOMPLETE_DEADLINE", 2.5),
+        )
+    return _service
+
+
+async def suggest(query: str, user_id: Optional[int] = None) -> list[tuple[str, str]]:
+    return await get_service().suggest(query, user_id)
+
+
+def stats() -> dict:
+    return get_service().stats()
@@ -0,0 +1,265 @@
+"""
+cooccurrence.py — Local item-item recommender built from our own playlists.
+
+Without Last.fm, autoplay fell back to a `ytmsearch:... mix` search on
+every transition. Users' playlists (Liked Songs included) are a better
+signal: two tracks that keep showing up near each other in playlists are
+probably good neighbours. This module keeps an in-memory item-item index
+over `playlist_tracks`:
+
+  - Items are keyed by normalised (title, author) so the same song saved
+    from different sources lines up.
+  - Within a playlist, each track co-occurs with the next
+    COOCCURRENCE_WINDOW tracks (bounding the cost of huge playlists);
+    neighbours are scored count / sqrt(freq_a * freq_b), so ubiquitous
+    tracks don't dominate.
+  - The index is built once at startup. After that, SQLAlchemy insert and
+    delete events on PlaylistTrack and Playlist mark the affected playlists
+    dirty, and only those playlists' contributions are recomputed before the
+    next recommendation. Bulk deletes that skip the ORM call `mark_dirty()`.
+
+Recommendations come back as stored track_data, which track_store resolves
+from its table; in the common case autoplay needs no external call at all.
+
+Env vars:
+    COOCCURRENCE_WINDOW   Neighbouring playlist positions counted as co-occurring (default: 50)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import random
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select
+
+from backend.database.core import db
+from backend.database.models.models import Playlist, PlaylistTrack
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+
+def _window() -> int:
+    return max(1, env_number("COOCCURRENCE_WINDOW", 50))
+
+
+def item_key(title: str, author: str) -> str:
+    return "\x1f".join(" ".join((part or "").split()).lower() for part in (title, author))
+
+
+def _title_key(key: str) -> str:
+    return key.split("\x1f", 1)[0]
+
+
+def _data_key(data: dict) -> Optional[str]:
+    info = data.get("info", data)
+    title = info.get("title")
+    if not title:
+        return None
+    return item_key(title, info.get("author") or info.get("artist") or "")
+
+
+class CooccurrenceIndex:
+    def __init__(self, window: int):
+        self.window = window
+        # key -> stored track_data (first one seen)
+        self.items: dict[str, dict] = {}
+        # playlist id -> its distinct item keys, in playlist order
+        self.playlists: dict[int, list[str]] = {}
+        # key -> number of playlists containing it
+        self.freq: dict[str, int] = defaultdict(int)
+        # key -> {neighbour key -> co-occurrence count}
+        self.pairs: dict[str, dict[str, int]] = defaultdict(dict)
+        # normalised title -> keys, for tracks whose author was written differently
+        self.by_title: dict[str, set[str]] = defaultdict(set)
+
+    def _apply(self, keys: list[str], sign: int):
+        for i, a in enumerate(keys):
+            self.freq[a] += sign
+            if self.freq[a] <= 0:
+                self._forget(a)
+            for b in keys[i + 1:i + 1 + self.window]:
+                for x, y in ((a, b), (b, a)):
+                    count = self.pairs[x].get(y, 0) + sign
+                    if count > 0:
+                        self.pairs[x][y] = count
+                    else:
+                        self.pairs[x].pop(y, None)
+                        if not self.pairs[x]:
+                            self.pairs.pop(x, None)
+
+    def _forget(self, key: str):
+        self.freq.pop(key, None)
+        data = self.items.pop(key, None)
+        if data is not None:
+            keys = self.by_title.get(_title_key(key))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_title[_title_key(key)]
+
+    def set_playlist(self, playlist_id: int, track_datas: Iterable[dict]):
+        """Replace a playlist's contribution (an empty list removes it)."""
+        old = self.playlists.pop(playlist_id, None)
+        if old:
+            self._apply(old, -1)
+
+        keys: list[str] = []
+        seen = set()
+        for data in track_datas:
+            key = _data_key(data)
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            keys.append(key)
+            if key not in self.items:
+                self.items[key] = data
+                self.by_title[_title_key(key)].add(key)
+        if keys:
+            self.playlists[playlist_id] = keys
+            self._apply(keys, +1)
+
+    def neighbours(self, key: str) -> list[tuple[str, float]]:
+        counts = self.pairs.get(key)
+        if not counts:
+            return []
+        freq_a = max(1, self.freq.get(key, 1))
+        scored = [
+            (other, count / math.sqrt(freq_a * max(1, self.freq.get(other, 1))))
+            for other, count in counts.items()
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+    def lookup(self, title: str, author: str) -> Optional[str]:
+        key = item_key(title, author)
+        if key in self.pairs:
+            return key
+        # Same title, differently written author ("Artist - Topic", "ArtistVEVO")
+        candidates = [k for k in self.by_title.get(_title_key(key), ()) if k in self.pairs]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda k: self.freq.get(k, 0))
+
+
+_index: Optional[CooccurrenceIndex] = None
+_dirty: set[int] = set()
+_lock = asyncio.Lock()
+_stats = {"builds": 0, "refreshed_playlists": 0, "hits": 0, "misses": 0}
+
+
+def mark_dirty(playlist_id: Optional[int]):
+    """Recompute `playlist_id` before the next recommendation."""
+    if playlist_id is not None:
+        _dirty.add(playlist_id)
+
+
+@event.listens_for(PlaylistTrack, "after_insert")
+@event.listens_for(PlaylistTrack, "after_delete")
+def _track_changed(_mapper, _connection, target):
+    mark_dirty(target.playlist_id)
+
+
+@event.listens_for(Playlist, "after_delete")
+def _playlist_deleted(_mapper, _connection, target):
+    mark_dirty(target.id)
+
+
+async def _load(playlist_ids: Optional[Iterable[int]] = None) -> dict[int, list[dict]]:
+    stmt = select(PlaylistTrack.playlist_id, PlaylistTrack.track_data).order_by(
+        PlaylistTrack.playlist_id, PlaylistTrack.id
+    )
+    if playlist_ids is not None:
+        stmt = stmt.where(PlaylistTrack.playlist_id.in_(list(playlist_ids)))
+    grouped: dict[int, list[dict]] = defaultdict(list)
+    async with db.async_session_factory() as session:
+        for playlist_id, track_data in (await session.execute(stmt)).all():
+            if track_data:
+                grouped[playlist_id].append(track_data)
+    return grouped
+
+
+async def build():
+    """(Re)build the whole index from playlist_tracks."""
+    global _index
+    if db.async_session_factory is None:
+        return
+    async with _lock:
+        # Anything changed while loading stays dirty for the next refresh
+        _dirty.clear()
+        try:
+            grouped = await _load()
+        except Exception as e:
+            logger.warning(f"Co-occurrence index build failed: {e}")
+            return
+        index = CooccurrenceIndex(_window())
+        for playlist_id, track_datas in grouped.items():
+            index.set_playlist(playlist_id, track_datas)
+            # Building a big library is CPU-bound; let the event loop breathe
+            await asyncio.sleep(0)
+        _index = index
+        _stats["builds"] += 1
+        logger.info(f"Co-occurrence index built: {len(index.items)} tracks from {len(index.playlists)} playlists.")
+
+
+async def _refresh():
+    if _index is None:
+        await build()
+        return
+    if not _dirty or db.async_session_factory is None:
+        return
+    async with _lock:
+        dirty = list(_dirty)
+        _dirty.difference_update(dirty)
+        try:
+            grouped = await _load(dirty)
+        except Exception as e:
+            _dirty.update(dirty)
+            logger.warning(f"Co-occurrence index refresh failed: {e}")
+            return
+        for playlist_id in dirty:
+            _index.set_playlist(playlist_id, grouped.get(playlist_id, []))
+        _stats["refreshed_playlists"] += len(dirty)
+
+
+async def recommend(title: str, author: str, exclude_titles: set[str], top_k: int = 5) -> Optional[dict]:
+    """Stored track_data for a playlist neighbour of (title, author), picked
+    at random (weighted by score) among the best `top_k`; None if the track
+    isn't in anyone's playlists."""
+    await _refresh()
+    if _index is None:
+        return None
+    key = _index.lookup(title, author)
+    if key is None:
+        _stats["misses"] += 1
+        return None
+
+    candidates = []
+    for other, score in _index.neighbours(key):
+        data = _index.items.get(other)
+        if data is None:
+            continue
+        info = data.get("info", data)
+        if (info.get("title") or "").lower() in exclude_titles:
+            continue
+        candidates.append((data, score))
+        if len(candidates) >= top_k:
+            break
+    if not candidates:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    return random.choices([c[0] for c in candidates], weights=[c[1] for c in candidates])[0]
+
+
+def stats() -> dict:
+    return {
+        **_stats,
+        "built": _index is not None,
+        "tracks": len(_index.items) if _index else 0,
+        "playlists": len(_index.playlists) if _index else 0,
+        "dirty": len(_dirty),
+    }
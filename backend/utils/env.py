@@ -0,0 +1,23 @@
+"""
+env.py — Numeric settings read from environment variables.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def env_number(name: str, default, cast: Optional[Callable] = None):
+    """`name` parsed with `cast` (by default the type of `default`), or
+    `default` with a warning when the value is not a valid number."""
+    if cast is None:
+        cast = type(default)
+    raw = os.getenv(name, str(default)).strip()
+    try:
+        return cast(raw)
+    except ValueError:
+        logger.warning("Invalid %s='%s'. Falling back to %s.", name, raw, default)
+        return default
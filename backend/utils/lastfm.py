@@ -0,0 +1,220 @@
+"""
+lastfm.py — Cached Last.fm `track.getsimilar` lookups for autoplay.
+
+Autoplay used to call Last.fm for the seed track on every step, opening a
+fresh HTTP session each time, with nothing shared between guilds or kept
+across restarts. Similarity lists now live in the `lastfm_similar` table,
+keyed by normalised (artist, track):
+
+  - `similar()` answers from the table while an entry is younger than
+    LASTFM_CACHE_TTL_DAYS, and only otherwise calls the API (through one
+    pooled aiohttp session), writing the result back. Concurrent requests
+    for the same track share one API call.
+  - `neighbours()` walks the stored lists a few hops further without any
+    network calls, so autoplay still has fresh candidates once every direct
+    neighbour has already been played.
+
+Env vars:
+    LASTFM_API_KEY          Required for any Last.fm lookup
+    LASTFM_CACHE_TTL_DAYS   Days a stored similarity list is reused (default: 7)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import aiohttp
+from sqlalchemy import select
+
+from backend.database.core import db
+from backend.database.models.models import LastfmSimilar
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+_API_URL = "http://ws.audioscrobbler.com/2.0/"
+# Keeps IN (...) lists well under every driver's parameter limit
+_LOOKUP_CHUNK = 500
+
+_http: Optional[aiohttp.ClientSession] = None
+_inflight: dict[str, asyncio.Task] = {}
+_stats = {"hits": 0, "fetches": 0, "coalesced": 0, "stale": 0, "saved": 0, "errors": 0}
+
+
+def _ttl() -> timedelta:
+    return timedelta(days=env_number("LASTFM_CACHE_TTL_DAYS", 7.0))
+
+
+def similar_key(title: str, artist: str) -> str:
+    normalised = "\x1f".join(" ".join(part.split()).lower() for part in (artist, title))
+    return hashlib.sha1(normalised.encode("utf-8")).hexdigest()
+
+
+def _client() -> aiohttp.ClientSession:
+    global _http
+    if _http is None or _http.closed:
+        _http = aiohttp.ClientSession(
+            # Add user-agent to prevent 403s on AudioScrobbler
+            headers={"User-Agent": "FlakeMusicBot/1.0"},
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+    return _http
+
+
+async def close():
+    """Close the pooled HTTP session (call on shutdown)."""
+    global _http
+    if _http is not None and not _http.closed:
+        await _http.close()
+    _http = None
+
+
+async def _load(keys: Iterable[str]) -> dict[str, list[dict]]:
+    """Fresh stored similarity lists for `keys`."""
+    keys = list(set(keys))
+    if not keys or db.async_session_factory is None:
+        return {}
+
+    cutoff = (datetime.utcnow() - _ttl()).isoformat()
+    found: dict[str, list[dict]] = {}
+    try:
+        async with db.async_session_factory() as session:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start:start + _LOOKUP_CHUNK]
+                rows = (await session.execute(
+                    select(LastfmSimilar).where(LastfmSimilar.lookup_key.in_(chunk))
+                )).scalars().all()
+                for row in rows:
+                    if row.fetched_at and row.fetched_at < cutoff:
+                        _stats["stale"] += 1
+                        continue
+                    found[row.lookup_key] = list(row.similar or [])
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Last.fm cache lookup failed: {e}")
+        return {}
+    return found
+
+
+async def _save(key: str, title: str, artist: str, similar: list[dict]):
+    if db.async_session_factory is None:
+        return
+    try:
+        async with db.async_session_factory() as session:
+            await db.upsert(session, LastfmSimilar, [{
+                "lookup_key": key,
+                "artist": artist[:512],
+                "track": title[:512],
+                "similar": similar,
+                "fetched_at": datetime.utcnow().isoformat(),
+            }], "lookup_key")
+            await session.commit()
+        _stats["saved"] += 1
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Failed to store Last.fm similarity for '{title}': {e}")
+
+
+async def _fetch(key: str, title: str, artist: str, api_key: str) -> list[dict]:
+    try:
+        _stats["fetches"] += 1
+        params = {
+            "method": "track.getsimilar",
+            "artist": artist,
+            "track": title,
+            "api_key": api_key,
+            "format": "json",
+            "limit": "15",
+        }
+        try:
+            async with _client().get(_API_URL, params=params) as response:
+                if response.status != 200:
+                    _stats["errors"] += 1
+                    logger.error(f"Last.fm API returned status {response.status}")
+                    return []
+                data = await response.json()
+        except Exception as e:
+            _stats["errors"] += 1
+            logger.error(f"Last.fm API fetch failed: {e}")
+            return []
+
+        similar = []
+        for sim_track in data.get("similartracks", {}).get("track", []):
+            sim_title = sim_track.get("name")
+            sim_artist = sim_track.get("artist", {}).get("name")
+            if not sim_title or not sim_artist:
+                continue
+            try:
+                match = float(sim_track.get("match") or 0)
+            except (TypeError, ValueError):
+                match = 0.0
+            similar.append({"title": sim_title, "artist": sim_artist, "match": match})
+
+        # Only successful responses are stored; an empty list is a real answer too
+        await _save(key, title, artist, similar)
+        return similar
+    finally:
+        _inflight.pop(key, None)
+
+
+async def similar(title: str, artist: str) -> list[dict]:
+    """Tracks similar to (title, artist), best match first; empty if unknown
+    or if LASTFM_API_KEY is unset."""
+    api_key = os.getenv("LASTFM_API_KEY")
+    if not api_key or not title or not artist:
+        return []
+
+    key = similar_key(title, artist)
+    cached = (await _load([key])).get(key)
+    if cached is not None:
+        _stats["hits"] += 1
+        return cached
+
+    task = _inflight.get(key)
+    if task is not None:
+        _stats["coalesced"] += 1
+    else:
+        task = _inflight[key] = asyncio.create_task(_fetch(key, title, artist, api_key))
+    # Shielded so one cancelled autoplay step doesn't abort the shared fetch
+    return list(await asyncio.shield(task))
+
+
+async def neighbours(title: str, artist: str, hops: int = 2, limit: int = 50) -> list[dict]:
+    """Multi-hop recommendations from the stored similarity graph.
+
+    The first hop comes from `similar()` (which may call the API); further
+    hops only read lists already in the table. Each candidate is scored by
+    the product of match values along its best path, and the seed itself is
+    excluded.
+    """
+    seed = similar_key(title, artist)
+    best: dict[str, dict] = {}
+    frontier = [(entry, float(entry.get("match") or 0)) for entry in await similar(title, artist)]
+
+    for hop in range(max(1, hops)):
+        next_keys: dict[str, float] = {}
+        for entry, score in frontier:
+            key = similar_key(entry["title"], entry["artist"])
+            if key == seed:
+                continue
+            if key not in best or best[key]["score"] < score:
+                best[key] = {**entry, "score": score}
+                next_keys[key] = score
+        if hop + 1 >= hops or not next_keys:
+            break
+        stored = await _load(next_keys)
+        frontier = [
+            (entry, next_keys[key] * float(entry.get("match") or 0))
+            for key, entries in stored.items()
+            for entry in entries
+        ]
+
+    return sorted(best.values(), key=lambda e: e["score"], reverse=True)[:limit]
+
+
+def stats() -> dict:
+    return {**_stats, "inflight": len(_inflight)}
@@ -0,0 +1,86 @@
+"""
+rate_limit.py — Async token buckets for pacing Lavalink searches per node.
+
+Bulk work (playlist loading) searches many tracks concurrently; each search
+first takes a token from the bucket of the node wavelink will route it to,
+so a big import can't hammer one Lavalink node (and, behind it, YouTube)
+into rate-limiting or IP-blocking us.
+
+Env vars:
+    LAVALINK_SEARCH_RATE     Sustained searches per second per node (default: 10)
+    LAVALINK_SEARCH_BURST    Searches allowed back-to-back before pacing kicks in (default: 20)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import wavelink
+
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(0.1, rate)
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # The lock makes waiters take tokens in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waited_seconds += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self._tokens -= 1
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "waited_seconds": round(self.waited_seconds, 2),
+        }
+
+
+_buckets: dict[str, TokenBucket] = {}
+
+
+def _node_id() -> str:
+    try:
+        return wavelink.Pool.get_node().identifier
+    except Exception:
+        # No node connected yet — share one bucket
+        return "default"
+
+
+def node_bucket(node_id: Optional[str] = None) -> TokenBucket:
+    """Bucket for `node_id`, or for the node wavelink currently routes searches to."""
+    node_id = node_id or _node_id()
+    bucket = _buckets.get(node_id)
+    if bucket is None:
+        bucket = _buckets[node_id] = TokenBucket(
+            rate=env_number("LAVALINK_SEARCH_RATE", 10.0),
+            burst=env_number("LAVALINK_SEARCH_BURST", 20.0),
+        )
+    return bucket
+
+
+def stats() -> dict:
+    return {node_id: bucket.stats() for node_id, bucket in _buckets.items()}
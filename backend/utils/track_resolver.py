@@ -0,0 +1,169 @@
+"""
+track_resolver.py — Race several lookup strategies for one track, first hit wins.
+
+Resolving a track used to walk a fixed list of Lavalink queries (encoded
+track, then exact URI, then `ytmsearch:`; or `ytsearch:` then `ytmsearch:`
+for /play), waiting out the full Lavalink timeout on every failure before
+trying the next. `race()` runs the candidates concurrently instead:
+
+  - Strategies start in order of their observed success rate; the next one
+    is launched as soon as the running ones fail, or after a short hedge
+    delay if they are merely slow.
+  - The first non-empty result wins and the remaining lookups are cancelled
+    (track_search shields the underlying request, so a cancelled loser still
+    lands in the search cache).
+  - Every strategy has its own timeout.
+  - Per-strategy success/failure/timeout counts and latency are kept and
+    surfaced through /bot/status; they also drive the launch order, so a
+    strategy that never works here (e.g. re-loading encoded tracks) drifts
+    to the back.
+
+Env vars:
+    TRACK_RESOLVE_TIMEOUT       Seconds each strategy may take (default: 8)
+    TRACK_RESOLVE_HEDGE_DELAY   Seconds before launching the next strategy while
+                                earlier ones are still running; 0 = all at once (default: 0.25)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import wavelink
+
+from backend.utils import track_search
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the per-strategy latency average
+_LATENCY_ALPHA = 0.2
+
+
+_stats: dict[str, dict] = {}
+
+
+def _strategy(name: str) -> dict:
+    entry = _stats.get(name)
+    if entry is None:
+        entry = _stats[name] = {
+            "wins": 0, "successes": 0, "failures": 0, "timeouts": 0, "cancelled": 0, "avg_ms": None,
+        }
+    return entry
+
+
+def _score(name: str) -> float:
+    """Smoothed success rate; an unseen strategy scores 0.5."""
+    entry = _strategy(name)
+    finished = entry["successes"] + entry["failures"] + entry["timeouts"]
+    return (entry["successes"] + 1) / (finished + 2)
+
+
+def ranked(candidates: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """`candidates` best-first by observed success rate; ties keep the given order."""
+    return sorted(candidates, key=lambda c: -_score(c[0]))
+
+
+async def _attempt(name: str, query: str, timeout: float) -> Optional[wavelink.Search]:
+    entry = _strategy(name)
+    started = time.monotonic()
+    try:
+        result = await asyncio.wait_for(track_search.search(query), timeout)
+    except asyncio.TimeoutError:
+        entry["timeouts"] += 1
+        logger.debug(f"Resolve strategy '{name}' timed out after {timeout}s")
+        return None
+    except asyncio.CancelledError:
+        entry["cancelled"] += 1
+        raise
+    except Exception as e:
+        entry["failures"] += 1
+        logger.debug(f"Resolve strategy '{name}' failed: {e}")
+        return None
+
+    if not result:
+        entry["failures"] += 1
+        return None
+    entry["successes"] += 1
+    elapsed_ms = (time.monotonic() - started) * 1000
+    avg = entry["avg_ms"]
+    entry["avg_ms"] = elapsed_ms if avg is None else avg + _LATENCY_ALPHA * (elapsed_ms - avg)
+    return result
+
+
+async def race(
+    candidates: list[tuple[str, str]],
+    timeout: Optional[float] = None,
+    hedge_delay: Optional[float] = None,
+) -> tuple[Optional[str], Optional[wavelink.Search]]:
+    """Run (strategy name, Lavalink query) candidates concurrently.
+
+    Returns (winning strategy, its non-empty result), or (None, None) if
+    every strategy failed or timed out.
+    """
+    if not candidates:
+        return None, None
+    if timeout is None:
+        timeout = env_number("TRACK_RESOLVE_TIMEOUT", 8.0)
+    if hedge_delay is None:
+        hedge_delay = env_number("TRACK_RESOLVE_HEDGE_DELAY", 0.25)
+
+    waiting = ranked(candidates)
+    running: dict[asyncio.Task, str] = {}
+
+    def launch():
+        name, query = waiting.pop(0)
+        running[asyncio.create_task(_attempt(name, query, timeout))] = name
+
+    launch()
+    try:
+        while running:
+            done, _ = await asyncio.wait(
+                running,
+                timeout=max(0.0, hedge_delay) if waiting else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                name = running.pop(task)
+                result = task.result()
+                if result:
+                    _strategy(name)["wins"] += 1
+                    return name, result
+            if waiting:
+                # Either everything running failed, or it's slow enough to hedge
+                launch()
+        return None, None
+    finally:
+        for task in running:
+            task.cancel()
+
+
+def session_candidates(title: str, author: str, uri: str = "", encoded: Optional[str] = None) -> list[tuple[str, str]]:
+    """Strategies for a known track: saved encoded track, exact URI, then searches."""
+    candidates = []
+    if encoded:
+        candidates.append(("encoded", encoded))
+    if uri:
+        candidates.append(("uri", uri))
+    terms = f"{title} {author}".strip()
+    if terms:
+        candidates.append(("ytmsearch", f"ytmsearch:{terms}"))
+        candidates.append(("ytsearch", f"ytsearch:{terms}"))
+    return candidates
+
+
+def text_candidates(query: str) -> list[tuple[str, str]]:
+    """Strategies for free text typed by a user."""
+    return [("ytsearch", f"ytsearch:{query}"), ("ytmsearch", f"ytmsearch:{query}")]
+
+
+def stats() -> dict:
+    return {
+        name: {
+            **entry,
+            "avg_ms": round(entry["avg_ms"], 1) if entry["avg_ms"] is not None else None,
+            "success_rate": round(_score(name), 3),
+        }
+        for name, entry in _stats.items()
+    }
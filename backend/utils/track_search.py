@@ -0,0 +1,176 @@
+"""
+track_search.py — Process-wide facade over wavelink.Playable.search.
+
+Every Lavalink lookup (slash commands, autocomplete, dashboard search,
+playlist loaders, autoplay) goes through `search()`, which adds:
+
+  - A bounded LRU cache with TTL, keyed on the normalised query, so the same
+    "ytmsearch:..." query doesn't hit Lavalink/YouTube again within the TTL.
+  - In-flight coalescing: concurrent identical queries share one request.
+  - Short-lived negative caching of empty results.
+  - Hit/miss counters, surfaced through /bot/status.
+
+Callers get their own shallow copies of cached Playables, so setting
+`requester` / `extras` on a result never leaks into another caller's tracks.
+
+Env vars:
+    SEARCH_CACHE_SIZE            Max cached queries (default: 512)
+    SEARCH_CACHE_TTL             Seconds a found result stays cached (default: 1800)
+    SEARCH_CACHE_NEGATIVE_TTL    Seconds an empty result stays cached (default: 60)
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import wavelink
+
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+_SEARCH_PREFIX_RE = re.compile(r"^(?P<prefix>[a-z]+search):\s*(?P<terms>.*)$", re.IGNORECASE | re.DOTALL)
+
+
+def normalise_query(query: str) -> str:
+    """Cache key for a query. Free-text searches ("ytmsearch:Foo  Bar") are
+    case/whitespace-insensitive; URLs and encoded tracks are kept verbatim."""
+    query = query.strip()
+    m = _SEARCH_PREFIX_RE.match(query)
+    if not m:
+        return query
+    terms = " ".join(m.group("terms").split()).lower()
+    return f"{m.group('prefix').lower()}:{terms}"
+
+
+def _clone(result):
+    """Shallow-copy a search result so callers can mutate their tracks."""
+    if isinstance(result, wavelink.Playlist):
+        playlist = copy.copy(result)
+        playlist.tracks = [copy.copy(t) for t in result.tracks]
+        return playlist
+    return [copy.copy(t) for t in result]
+
+
+class SearchCache:
+    def __init__(self, max_size: int = 512, ttl: float = 1800.0, negative_ttl: float = 60.0):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # key -> (expires_at, result)
+        self._entries: OrderedDict[str, tuple[float, wavelink.Search]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: str, result):
+        ttl = self.ttl if result else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def peek(self, query: str) -> Optional[wavelink.Search]:
+        """Cached result for `query` without searching (None on a miss)."""
+        entry = self._get(normalise_query(query))
+        return _clone(entry[1]) if entry else None
+
+    async def search(self, query: str) -> wavelink.Search:
+        key = normalise_query(query)
+
+        entry = self._get(key)
+        if entry is not None:
+            if entry[1]:
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+            return _clone(entry[1])
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # The lookup runs as its own task so a cancelled caller (e.g. a
+            # superseded autocomplete) doesn't cancel it for everyone else
+            task = self._inflight[key] = asyncio.create_task(self._fetch(key, query))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return _clone(await asyncio.shield(task))
+
+    async def _fetch(self, key: str, query: str) -> wavelink.Search:
+        try:
+            result = await wavelink.Playable.search(query)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        if result is None:
+            result = []
+        self._put(key, result)
+        return result
+
+    def invalidate(self, query: str):
+        self._entries.pop(normalise_query(query), None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.negative_hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+_cache: Optional[SearchCache] = None
+
+
+def get_cache() -> SearchCache:
+    """Return the process-wide search cache, creating it from env on first use."""
+    global _cache
+    if _cache is None:
+        _cache = SearchCache(
+            max_size=env_number("SEARCH_CACHE_SIZE", 512),
+            ttl=env_number("SEARCH_CACHE_TTL", 1800.0),
+            negative_ttl=env_number("SEARCH_CACHE_NEGATIVE_TTL", 60.0),
+        )
+    return _cache
+
+
+async def search(query: str) -> wavelink.Search:
+    """Drop-in replacement for `wavelink.Playable.search(query)`."""
+    return await get_cache().search(query)
+
+
+def stats() -> dict:
+    return get_cache().stats()
@@ -0,0 +1,268 @@
+"""
+track_store.py — Persistent (title, author, uri) -> Lavalink track resolutions.
+
+Playlist tracks are stored as metadata only ("encoded": None), so loading a
+playlist used to run one `ytmsearch:` per track, every time. Resolutions now
+live in the `resolved_tracks` table: loaders look every track up in a few
+batched queries, rebuild the wavelink.Playable straight from the stored
+Lavalink payload, and only search on a miss or a stale entry, writing the
+result back for next time.
+
+If the database is unavailable the loaders simply fall back to searching.
+
+Misses are searched concurrently (paced per Lavalink node by
+rate_limit.node_bucket) and handed back in playlist order.
+
+Env vars:
+    RESOLVED_TRACK_TTL_DAYS        Days before a stored resolution is re-searched (default: 30)
+    PLAYLIST_RESOLVE_CONCURRENCY   Searches in flight per playlist load (default: 8)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+import wavelink
+from sqlalchemy import select
+
+from backend.database.core import db
+from backend.database.models.models import ResolvedTrack
+from backend.utils import rate_limit, track_search
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+# Keeps IN (...) lists well under every driver's parameter limit
+_LOOKUP_CHUNK = 500
+# Resolutions written back per transaction while a playlist loads
+_SAVE_BATCH = 25
+# Minimum seconds between progress callbacks
+_PROGRESS_INTERVAL = 1.0
+
+_stats = {"hits": 0, "misses": 0, "stale": 0, "saved": 0, "errors": 0}
+
+
+def _ttl() -> timedelta:
+    return timedelta(days=env_number("RESOLVED_TRACK_TTL_DAYS", 30.0))
+
+
+def _concurrency() -> int:
+    return max(1, env_number("PLAYLIST_RESOLVE_CONCURRENCY", 8))
+
+
+def _info(data: dict) -> dict:
+    return data.get("info", data)
+
+
+def _fields(info: dict) -> tuple[str, str, str]:
+    title = info.get("title") or ""
+    author = info.get("author") or info.get("artist") or ""
+    uri = info.get("uri") or ""
+    return title, author, uri
+
+
+def track_key(title: str, author: str, uri: str) -> str:
+    normalised = "\x1f".join(" ".join(part.split()).lower() for part in (title, author, uri))
+    return hashlib.sha1(normalised.encode("utf-8")).hexdigest()
+
+
+def key_for(data: dict) -> str:
+    return track_key(*_fields(_info(data)))
+
+
+def query_for(data: dict) -> Optional[str]:
+    """Lavalink query for a stored playlist track, or None if it can't be searched."""
+    title, author, uri = _fields(_info(data))
+    # Prioritize exact URL to skip expensive YouTube Search if possible
+    # BUT force text search for YouTube to avoid Lavalink IP blocks
+    if uri and "youtube.com" not in uri and "youtu.be" not in uri:
+        return uri
+    if title:
+        return f"ytmsearch:{title} {author}" if author else f"ytmsearch:{title}"
+    return None
+
+
+def _first(result) -> Optional[wavelink.Playable]:
+    if not result:
+        return None
+    # Wavelink may return playlist or list
+    return result[0] if isinstance(result, list) else (result.tracks[0] if result.tracks else None)
+
+
+def _playable(row: ResolvedTrack) -> Optional[wavelink.Playable]:
+    if not row.track_data:
+        return None
+    try:
+        return wavelink.Playable(row.track_data)
+    except Exception as e:
+        logger.debug(f"Stored resolution {row.lookup_key} could not be rebuilt: {e}")
+        return None
+
+
+async def lookup(track_datas: Iterable[dict]) -> dict[str, wavelink.Playable]:
+    """Fresh stored resolutions for `track_datas`, keyed by `key_for(data)`."""
+    keys = list({key_for(data) for data in track_datas})
+    if not keys or db.async_session_factory is None:
+        return {}
+
+    cutoff = (datetime.utcnow() - _ttl()).isoformat()
+    found: dict[str, wavelink.Playable] = {}
+    try:
+        async with db.async_session_factory() as session:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start:start + _LOOKUP_CHUNK]
+                rows = (await session.execute(
+                    select(ResolvedTrack).where(ResolvedTrack.lookup_key.in_(chunk))
+                )).scalars().all()
+                for row in rows:
+                    if row.resolved_at and row.resolved_at < cutoff:
+                        _stats["stale"] += 1
+                        continue
+                    track = _playable(row)
+                    if track is not None:
+                        found[row.lookup_key] = track
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Resolved-track lookup failed, falling back to search: {e}")
+        return {}
+    return found
+
+
+async def save(resolved: list[tuple[dict, wavelink.Playable]]):
+    """Insert or refresh resolutions for (stored track data, resolved Playable) pairs."""
+    if not resolved or db.async_session_factory is None:
+        return
+
+    now = datetime.utcnow().isoformat()
+    by_key: dict[str, tuple[dict, wavelink.Playable]] = {}
+    for data, track in resolved:
+        if getattr(track, "raw_data", None) and track.encoded:
+            by_key[key_for(data)] = (data, track)
+    if not by_key:
+        return
+
+    rows = []
+    for key, (data, track) in by_key.items():
+        title, author, uri = _fields(_info(data))
+        rows.append({
+            "lookup_key": key,
+            "title": title[:512],
+            "author": author[:512],
+            "uri": uri[:1024],
+            "encoded": track.encoded,
+            "track_data": dict(track.raw_data),
+            "resolved_at": now,
+        })
+
+    try:
+        async with db.async_session_factory() as session:
+            # Two loaders resolving the same track must not race select-then-insert
+            await db.upsert(session, ResolvedTrack, rows, "lookup_key")
+            await session.commit()
+        _stats["saved"] += len(by_key)
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning(f"Failed to store {len(by_key)} track resolutions: {e}")
+
+
+async def _search_one(index: int, data: dict, semaphore: asyncio.Semaphore) -> Optional[wavelink.Playable]:
+    query = query_for(data)
+    if not query:
+        return None
+    async with semaphore:
+        await rate_limit.node_bucket().acquire()
+        try:
+            return _first(await track_search.search(query))
+        except Exception as e:
+            logger.warning(f"Track {index}: Search load failed: {e}")
+            return None
+
+
+async def resolve_tracks(
+    track_datas: list[dict],
+    concurrency: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int, int], Awaitable[None]]] = None,
+) -> AsyncIterator[tuple[int, Optional[wavelink.Playable]]]:
+    """Yield (index, Playable or None) for each stored playlist track, in order.
+
+    Stored resolutions are fetched up front in batches; only misses are
+    searched, up to `concurrency` at once (paced by the per-node token
+    bucket), and written back as loading proceeds. Results that finish early
+    are held until every track before them has been yielded, so callers can
+    append to the session in playlist order.
+
+    `on_progress(resolved, failed, total)` is awaited every few tracks and
+    once at the end.
+    """
+    if concurrency is None:
+        concurrency = _concurrency()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # Look ahead far enough to keep every search slot busy behind a slow head
+    lookahead = max(1, concurrency) * 4
+
+    cached = await lookup(track_datas)
+    total = len(track_datas)
+    window: deque = deque()
+    next_index = 0
+    pending: list[tuple[dict, wavelink.Playable]] = []
+    resolved = failed = 0
+    last_progress = 0.0
+
+    def fill():
+        nonlocal next_index
+        while next_index < total and len(window) < lookahead:
+            data = track_datas[next_index]
+            track = cached.get(key_for(data))
+            if track is not None:
+                _stats["hits"] += 1
+                window.append((next_index, data, track, None))
+            else:
+                _stats["misses"] += 1
+                task = asyncio.create_task(_search_one(next_index, data, semaphore))
+                window.append((next_index, data, None, task))
+            next_index += 1
+
+    try:
+        fill()
+        while window:
+            index, data, track, task = window.popleft()
+            if task is not None:
+                track = await task
+                if track is not None:
+                    pending.append((data, track))
+                    if len(pending) >= _SAVE_BATCH:
+                        await save(pending)
+                        pending = []
+            fill()
+
+            if track is None:
+                failed += 1
+            else:
+                resolved += 1
+            yield index, track
+
+            if on_progress is not None:
+                now = time.monotonic()
+                if now - last_progress >= _PROGRESS_INTERVAL or not window:
+                    last_progress = now
+                    try:
+                        await on_progress(resolved, failed, total)
+                    except Exception as e:
+                        logger.debug(f"Playlist progress callback failed: {e}")
+            if task is None and index % 50 == 49:
+                # Long runs of stored hits never await; let other tasks in
+                await asyncio.sleep(0)
+    finally:
+        for _index, _data, _track, task in window:
+            if task is not None:
+                task.cancel()
+        await save(pending)
+
+
+def stats() -> dict:
+    return dict(_stats)
@@ -3,27 +3,71 @@ import logging
 import asyncio
 import time
 from discord.ext import voice_recv
-from .speech_recognizer import SpeechRecognizer
+from backend.utils.env import env_number
+from .speech_recognizer import SpeechRecognizer, RecognizerStream
+from .decode_executor import get_executor
+from .pcm_buffer import PcmRingBuffer
+from . import vad
+from . import metrics
+from .command_matcher import get_matcher
 
 logger = logging.getLogger(__name__)
 
+
+class _UserStream:
+    """Per-speaker state for streaming mode."""
+
+    def __init__(self):
+        self.stream: RecognizerStream | None = None
+        self.pending: list[bytes] = []
+        self.pumping = False
+        # The running pump, awaited by _finish_stream so it drains first
+        self.pump: asyncio.Task | None = None
+        self.closed = False
+        # Set once a partial result starts with a hotword
+        self.hotword_heard = False
+        # A final result that was only the hotword ("hey flake" ... pause ... "play x")
+        self.prefix = ""
+
+
 class FlakeAudioSink(voice_recv.AudioSink):
-    def __init__(self, callback):
+    def __init__(self, callback, guild_id: int = 0):
         super().__init__()
         import os
         self.companion_logs_enabled = os.getenv("COMPANION_LOGS", "false").lower() == "true"
         self.callback = callback
-        self.recognizer = SpeechRecognizer()
-        
-        # Buffer for PCM data per user (user_id: bytearray)
-        self.user_buffers = {}
-        # Track last time a user sent a packet (user_id: float timestamp)
+        self.recognizer = SpeechRecognizer(guild_id)
+        self.matcher = get_matcher()
+
+        # Fixed-capacity PCM ring per user (user_id: PcmRingBuffer), allocated
+        # on first speech and reused for every later utterance
+        self.user_buffers: dict[int, PcmRingBuffer] = {}
+        self.max_utterance_seconds = env_number("VOICE_MAX_UTTERANCE_SECONDS", 10.0)
+        # Per-user voice activity detection (user_id: VoiceActivityDetector);
+        # silent / non-speech frames never reach the buffers or Vosk
+        self.vad_enabled = vad.enabled()
+        self.user_vads: dict[int, vad.VoiceActivityDetector] = {}
+        # Track last time a user sent a packet (user_id: time.monotonic() timestamp)
         self.user_last_packet = {}
-        
+        # First kept packet of the current utterance, for the per-stage timings
+        self.user_utterance_start: dict[int, float] = {}
+
         # Increase threshold to 2.0s to allow normal pauses between words
-        self.silence_threshold = 2.0 
-        self._flush_task = None
+        self.silence_threshold = 2.0
         self._running = False
+        # End-of-utterance deadline timers (user_id: asyncio.TimerHandle). A timer
+        # is armed by the first packet of an utterance and re-armed lazily when it
+        # fires early, so idle sinks cost nothing and flushes aren't quantised.
+        # Only touched on the event loop, like every other piece of per-user state.
+        self._timers: dict[int, asyncio.TimerHandle] = {}
+
+        # Streaming mode: decode 20 ms frames as they arrive instead of
+        # buffering the whole utterance and transcribing after the silence wait
+        self.streaming = os.getenv("VOSK_STREAMING", "false").lower() == "true"
+        # Once a partial shows the hotword we only need a short pause to finalise
+        self.hotword_silence_threshold = 0.8
+        self.user_streams: dict[int, _UserStream] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
 
     def wants_opus(self) -> bool:
         return False # We want decoded PCM
@@ -34,62 +78,259 @@ class FlakeAudioSink(voice_recv.AudioSink):
             # to prevent it from hearing the music playing and hallucinating commands
             return
 
-        user_id = user.id
-        
-        # Append PCM bytes to buffer
-        if user_id not in self.user_buffers:
-            self.user_buffers[user_id] = bytearray()
-            
-        self.user_buffers[user_id].extend(data.pcm)
-        self.user_last_packet[user_id] = time.time()
+        if self.loop:
+            # write() runs on voice_recv's router thread. The VAD state, ring
+            # buffers and timers are only ever touched on the event loop, so
+            # hand the raw frame over instead of sharing them between threads
+            self.loop.call_soon_threadsafe(self._accept, user.id, data.pcm)
+
+    def _accept(self, user_id: int, pcm: bytes):
+        if not self._running:
+            return
+
+        frames = (pcm,)
+        if self.vad_enabled:
+            detector = self.user_vads.get(user_id)
+            if detector is None:
+                detector = self.user_vads[user_id] = vad.VoiceActivityDetector()
+            frames = detector.accept(pcm)
+            if not frames:
+                # Silence / noise: dropped, and doesn't postpone end-of-utterance
+                return
+
+        now = time.monotonic()
+        if user_id not in self.user_utterance_start:
+            self.user_utterance_start[user_id] = now
+            self.utterance_started(user_id)
+        self.user_last_packet[user_id] = now
+
+        if self.streaming:
+            for frame in frames:
+                self._enqueue_frame(user_id, frame)
+        else:
+            # Copy PCM bytes into the user's ring (no per-packet allocation)
+            buffer = self.user_buffers.get(user_id)
+            if buffer is None:
+                buffer = self.user_buffers[user_id] = PcmRingBuffer(self.max_utterance_seconds)
+            for frame in frames:
+                buffer.write(frame)
+        self._ensure_timer(user_id)
 
     def cleanup(self):
         self._running = False
-        if self._flush_task:
-            self._flush_task.cancel()
+        for handle in self._timers.values():
+            handle.cancel()
+        self._timers.clear()
         self.user_buffers.clear()
         self.user_last_packet.clear()
+        self.user_utterance_start.clear()
+        self.user_vads.clear()
+        for state in self.user_streams.values():
+            state.closed = True
+            if state.stream and not state.pumping:
+                state.stream.close()
+        self.user_streams.clear()
 
-    async def _flush_loop(self):
-        self._running = True
-        while self._running:
-            await asyncio.sleep(0.5)
-            now = time.time()
-            
-            users_to_process = []
-            for user_id, last_time in list(self.user_last_packet.items()):
-                if now - last_time > self.silence_threshold:
-                    if user_id in self.user_buffers and len(self.user_buffers[user_id]) > 0:
-                        users_to_process.append(user_id)
-            
-            for user_id in users_to_process:
-                # Extract and clear buffer
-                pcm_data = bytes(self.user_buffers[user_id])
-                self.user_buffers[user_id].clear()
-                del self.user_last_packet[user_id]
-                
-                # Check minimum length
-                # 48000Hz * 2 channels * 2 bytes = 192000 bytes/sec
-                # Require at least 1.5 seconds of sustained audio to count as a command
-                # This prevents a random mic bump or sigh from triggering the fake mock
-                if len(pcm_data) > 192000 * 1.5:
-                    asyncio.create_task(self._process_audio(user_id, pcm_data))
-                else:
-                    if self.companion_logs_enabled:
-                        logger.info(f"Audio chunk for user {user_id} was too short ({len(pcm_data)} bytes). Ignoring.")
+    # ------------------------------------------------------------------ #
+    # End-of-utterance timers
+    # ------------------------------------------------------------------ #
+
+    def _ensure_timer(self, user_id: int):
+        """Arm a deadline for this speaker unless one is already pending. Later
+        packets just move user_last_packet forward."""
+        if user_id not in self._timers:
+            self._arm_timer(user_id)
+
+    def _threshold_for(self, user_id: int) -> float:
+        state = self.user_streams.get(user_id)
+        if self.streaming and state and state.hotword_heard:
+            return self.hotword_silence_threshold
+        return self.silence_threshold
+
+    def _arm_timer(self, user_id: int):
+        if not self._running:
+            return
+        last = self.user_last_packet.get(user_id)
+        if last is None:
+            return
+        old = self._timers.pop(user_id, None)
+        if old:
+            old.cancel()
+        delay = max(0.0, last + self._threshold_for(user_id) - time.monotonic())
+        self._timers[user_id] = self.loop.call_later(delay, self._on_deadline, user_id)
+
+    def _on_deadline(self, user_id: int):
+        self._timers.pop(user_id, None)
+        last = self.user_last_packet.get(user_id)
+        if last is None:
+            return
+        now = time.monotonic()
+        if now - last < self._threshold_for(user_id):
+            # Speech continued since the timer was armed — push the deadline out
+            self._arm_timer(user_id)
+            return
+
+        del self.user_last_packet[user_id]
+        metrics.observe("sink.speech", last - self.user_utterance_start.pop(user_id, last))
+        metrics.observe("sink.silence_wait", now - last)
+        self.utterance_ended(user_id, self._end_utterance(user_id, last))
+
+    def utterance_started(self, user_id: int):
+        """Hook: the first kept frame of an utterance arrived. No-op here; the
+        replay benchmark overrides it."""
+
+    def utterance_ended(self, user_id: int, task: asyncio.Task | None):
+        """Hook: the utterance was handed to the recognizer by `task`, or
+        dropped as too short if `task` is None."""
+
+    def _end_utterance(self, user_id: int, last_packet: float) -> asyncio.Task | None:
+        """Hand the finished utterance to the recognizer. Returns the task doing
+        so, or None if the utterance was dropped."""
+        if self.streaming:
+            detector = self.user_vads.get(user_id)
+            if detector:
+                detector.end_utterance()
+            return asyncio.create_task(self._finish_stream(user_id, last_packet))
 
-    async def _process_audio(self, user_id, pcm_bytes):
+        buffer = self.user_buffers.get(user_id)
+        if buffer is None or len(buffer) == 0:
+            return None
+        buffered = len(buffer)
+
+        detector = self.user_vads.get(user_id)
+        if detector:
+            # VAD already trimmed silence; require enough detected speech
+            long_enough = detector.end_utterance()
+        else:
+            # Check minimum length
+            # 48000Hz * 2 channels * 2 bytes = 192000 bytes/sec
+            # Require at least 1.5 seconds of sustained audio to count as a command
+            # This prevents a random mic bump or sigh from triggering the fake mock
+            long_enough = buffered > 192000 * 1.5
+
+        if long_enough:
+            # Downmix/resample now so the ring can be reused straight away
+            with metrics.timer("sink.resample"):
+                pcm_data = buffer.to_vosk(self.recognizer.vosk_rate)
+            return asyncio.create_task(self._process_audio(user_id, pcm_data, last_packet))
+
+        buffer.clear()
+        if self.companion_logs_enabled:
+            logger.info(f"Audio chunk for user {user_id} was too short ({buffered} bytes). Ignoring.")
+        return None
+
+    async def _process_audio(self, user_id, pcm_bytes, last_packet: float | None = None):
         if self.companion_logs_enabled:
             logger.info(f"[Companion] Processing audio chunk for user {user_id}...")
-        
-        transcript = await self.recognizer.recognize(pcm_bytes)
-        
+
+        transcript = await self.recognizer.recognize(pcm_bytes, converted=True)
+
         if transcript:
+            await self._dispatch(user_id, transcript, last_packet)
+
+    async def _dispatch(self, user_id: int, transcript: str, last_packet: float | None = None):
+        if last_packet is not None:
+            metrics.observe("sink.end_to_end", time.monotonic() - last_packet)
+        with metrics.timer("sink.dispatch"):
             await self.callback(user_id, transcript)
 
+    # ------------------------------------------------------------------ #
+    # Streaming mode
+    # ------------------------------------------------------------------ #
+
+    def _enqueue_frame(self, user_id: int, pcm: bytes):
+        if not self._running:
+            return
+        state = self.user_streams.get(user_id)
+        if state is None:
+            state = self.user_streams[user_id] = _UserStream()
+        if state.closed:
+            return
+        state.pending.append(pcm)
+        if not state.pumping:
+            state.pumping = True
+            state.pump = asyncio.create_task(self._pump(user_id, state))
+
+    async def _pump(self, user_id: int, state: _UserStream):
+        """Feed queued frames to the speaker's recognizer; only one pump runs per speaker."""
+        try:
+            if state.stream is None:
+                state.stream = await self.recognizer.open_stream()
+                if state.stream is None:
+                    # No stream slot or recognizer free — ignore this speaker until they go quiet
+                    state.closed = True
+                    state.pending.clear()
+                    return
+
+            while state.pending and not state.closed:
+                # Frames that arrived while Kaldi was busy are decoded in one call
+                chunk = b"".join(state.pending)
+                state.pending.clear()
+                # Same per-guild fair queue as buffered decodes, so one guild's
+                # streams can't crowd out another's. Never dropped: losing a
+                # chunk mid-utterance would garble it (open_stream bounds load)
+                final_text, partial_text = await get_executor().submit(
+                    self.recognizer.guild_id, state.stream.feed, chunk, droppable=False
+                )
+
+                if partial_text and not state.hotword_heard and self.matcher.starts_with_hotword(partial_text):
+                    state.hotword_heard = True
+                    # Shorter silence threshold now applies — pull the deadline in
+                    if user_id in self._timers:
+                        self._arm_timer(user_id)
+                    if self.companion_logs_enabled:
+                        logger.info(f"[Companion] Hotword heard in partial result from user {user_id}: '{partial_text}'")
+
+                if final_text:
+                    await self._dispatch_final(user_id, state, final_text)
+        except Exception as e:
+            logger.error(f"[Companion] Streaming recognition failed for user {user_id}: {e}")
+        finally:
+            state.pumping = False
+            if state.closed and state.stream:
+                state.stream.close()
+
+    async def _dispatch_final(self, user_id: int, state: _UserStream, text: str, last_packet: float | None = None):
+        if state.prefix:
+            text = f"{state.prefix} {text}".strip()
+            state.prefix = ""
+        elif self.matcher.is_bare_hotword(text):
+            # Endpoint fired right after the hotword; wait for the command itself
+            state.prefix = text
+            return
+        state.hotword_heard = False
+        if self.companion_logs_enabled:
+            logger.info(f"[Companion-Vosk] Recognized (streaming): '{text}'")
+        await self._dispatch(user_id, text, last_packet)
+
+    async def _finish_stream(self, user_id: int, last_packet: float | None = None):
+        state = self.user_streams.pop(user_id, None)
+        if state is None:
+            return
+        # Let an in-flight pump drain its frames before taking the final result.
+        # The state is no longer in user_streams, so no new pump can start.
+        if state.pumping and state.pump:
+            await state.pump
+        if state.stream is None:
+            return
+        try:
+            final_text = await get_executor().submit(
+                self.recognizer.guild_id, state.stream.finish, droppable=False
+            )
+        except Exception as e:
+            logger.error(f"[Companion] Failed to finalise stream for user {user_id}: {e}")
+            return
+        if final_text or state.prefix:
+            await self._dispatch_final(user_id, state, final_text or "", last_packet)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start accepting frames; write() hands them to `loop`."""
+        self.loop = loop
+        self._running = True
+
     @classmethod
-    def start_listening(cls, voice_client: voice_recv.VoiceRecvClient, callback):
-        sink = cls(callback)
-        sink._flush_task = asyncio.create_task(sink._flush_loop())
+    def start_listening(cls, voice_client: voice_recv.VoiceRecvClient, callback, guild_id: int = 0):
+        sink = cls(callback, guild_id)
+        sink.start(asyncio.get_event_loop())
         voice_client.listen(sink)
         return sink
@@ -0,0 +1,202 @@
+"""
+command_matcher.py — Precompiled hotword / command-alias matching for voice transcripts.
+
+All hotwords and action aliases are compiled into a single anchored regex
+(longest alternatives first), so one match call yields the hotword, the
+canonical action and the argument span, and the per-transcript cost stays
+flat however many aliases / languages are configured.
+
+Vosk's small models mishear a lot ("flake" -> "flick", "play" -> "placebo"),
+so the defaults below carry known phonetic alternatives. More can be added
+without code changes through a JSON file:
+
+    {
+        "hotwords": ["hey flak"],
+        "aliases": {"play": ["pray"], "skip": ["ship"]},
+        "fallback": {"play": ["blay"]}
+    }
+
+Env vars:
+    VOICE_COMMANDS_FILE      Optional path to the JSON file above (merged into the defaults)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Possible hotwords (English and potential phonetic Bangla interpretations)
+# Vosk 'small' models often mishear "flake" as "flick", "flea", "placebo", etc.
+DEFAULT_HOTWORDS = (
+    "hey flake", "hi flake", "hello flake", "hey flex",
+    "hey flick", "এ ফ্লেক", "হে ফ্লেক", "a flick",
+    "any flick", "hey flic", "a plane", "hey fly",
+    "hey flack", "play flick", "hey plague",
+)
+
+# Fuzzy match actions because Vosk mishears often
+# play -> placebo, bleach, blame, plane, from
+# pause -> boss, post, poles
+# skip -> sheep, keep, skiff
+DEFAULT_ALIASES = {
+    "play": ("play", "start", "song", "গান", "baja", "placebo", "bleach", "blame", "plane", "from"),
+    "stop": ("stop", "clear", "leave", "স্টপ", "বন্ধ", "stock", "stuff"),
+    "skip": ("skip", "next", "স্কিপ", "পরের", "sheep", "keep", "skiff", "scape"),
+    "pause": ("pause", "resume", "boss", "post", "poles", "bosses", "paws"),
+}
+
+# Without a hotword, a transcript still counts if it contains one of these
+# anywhere (checked in this order). Mishearings of "play" are rewritten to "play".
+DEFAULT_FALLBACK = {
+    "play": ("play", "placebo", "bleach"),
+    "stop": ("stop", "pause"),
+    "skip": ("skip", "next"),
+}
+
+_PUNCTUATION = ",.!?;: "
+
+
+@dataclass(frozen=True)
+class VoiceCommand:
+    hotword: Optional[str]        # matched hotword, None for a fallback match
+    action: Optional[str]         # canonical action ("play", "stop", ...) or None
+    args: str                     # text after the action word
+    text: str                     # command string forwarded to the main bot
+
+
+def _alternation(words) -> str:
+    # Longest first so "hey flick" wins over "hey fli..." style prefixes
+    unique = sorted({w.lower() for w in words if w}, key=len, reverse=True)
+    return "|".join(re.escape(w) for w in unique)
+
+
+class CommandMatcher:
+    def __init__(self, hotwords=DEFAULT_HOTWORDS, aliases=DEFAULT_ALIASES, fallback=DEFAULT_FALLBACK):
+        self.hotwords = frozenset(h.lower() for h in hotwords)
+        self.alias_to_action = {
+            alias.lower(): action
+            for action, alias_list in aliases.items()
+            for alias in alias_list
+        }
+
+        action_alt = _alternation(self.alias_to_action)
+        # One pass: hotword, optional action word, remainder
+        self._full_re = re.compile(
+            rf"^(?P<hotword>{_alternation(self.hotwords)})[{re.escape(_PUNCTUATION)}]*"
+            rf"(?:(?P<action>{action_alt})(?=\s|$)\s*)?(?P<args>.*)$",
+            re.DOTALL,
+        )
+        self._hotword_re = re.compile(rf"^(?:{_alternation(self.hotwords)})")
+        # Command strings forwarded to the main bot ("play x", "skip")
+        self._command_re = re.compile(rf"^(?P<action>{action_alt})(?=\s|$)\s*(?P<args>.*)$", re.DOTALL)
+        self._fallback = [
+            (action, re.compile(_alternation(words)), tuple(w for w in words if w != action))
+            for action, words in fallback.items()
+        ]
+
+    # ------------------------------------------------------------------ #
+
+    def starts_with_hotword(self, text: str) -> bool:
+        return bool(self._hotword_re.match(text.lower().strip()))
+
+    def is_bare_hotword(self, text: str) -> bool:
+        return text.lower().strip(_PUNCTUATION) in self.hotwords
+
+    def match(self, transcript: str) -> Optional[VoiceCommand]:
+        """Parse a raw transcript. Returns None if it isn't addressed to the bot."""
+        text = transcript.lower().strip()
+
+        m = self._full_re.match(text)
+        if m:
+            action_word = m.group("action")
+            args = m.group("args").strip()
+            command_text = text[m.end("hotword"):].lstrip(_PUNCTUATION)
+            return VoiceCommand(
+                hotword=m.group("hotword"),
+                action=self.alias_to_action.get(action_word) if action_word else None,
+                args=args,
+                text=command_text,
+            )
+
+        # Fallback: if it's really struggling, just assume if it has "play" or "stop"
+        # Since it's a music bot, let's treat generic "play X" as a command if enabled
+        for action, pattern, mishearings in self._fallback:
+            if not pattern.search(text):
+                continue
+            if action == "play":
+                # Replace common mishearings for "play" and keep everything after it
+                for word in mishearings:
+                    text = text.replace(word, action)
+                idx = text.find(action)
+                command_text = (text[idx:] if idx >= 0 else text).lstrip(_PUNCTUATION)
+                parsed = self.parse_command(command_text)
+                return VoiceCommand(hotword=None, action=parsed[0], args=parsed[1], text=command_text)
+            return VoiceCommand(hotword=None, action=action, args="", text=action)
+
+        return None
+
+    def args_offset(self, text: str) -> Optional[int]:
+        """Character offset in `text` where a "play" command's free-text
+        argument starts, or None if `text` holds no play command."""
+        m = self._full_re.match(text)
+        if m:
+            return m.start("args") if self.alias_to_action.get(m.group("action")) == "play" else None
+        for action, pattern, _mishearings in self._fallback:
+            found = pattern.search(text)
+            if found:
+                return found.end() if action == "play" else None
+        return None
+
+    def grammar_phrases(self) -> list[str]:
+        """Phrase list for a Vosk grammar covering every hotword and command word.
+        "[unk]" absorbs everything else (song names, chatter)."""
+        phrases = set(self.hotwords) | set(self.alias_to_action)
+        for _action, _pattern, mishearings in self._fallback:
+            phrases.update(mishearings)
+        return sorted(phrases) + ["[unk]"]
+
+    def parse_command(self, command_text: str) -> tuple[Optional[str], str]:
+        """Split a forwarded command string into (canonical action, args)."""
+        m = self._command_re.match(command_text.lower().strip())
+        if not m:
+            return None, command_text.strip()
+        # Slice args from the original so song names keep their casing
+        stripped = command_text.strip()
+        return self.alias_to_action[m.group("action")], stripped[len(stripped) - len(m.group("args")):].strip()
+
+
+def _load_config() -> tuple:
+    hotwords = list(DEFAULT_HOTWORDS)
+    aliases = {k: list(v) for k, v in DEFAULT_ALIASES.items()}
+    fallback = {k: list(v) for k, v in DEFAULT_FALLBACK.items()}
+
+    path = os.getenv("VOICE_COMMANDS_FILE")
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                extra = json.load(f)
+            hotwords += extra.get("hotwords", [])
+            for action, words in (extra.get("aliases") or {}).items():
+                aliases.setdefault(action, []).extend(words)
+            for action, words in (extra.get("fallback") or {}).items():
+                fallback.setdefault(action, []).extend(words)
+            logger.info(f"[Companion] Loaded extra voice command aliases from {path}")
+        except Exception as e:
+            logger.error(f"[Companion] Failed to load VOICE_COMMANDS_FILE {path}: {e}")
+    return hotwords, aliases, fallback
+
+
+_matcher: Optional[CommandMatcher] = None
+
+
+def get_matcher() -> CommandMatcher:
+    """Return the process-wide matcher, compiling it on first use."""
+    global _matcher
+    if _matcher is None:
+        _matcher = CommandMatcher(*_load_config())
+    return _matcher
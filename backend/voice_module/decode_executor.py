@@ -0,0 +1,194 @@
+"""
+decode_executor.py — Dedicated, bounded executor for Vosk decoding.
+
+Kaldi decoding is CPU-bound and used to run on the event loop's default
+thread pool, the same one `asyncio.to_thread` uses for yt-dlp extraction,
+so a few long utterances could starve playlist URL resolution.
+
+Decodes now run on their own small thread pool (Kaldi releases the GIL while
+decoding, and threads share the one in-RAM model where a process pool would
+load a copy per worker). Waiting jobs are queued per guild and served
+round-robin so one noisy channel can't monopolise the workers. Each guild's
+queue is bounded: when it overflows, the oldest (stalest) utterance is
+dropped, and anything that waited longer than the max age is dropped at
+dequeue time instead of being decoded late.
+
+Streaming mode is different: dropping a chunk from the middle of an open
+stream corrupts speech that was being recognised fine. Stream jobs are
+never dropped; instead each guild may only have so many streams open at
+once, and a speaker beyond that is refused when their stream would open.
+
+Env vars:
+    VOSK_DECODE_WORKERS      Decode threads (default: 2)
+    VOSK_DECODE_QUEUE        Max waiting utterances per guild (default: 2)
+    VOSK_DECODE_MAX_AGE      Seconds an utterance may wait before it is dropped (default: 10)
+    VOSK_DECODE_STREAMS      Max open streams per guild in streaming mode (default: 3)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ("fn", "args", "future", "enqueued_at", "droppable")
+
+    def __init__(self, fn: Callable, args: tuple, future: asyncio.Future, droppable: bool = True):
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.droppable = droppable
+
+
+class DecodeExecutor:
+    def __init__(self, workers: int = 2, per_guild_queue: int = 2, max_age: float = 10.0, per_guild_streams: int = 3):
+        self.workers = max(1, workers)
+        self.per_guild_queue = max(1, per_guild_queue)
+        self.max_age = max_age
+        self.per_guild_streams = max(1, per_guild_streams)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vosk-decode")
+
+        self._queues: dict[int, deque[_Job]] = {}
+        # Guilds with waiting jobs, in round-robin order
+        self._ready: deque[int] = deque()
+        self._running = 0
+        # Open streams per guild. Released from whichever thread closes the
+        # stream (finish() runs on a decode worker), hence the lock.
+        self._streams: dict[int, int] = {}
+        self._streams_lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped_overflow = 0
+        self.dropped_stale = 0
+        self.streams_refused = 0
+
+    def open_stream(self, guild_id: int) -> bool:
+        """Take one of the guild's stream slots; False if they are all in use.
+        Pair every successful call with close_stream()."""
+        with self._streams_lock:
+            count = self._streams.get(guild_id, 0)
+            if count >= self.per_guild_streams:
+                self.streams_refused += 1
+                return False
+            self._streams[guild_id] = count + 1
+            return True
+
+    def close_stream(self, guild_id: int):
+        with self._streams_lock:
+            count = self._streams.get(guild_id, 0) - 1
+            if count > 0:
+                self._streams[guild_id] = count
+            else:
+                self._streams.pop(guild_id, None)
+
+    async def submit(self, guild_id: int, fn: Callable, *args, droppable: bool = True) -> Optional[Any]:
+        """Queue `fn(*args)` for `guild_id`. Returns its result, or None if the
+        job was dropped by back-pressure. Jobs with droppable=False (stream
+        feeds and finishes) are never dropped; they are bounded by the
+        stream slots instead."""
+        loop = asyncio.get_running_loop()
+        job = _Job(fn, args, loop.create_future(), droppable)
+        self.submitted += 1
+
+        queue = self._queues.get(guild_id)
+        if queue is None:
+            queue = self._queues[guild_id] = deque()
+        if not queue:
+            self._ready.append(guild_id)
+        elif droppable:
+            waiting = [queued for queued in queue if queued.droppable]
+            if len(waiting) >= self.per_guild_queue:
+                stale = waiting[0]
+                queue.remove(stale)
+                self.dropped_overflow += 1
+                if not stale.future.done():
+                    stale.future.set_result(None)
+                logger.info(f"[Companion] Decode queue full for guild {guild_id}. Dropped oldest utterance.")
+        queue.append(job)
+
+        self._pump(loop)
+        return await job.future
+
+    def _next_job(self) -> Optional[_Job]:
+        now = time.monotonic()
+        while self._ready:
+            guild_id = self._ready.popleft()
+            queue = self._queues.get(guild_id)
+            if not queue:
+                self._queues.pop(guild_id, None)
+                continue
+            job = queue.popleft()
+            if queue:
+                self._ready.append(guild_id)   # back of the line for fairness
+            else:
+                del self._queues[guild_id]
+
+            if job.droppable and now - job.enqueued_at > self.max_age:
+                self.dropped_stale += 1
+                if not job.future.done():
+                    job.future.set_result(None)
+                logger.info(f"[Companion] Dropped stale utterance for guild {guild_id}.")
+                continue
+            return job
+        return None
+
+    def _pump(self, loop: asyncio.AbstractEventLoop):
+        while self._running < self.workers:
+            job = self._next_job()
+            if job is None:
+                return
+            self._running += 1
+            cf = loop.run_in_executor(self.pool, job.fn, *job.args)
+            cf.add_done_callback(lambda f, job=job: self._on_done(loop, job, f))
+
+    def _on_done(self, loop: asyncio.AbstractEventLoop, job: _Job, fut: asyncio.Future):
+        self._running -= 1
+        self.completed += 1
+        if not job.future.done():
+            if fut.cancelled():
+                job.future.cancel()
+            elif fut.exception() is not None:
+                job.future.set_exception(fut.exception())
+            else:
+                job.future.set_result(fut.result())
+        self._pump(loop)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped_overflow": self.dropped_overflow,
+            "dropped_stale": self.dropped_stale,
+            "streams": sum(self._streams.values()),
+            "streams_refused": self.streams_refused,
+        }
+
+
+_executor: Optional[DecodeExecutor] = None
+
+
+def get_executor() -> DecodeExecutor:
+    """Return the process-wide decode executor, creating it from env on first use."""
+    global _executor
+    if _executor is None:
+        _executor = DecodeExecutor(
+            workers=env_number("VOSK_DECODE_WORKERS", 2),
+            per_guild_queue=env_number("VOSK_DECODE_QUEUE", 2),
+            max_age=env_number("VOSK_DECODE_MAX_AGE", 10.0),
+            per_guild_streams=env_number("VOSK_DECODE_STREAMS", 3),
+        )
+    return _executor
@@ -4,6 +4,8 @@ import asyncio
 from discord.ext import commands
 from discord.ext import voice_recv
 from .audio_sink import FlakeAudioSink
+from . import model_pool
+from .command_matcher import get_matcher
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +62,10 @@ class ListenerBot(commands.Bot):
             discord.opus.Decoder.decode = patched_decode
             logger.info("Monkey-patched discord.opus.Decoder to safely ignore corrupted streams.")
 
+        # Load the shared Vosk model now so the first /ai enable doesn't stall on disk I/O
+        if model_pool.preload_enabled():
+            await asyncio.to_thread(model_pool.get_model)
+
     async def on_ready(self):
         logger.info(f"Voice Listener Bot logged in as {self.user} (ID: {self.user.id})")
         # Go invisible/offline to avoid confusing users
@@ -105,7 +111,7 @@ class ListenerBot(commands.Bot):
             async def handle_transcript(user_id, transcript):
                 await self.process_transcript(channel.guild.id, text_channel_id, user_id, transcript)
                 
-            sink = FlakeAudioSink.start_listening(vc, handle_transcript)
+            sink = FlakeAudioSink.start_listening(vc, handle_transcript, guild_id=channel.guild.id)
             self.active_sinks[channel.guild.id] = sink
             logger.info(f"Listener bot joined {channel.name} and started FlakeAudioSink.")
             
@@ -139,58 +145,34 @@ class ListenerBot(commands.Bot):
             return True
         return False
 
+    async def leave_guild(self, guild_id: int) -> bool:
+        """Leave a guild entirely (the main bot was removed from it)"""
+        guild = self.get_guild(guild_id)
+        if not guild:
+            return False
+        await guild.leave()
+        return True
+
+    async def voice_stats(self) -> dict:
+        """Shared Vosk model / recognizer pool, decode queue, VAD and latency stats"""
+        from .decode_executor import get_executor
+        from . import vad, metrics
+        voice = model_pool.stats()
+        voice["decode"] = get_executor().stats()
+        voice["vad"] = vad.stats()
+        voice["latency"] = metrics.stats()
+        return voice
+
     async def process_transcript(self, guild_id: int, text_channel_id: int, user_id: int, transcript: str):
         """
         Parses the transcript for 'hey flake' or variations and triggers the main bot callback.
         """
-        text = transcript.lower().strip()
-        
-        # Possible hotwords (English and potential phonetic Bangla interpretations)
-        # Vosk 'small' models often mishear "flake" as "flick", "flea", "placebo", etc.
-        hotwords = [
-            "hey flake", "hi flake", "hello flake", "hey flex", 
-            "hey flick", "এ ফ্লেক", "হে ফ্লেক", "a flick", 
-            "any flick", "hey flic", "a plane", "hey fly",
-            "hey flack", "play flick", "hey plague"
-        ]
-        
-        # If any variations match the start, or close to it
-        matched_hotword = None
-        for hw in hotwords:
-            if text.startswith(hw):
-                matched_hotword = hw
-                break
-                
-        # Fallback: if it's really struggling, just assume if it has "play" or "stop"
-        # Since it's a music bot, let's treat generic "play X" as a command if enabled
-        fallback_action = None
-        if not matched_hotword:
-            if "play" in text or "placebo" in text or "bleach" in text:
-                fallback_action = "play"
-            elif "stop" in text or "pause" in text:
-                fallback_action = "stop"
-            elif "skip" in text or "next" in text:
-                fallback_action = "skip"
+        # Hotword, canonical action and argument span in one compiled-regex pass
+        # (falls back to bare "play"/"stop"/"skip" keywords when no hotword is heard)
+        match = get_matcher().match(transcript)
 
-        if matched_hotword or fallback_action:
-            if matched_hotword:
-                command_text = text[len(matched_hotword):].strip()
-            else:
-                # If doing a fallback catch, parse everything after the action word
-                if fallback_action == "play":
-                     # Replace common mishearings for "play"
-                     text = text.replace("placebo", "play").replace("bleach", "play")
-                     try:
-                         command_text = text[text.index("play"):]
-                     except ValueError:
-                         command_text = text
-                else:
-                     command_text = fallback_action
-                     
-            
-            # Clean up command text (e.g. "hey flake play..." -> "play...")
-            # Sometimes Speech API adds punctuation
-            command_text = command_text.lstrip(",.!?;: ")
+        if match:
+            command_text = match.text
             
             if command_text:
                 logger.info(f"Hotword detected! Command: '{command_text}' from user {user_id}")
@@ -0,0 +1,294 @@
+"""
+listener_process.py — Run the companion ListenerBot in its own worker process.
+
+Opus decode, PCM buffering, resampling and Vosk all run in the listener, and
+in-process they share one event loop (and one GIL) with the main bot's
+playback events and the FastAPI server. With VOICE_LISTENER_PROCESS=true the
+main process starts `python -m backend.voice_module.listener_process` instead
+and talks to it over a local TCP socket:
+
+    main -> worker   join / leave / leave_guild / main_bot_id / stats / shutdown (requests)
+    worker -> main   command  (a recognised voice command for Music._handle_voice_command)
+
+Messages are JSON lines. The socket only listens on 127.0.0.1, and the
+worker must present a per-launch token before anything else is accepted. If
+the worker dies it is restarted after a short delay.
+
+Env vars:
+    VOICE_LISTENER_PROCESS   "true" to run the listener in a separate process (default: false)
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import secrets
+import sys
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_ENV_PORT = "FLAKE_LISTENER_IPC_PORT"
+_ENV_TOKEN = "FLAKE_LISTENER_IPC_TOKEN"
+_ENV_MAIN_BOT_ID = "FLAKE_LISTENER_MAIN_BOT_ID"
+
+RESTART_DELAY = 5.0
+
+
+def enabled() -> bool:
+    return os.getenv("VOICE_LISTENER_PROCESS", "false").lower() == "true"
+
+
+# ---------------------------------------------------------------------------
+# JSON-lines RPC channel (used by both sides)
+# ---------------------------------------------------------------------------
+
+class IpcChannel:
+    """Bidirectional request/notify channel over an asyncio stream pair.
+
+    `handler(op, message)` is awaited for every incoming request or
+    notification; its return value is sent back for requests.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 handler: Callable[[str, dict], Awaitable[Any]]):
+        self.reader = reader
+        self.writer = writer
+        self.handler = handler
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self.closed = False
+
+    async def _send(self, message: dict):
+        self.writer.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+        await self.writer.drain()
+
+    async def notify(self, op: str, **payload):
+        await self._send({"op": op, **payload})
+
+    async def request(self, op: str, timeout: float = 30.0, **payload) -> Any:
+        if self.closed:
+            raise ConnectionError("listener IPC channel is closed")
+        msg_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        try:
+            await self._send({"id": msg_id, "op": op, **payload})
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+
+    async def _handle(self, message: dict):
+        msg_id = message.get("id")
+        try:
+            result = await self.handler(message.get("op"), message)
+            if msg_id is not None:
+                await self._send({"reply": msg_id, "result": result})
+        except Exception as e:
+            logger.error(f"[Companion] IPC handler for '{message.get('op')}' failed: {e}")
+            if msg_id is not None and not self.closed:
+                await self._send({"reply": msg_id, "error": str(e)})
+
+    async def serve(self):
+        """Read messages until the peer disconnects."""
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                reply_to = message.get("reply")
+                if reply_to is not None:
+                    future = self._pending.get(reply_to)
+                    if future and not future.done():
+                        if "error" in message:
+                            future.set_exception(RuntimeError(message["error"]))
+                        else:
+                            future.set_result(message.get("result"))
+                    continue
+                # Run handlers concurrently so a slow join doesn't block commands
+                asyncio.create_task(self._handle(message))
+        finally:
+            self.closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("listener IPC channel closed"))
+            self.writer.close()
+
+
+# ---------------------------------------------------------------------------
+# Main-process side
+# ---------------------------------------------------------------------------
+
+class ListenerProcess:
+    """Stands in for ListenerBot in the main process and forwards calls to the
+    worker. Exposes the same methods the main bot, Music cog and API use."""
+
+    def __init__(self, main_bot_callback, main_bot_id: int = 0):
+        self.main_bot_callback = main_bot_callback
+        self._main_bot_id = main_bot_id
+        self._token = secrets.token_hex(16)
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._channel: Optional[IpcChannel] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def main_bot_id(self) -> int:
+        return self._main_bot_id
+
+    @main_bot_id.setter
+    def main_bot_id(self, value: int):
+        self._main_bot_id = value
+        if self._channel and not self._channel.closed:
+            asyncio.create_task(self._channel.notify("main_bot_id", main_bot_id=value))
+
+    async def start(self, token: str):
+        """Start the IPC server and the worker process (restarted if it exits)."""
+        self._server = await asyncio.start_server(self._on_connect, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self._supervisor = asyncio.create_task(self._supervise(token, port))
+
+    async def _supervise(self, token: str, port: int):
+        while not self._closing:
+            env = dict(os.environ)
+            env["DISCORD_LISTENER_TOKEN"] = token
+            env[_ENV_PORT] = str(port)
+            env[_ENV_TOKEN] = self._token
+            env[_ENV_MAIN_BOT_ID] = str(self._main_bot_id)
+            self._process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "backend.voice_module.listener_process", env=env
+            )
+            logger.info(f"[Companion] Listener worker started (pid {self._process.pid}).")
+            code = await self._process.wait()
+            if self._closing:
+                break
+            logger.error(f"[Companion] Listener worker exited with code {code}. Restarting in {RESTART_DELAY:.0f}s.")
+            await asyncio.sleep(RESTART_DELAY)
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            hello = json.loads(await asyncio.wait_for(reader.readline(), 10.0) or b"{}")
+        except Exception:
+            hello = {}
+        if hello.get("op") != "hello" or not secrets.compare_digest(str(hello.get("token", "")), self._token):
+            logger.warning("[Companion] Rejected listener IPC connection with a bad token.")
+            writer.close()
+            return
+
+        channel = IpcChannel(reader, writer, self._handle)
+        self._channel = channel
+        logger.info("[Companion] Listener worker connected.")
+        await channel.notify("main_bot_id", main_bot_id=self._main_bot_id)
+        await channel.serve()
+        if self._channel is channel:
+            self._channel = None
+        logger.info("[Companion] Listener worker disconnected.")
+
+    async def _handle(self, op: str, message: dict):
+        if op == "command" and self.main_bot_callback:
+            # main_bot_callback signature: async def cb(guild_id, text_channel_id, user_id, command_string)
+            await self.main_bot_callback(
+                message["guild_id"], message["text_channel_id"], message["user_id"], message["command"]
+            )
+
+    async def _call(self, op: str, default=None, timeout: float = 30.0, **payload):
+        channel = self._channel
+        if channel is None or channel.closed:
+            logger.error(f"[Companion] Listener worker is not connected; '{op}' ignored.")
+            return default
+        try:
+            return await channel.request(op, timeout=timeout, **payload)
+        except Exception as e:
+            logger.error(f"[Companion] Listener worker call '{op}' failed: {e}")
+            return default
+
+    async def join_channel(self, text_channel_id: int, voice_channel_id: int) -> bool:
+        return bool(await self._call("join", False, text_channel_id=text_channel_id, voice_channel_id=voice_channel_id))
+
+    async def leave_channel(self, guild_id: int) -> bool:
+        return bool(await self._call("leave", False, guild_id=guild_id))
+
+    async def leave_guild(self, guild_id: int) -> bool:
+        return bool(await self._call("leave_guild", False, guild_id=guild_id))
+
+    async def voice_stats(self) -> Optional[dict]:
+        stats = await self._call("stats", None, timeout=5.0)
+        if stats is not None:
+            stats["process"] = {"pid": self._process.pid if self._process else None}
+        return stats
+
+    async def close(self):
+        self._closing = True
+        if self._channel and not self._channel.closed:
+            await self._call("shutdown", None, timeout=5.0)
+        if self._process and self._process.returncode is None:
+            try:
+                await asyncio.wait_for(self._process.wait(), 10.0)
+            except asyncio.TimeoutError:
+                self._process.kill()
+        if self._server:
+            self._server.close()
+
+
+# ---------------------------------------------------------------------------
+# Worker-process side
+# ---------------------------------------------------------------------------
+
+async def _run_worker():
+    from .listener_bot import ListenerBot
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", int(os.environ[_ENV_PORT]))
+    channel: Optional[IpcChannel] = None
+
+    async def forward_command(guild_id, text_channel_id, user_id, command_text):
+        await channel.notify(
+            "command", guild_id=guild_id, text_channel_id=text_channel_id, user_id=user_id, command=command_text
+        )
+
+    bot = ListenerBot(forward_command, main_bot_id=int(os.getenv(_ENV_MAIN_BOT_ID, "0")))
+
+    async def handle(op: str, message: dict):
+        if op == "join":
+            return await bot.join_channel(message["text_channel_id"], message["voice_channel_id"])
+        if op == "leave":
+            return await bot.leave_channel(message["guild_id"])
+        if op == "leave_guild":
+            return await bot.leave_guild(message["guild_id"])
+        if op == "main_bot_id":
+            bot.main_bot_id = message["main_bot_id"]
+            return True
+        if op == "stats":
+            return await bot.voice_stats()
+        if op == "shutdown":
+            asyncio.create_task(bot.close())
+            return True
+        raise ValueError(f"unknown op '{op}'")
+
+    channel = IpcChannel(reader, writer, handle)
+    await channel.notify("hello", token=os.environ[_ENV_TOKEN])
+
+    serve_task = asyncio.create_task(channel.serve())
+    bot_task = asyncio.create_task(bot.start(os.environ["DISCORD_LISTENER_TOKEN"]))
+    await asyncio.wait({serve_task, bot_task}, return_when=asyncio.FIRST_COMPLETED)
+    # Main process went away (or the bot stopped) — shut everything down
+    if not bot.is_closed():
+        await bot.close()
+    serve_task.cancel()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    if os.getenv("COMPANION_LOGS", "false").lower() != "true":
+        logging.getLogger("discord.ext.voice_recv").setLevel(logging.ERROR)
+    asyncio.run(_run_worker())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+metrics.py — Per-stage latency histograms for the voice pipeline.
+
+Stages recorded (seconds, exported as millisecond histograms):
+
+    sink.speech          first kept frame of an utterance -> last frame
+    sink.silence_wait    last frame -> end-of-utterance deadline fired
+    sink.resample        ring downmix + 48 kHz -> 16 kHz resample
+    sink.dispatch        transcript handed to the callback -> callback returned
+    sink.end_to_end      last frame -> transcript dispatched (includes the silence wait)
+    recognizer.queue     waiting for a decode worker
+    recognizer.resample  stereo -> mono + resample inside the worker (unconverted input only)
+    recognizer.kaldi     Kaldi decode (both passes in grammar mode)
+    recognizer.stream_feed  one incremental decode call in streaming mode
+
+Histograms are cheap (fixed buckets, one lock) and are surfaced through
+/bot/status and the offline replay benchmark (backend/scripts/voice_benchmark.py).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+
+# Upper bounds in milliseconds; the last bucket catches everything above
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile, capped at the max seen."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(float(self.buckets[i]), self.max_ms) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 2),
+            "buckets_ms": {
+                **{str(b): n for b, n in zip(self.buckets, self.counts)},
+                "+inf": self.counts[-1],
+            },
+        }
+
+
+_histograms: dict[str, Histogram] = {}
+# Decode stages are recorded from executor threads
+_lock = threading.Lock()
+
+
+def observe(stage: str, seconds: float):
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = Histogram()
+        hist.observe(seconds * 1000.0)
+
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+def stats() -> dict:
+    with _lock:
+        return {stage: hist.snapshot() for stage, hist in sorted(_histograms.items())}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
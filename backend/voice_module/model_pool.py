@@ -0,0 +1,257 @@
+"""
+model_pool.py — Process-wide Vosk model registry for the companion listener.
+
+Loading a Vosk model costs seconds of disk I/O and tens to hundreds of MB of
+RAM, so every model is loaded exactly once per process and shared by all
+FlakeAudioSinks. KaldiRecognizer instances are handed out from a bounded pool
+and reset/reused instead of being rebuilt for every utterance.
+
+Env vars:
+    VOSK_MODEL_PATH          Model directory (default: ./backend/models/vosk-model-small-en-us-0.15)
+    VOSK_PRELOAD             "true" to load the model when the listener starts instead of on first use
+    VOSK_RECOGNIZER_POOL     Max recognizers alive at once per pool (default: 8)
+    VOSK_GRAMMAR             "true" to decode command words against a restricted grammar first
+                             and run free-text decoding only on the song-name tail
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "./backend/models/vosk-model-small-en-us-0.15"
+VOSK_RATE = 16000
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except Exception:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Model registry
+# ---------------------------------------------------------------------------
+
+class _ModelEntry:
+    def __init__(self, path: str):
+        self.path = path
+        self.model = None
+        self.failed = False
+        self.load_seconds = 0.0
+        self.rss_delta_mb: Optional[float] = None
+        self.lock = threading.Lock()
+
+
+_models: dict[str, _ModelEntry] = {}
+_models_lock = threading.Lock()
+
+
+def model_path() -> str:
+    return os.getenv("VOSK_MODEL_PATH", DEFAULT_MODEL_PATH)
+
+
+def get_model(path: Optional[str] = None):
+    """Return the shared vosk.Model for `path`, loading it on first use.
+
+    Blocking — call through an executor from async code. Returns None if the
+    model is missing or failed to load (the failure is remembered so we don't
+    hammer the disk on every utterance).
+    """
+    path = path or model_path()
+    with _models_lock:
+        entry = _models.get(path)
+        if entry is None:
+            entry = _models[path] = _ModelEntry(path)
+
+    if entry.model is not None or entry.failed:
+        return entry.model
+
+    with entry.lock:
+        if entry.model is not None or entry.failed:
+            return entry.model
+
+        if not os.path.exists(path):
+            logger.error(f"[Companion] Vosk model not found at {path}. Voice recognition will not work.")
+            entry.failed = True
+            return None
+
+        logger.info(f"[Companion] Loading Vosk model into RAM from {path} (shared by all sinks)...")
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        try:
+            from vosk import Model
+            entry.model = Model(path)
+        except Exception as e:
+            logger.error(f"[Companion] Failed to load Vosk model: {e}")
+            entry.failed = True
+            return None
+
+        entry.load_seconds = time.perf_counter() - started
+        rss_after = _rss_mb()
+        if rss_before is not None and rss_after is not None:
+            entry.rss_delta_mb = round(rss_after - rss_before, 1)
+        logger.info(
+            f"[Companion] Vosk model loaded in {entry.load_seconds:.2f}s"
+            f" (+{entry.rss_delta_mb} MB RSS)."
+        )
+        return entry.model
+
+
+# ---------------------------------------------------------------------------
+# Recognizer pool
+# ---------------------------------------------------------------------------
+
+class RecognizerPool:
+    """Bounded pool of KaldiRecognizers bound to one model/sample-rate/grammar.
+
+    Idle recognizers are reset and reused; at most `max_size` exist at once.
+    `acquire` blocks (up to `timeout`) when every recognizer is in use and
+    returns None on timeout so callers can drop the utterance instead of
+    piling up work.
+    """
+
+    def __init__(self, model, rate: int = VOSK_RATE, max_size: int = 8, grammar: Optional[str] = None):
+        self.model = model
+        self.rate = rate
+        # JSON phrase list; grammar recognizers also report per-word timings
+        self.grammar = grammar
+        self.max_size = max(1, max_size)
+        self._idle: list = []
+        self._created = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    def _new_recognizer(self):
+        from vosk import KaldiRecognizer
+        if self.grammar is None:
+            return KaldiRecognizer(self.model, self.rate)
+        rec = KaldiRecognizer(self.model, self.rate, self.grammar)
+        rec.SetWords(True)
+        return rec
+
+    def acquire(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    self._in_use += 1
+                    return self._idle.pop()
+                if self._created < self.max_size:
+                    self._created += 1
+                    self._in_use += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+        # Build outside the lock — KaldiRecognizer construction takes a few ms
+        try:
+            return self._new_recognizer()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, rec) -> None:
+        try:
+            rec.Reset()
+            reusable = True
+        except Exception:
+            reusable = False
+        with self._cond:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append(rec)
+            else:
+                self._created -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def recognizer(self, timeout: Optional[float] = None) -> Iterator:
+        rec = self.acquire(timeout)
+        try:
+            yield rec
+        finally:
+            if rec is not None:
+                self.release(rec)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self._created,
+                "max_size": self.max_size,
+            }
+
+
+_pools: dict[tuple, RecognizerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_size() -> int:
+    return max(1, env_number("VOSK_RECOGNIZER_POOL", 8))
+
+
+def get_pool(rate: int = VOSK_RATE, path: Optional[str] = None, grammar: Optional[str] = None) -> Optional[RecognizerPool]:
+    """Return the shared recognizer pool for the model at `path` (and the
+    optional JSON `grammar`), or None if the model could not be loaded.
+    Blocking on first call (loads the model)."""
+    path = path or model_path()
+    key = (path, rate, grammar)
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+
+    model = get_model(path)
+    if model is None:
+        return None
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = RecognizerPool(model, rate, _pool_size(), grammar)
+    return pool
+
+
+def preload_enabled() -> bool:
+    return os.getenv("VOSK_PRELOAD", "false").lower() == "true"
+
+
+def grammar_enabled() -> bool:
+    return os.getenv("VOSK_GRAMMAR", "false").lower() == "true"
+
+
+def stats() -> dict:
+    """Memory and recognizer usage for the status endpoint / logs."""
+    models = {
+        path: {
+            "loaded": entry.model is not None,
+            "failed": entry.failed,
+            "load_seconds": round(entry.load_seconds, 2),
+            "rss_delta_mb": entry.rss_delta_mb,
+        }
+        for path, entry in list(_models.items())
+    }
+    pools = [
+        {"model": path, "rate": rate, "grammar": grammar is not None, **pool.stats()}
+        for (path, rate, grammar), pool in list(_pools.items())
+    ]
+    return {
+        "models": models,
+        "recognizer_pools": pools,
+        "recognizers_in_use": sum(p["in_use"] for p in pools),
+        "process_rss_mb": round(_rss_mb() or 0.0, 1),
+    }
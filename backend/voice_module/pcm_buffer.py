@@ -0,0 +1,99 @@
+"""
+pcm_buffer.py — Fixed-capacity per-speaker PCM storage for the companion listener.
+
+Each speaker gets one ring buffer sized for the maximum utterance length,
+allocated the first time they talk and reused for every utterance after
+that. Packets are copied straight into it, so steady-state capture does not
+allocate per packet, and a user who never stops talking can't grow memory
+without bound — once full, the oldest audio is overwritten (the most recent
+N seconds are what contain a "hey flake ..." command).
+
+At flush time the stereo ring is downmixed into a preallocated mono scratch
+array through strided memoryviews; only the final 16 kHz resample allocates,
+and that buffer is what Kaldi consumes anyway.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Optional
+
+DISCORD_RATE = 48000
+# 16-bit stereo
+FRAME_BYTES = 4
+
+
+class PcmRingBuffer:
+    def __init__(self, max_seconds: float, rate: int = DISCORD_RATE):
+        frames = max(1, int(max_seconds * rate))
+        self.capacity = frames * FRAME_BYTES
+        self._buf = bytearray(self.capacity)
+        self._mv = memoryview(self._buf)
+        self._start = 0
+        self._len = 0
+        # 48 kHz mono scratch used by downmix(); same lifetime as the ring
+        self._mono = array("h", bytes(frames * 2))
+        # Bytes overwritten because an utterance ran past max_seconds
+        self.overflowed_bytes = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def write(self, data) -> None:
+        src = memoryview(data)
+        n = len(src) - len(src) % FRAME_BYTES
+        if n <= 0:
+            return
+        if n >= self.capacity:
+            # Only the newest `capacity` bytes can survive anyway
+            self.overflowed_bytes += self._len + n - self.capacity
+            src = src[n - self.capacity:n]
+            n = self.capacity
+            self._mv[:] = src
+            self._start = 0
+            self._len = n
+            return
+
+        end = (self._start + self._len) % self.capacity
+        first = min(n, self.capacity - end)
+        self._mv[end:end + first] = src[:first]
+        if n > first:
+            self._mv[:n - first] = src[first:n]
+
+        overflow = self._len + n - self.capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self.capacity
+            self._len = self.capacity
+            self.overflowed_bytes += overflow
+        else:
+            self._len += n
+
+    def downmix(self) -> memoryview:
+        """Copy the buffered audio, oldest first, into the mono scratch array
+        and return it as a byte view (valid until the next downmix()).
+
+        Takes the left channel: Discord voice is mono duplicated to both
+        channels, so averaging would only cost an extra pass.
+        """
+        samples = self._mv.cast("h")
+        out = memoryview(self._mono)
+        total = self._len // 2              # int16 samples (both channels)
+        start = self._start // 2
+        head = min(total, len(samples) - start)
+        head_frames = head // 2
+        out[:head_frames] = samples[start:start + head:2]
+        if total > head:
+            out[head_frames:total // 2] = samples[0:total - head:2]
+        return out[:total // 2].cast("B")
+
+    def to_vosk(self, vosk_rate: int = 16000, rate: int = DISCORD_RATE) -> Optional[bytes]:
+        """Downmix + resample the buffered utterance for Kaldi, then clear the ring."""
+        if not self._len:
+            return None
+        import audioop
+        converted, _state = audioop.ratecv(self.downmix(), 2, 1, rate, vosk_rate, None)
+        self.clear()
+        return converted
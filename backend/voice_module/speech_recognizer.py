@@ -2,66 +2,216 @@ import os
 import json
 import logging
 import asyncio
+import time
 from typing import Optional
-from vosk import Model, KaldiRecognizer
+from . import model_pool
+from . import metrics
+from .decode_executor import get_executor
+from .command_matcher import get_matcher
 
 logger = logging.getLogger(__name__)
 
+
+def _result_text(result_json_str: Optional[str], key: str = "text") -> str:
+    if not result_json_str:
+        return ""
+    return json.loads(result_json_str).get(key, "").strip()
+
+
+class RecognizerStream:
+    """A pooled KaldiRecognizer held for one speaker and fed 20 ms frames as
+    they arrive. All methods block, so call them through an executor."""
+
+    def __init__(self, pool: model_pool.RecognizerPool, rec, discord_rate: int, vosk_rate: int, guild_id: int = 0):
+        self.pool = pool
+        self.rec = rec
+        self.guild_id = guild_id
+        self.discord_rate = discord_rate
+        self.vosk_rate = vosk_rate
+        # ratecv keeps filter state between calls so frame boundaries don't click
+        self._ratecv_state = None
+
+    def feed(self, pcm: bytes) -> tuple[Optional[str], Optional[str]]:
+        """Feed 48 kHz stereo PCM. Returns (final_text, partial_text): final_text
+        is set when Kaldi's endpoint detector closes an utterance."""
+        import audioop
+        with metrics.timer("recognizer.stream_feed"):
+            mono_audio = audioop.tomono(pcm, 2, 0.5, 0.5)
+            converted_audio, self._ratecv_state = audioop.ratecv(
+                mono_audio, 2, 1, self.discord_rate, self.vosk_rate, self._ratecv_state
+            )
+            if self.rec.AcceptWaveform(converted_audio):
+                return _result_text(self.rec.Result()), None
+            return None, _result_text(self.rec.PartialResult(), "partial")
+
+    def finish(self) -> str:
+        """Flush whatever is still buffered and return the recognizer to the pool."""
+        try:
+            return _result_text(self.rec.FinalResult())
+        finally:
+            self.close()
+
+    def close(self):
+        if self.rec is not None:
+            self.pool.release(self.rec)
+            self.rec = None
+            get_executor().close_stream(self.guild_id)
+
+
 class SpeechRecognizer:
-    def __init__(self):
+    def __init__(self, guild_id: int = 0):
+        self.guild_id = guild_id
         self.companion_logs_enabled = os.getenv("COMPANION_LOGS", "false").lower() == "true"
-        
-        # Load local Vosk Model
-        model_path = os.getenv("VOSK_MODEL_PATH", "./backend/models/vosk-model-small-en-us-0.15")
-        
-        if not os.path.exists(model_path):
-            logger.error(f"[Companion] Vosk model not found at {model_path}. Voice recognition will not work.")
-            self.model = None
-            return
-            
-        if self.companion_logs_enabled:
-            logger.info(f"[Companion] Loading Free Vosk Model into RAM from {model_path}...")
-            
-        try:
-            self.model = Model(model_path)
-            # Discord gives 48000Hz stereo
-            self.discord_rate = 48000
-            # Vosk small models are trained on 16000Hz mono
-            self.vosk_rate = 16000
+        # Discord gives 48000Hz stereo
+        self.discord_rate = 48000
+        # Vosk small models are trained on 16000Hz mono
+        self.vosk_rate = model_pool.VOSK_RATE
+        # The Vosk model itself lives in model_pool and is shared by every sink,
+        # so constructing a SpeechRecognizer per guild is cheap.
+        self.pool: Optional[model_pool.RecognizerPool] = None
+        # Grammar mode: command words are decoded against a small phrase list
+        # and only the song-name tail goes through free-text decoding
+        self.grammar_enabled = model_pool.grammar_enabled()
+        self.grammar_pool: Optional[model_pool.RecognizerPool] = None
+
+    async def _get_pool(self) -> Optional[model_pool.RecognizerPool]:
+        if self.pool is None:
+            loop = asyncio.get_event_loop()
+            # First call may load the model from disk — keep it off the event loop
+            self.pool = await loop.run_in_executor(None, model_pool.get_pool, self.vosk_rate)
+            if self.pool and self.grammar_enabled:
+                grammar = json.dumps(get_matcher().grammar_phrases(), ensure_ascii=False)
+                self.grammar_pool = await loop.run_in_executor(
+                    None, model_pool.get_pool, self.vosk_rate, None, grammar
+                )
+        return self.pool
+
+    def _decode_grammar(self, pcm_bytes: bytes) -> Optional[str]:
+        """Two-pass decode (blocking): command vocabulary first, then free text
+        only on the audio after a "play" word. Returns a result JSON string
+        shaped like KaldiRecognizer.FinalResult(), or None if no recognizer."""
+        with self.grammar_pool.recognizer(timeout=5.0) as rec:
+            if rec is None:
+                return None
+            rec.AcceptWaveform(pcm_bytes)
+            result = json.loads(rec.FinalResult())
+
+        # Words outside the grammar come back as "[unk]"
+        words = [w for w in result.get("result", []) if w.get("word") != "[unk]"]
+        text = " ".join(w["word"] for w in words)
+        if not text:
+            # No hotword or command word at all: nothing worth a full decode
+            return json.dumps({"text": ""})
+
+        offset = get_matcher().args_offset(text)
+        if offset is None:
+            # skip / stop / pause — the grammar pass already has everything
+            return json.dumps({"text": text})
+
+        # Map the argument's character offset back to audio: the tail starts
+        # where the last word before it (the action word) ended
+        tail_start = 0.0
+        pos = 0
+        for w in words:
+            pos += len(w["word"])
+            if pos > offset:
+                break
+            tail_start = w.get("end", tail_start)
+            pos += 1
+        byte_offset = int(tail_start * self.vosk_rate) * 2
+        tail = pcm_bytes[byte_offset:]
+
+        tail_text = ""
+        if tail:
+            with self.pool.recognizer(timeout=5.0) as rec:
+                if rec is None:
+                    return None
+                rec.AcceptWaveform(tail)
+                tail_text = _result_text(rec.FinalResult())
+        return json.dumps({"text": f"{text[:offset].strip()} {tail_text}".strip()})
+
+    async def open_stream(self) -> Optional[RecognizerStream]:
+        """Borrow a recognizer for incremental decoding, or None if the model is
+        unavailable, the guild already has its maximum of open streams, or
+        every pooled recognizer is already taken."""
+        pool = await self._get_pool()
+        if not pool:
+            return None
+        executor = get_executor()
+        # Back-pressure happens here, once per utterance: an open stream's
+        # chunks are never dropped, so a guild can't have unlimited streams
+        if not executor.open_stream(self.guild_id):
             if self.companion_logs_enabled:
-                logger.info("[Companion] Vosk Model Loaded Successfully.")
-        except Exception as e:
-            logger.error(f"[Companion] Failed to load Vosk model: {e}")
-            self.model = None
+                logger.info(f"[Companion] Guild {self.guild_id} has too many open streams. Ignoring speaker.")
+            return None
+        rec = None
+        try:
+            loop = asyncio.get_event_loop()
+            rec = await loop.run_in_executor(executor.pool, pool.acquire, 0)
+        finally:
+            if rec is None:
+                executor.close_stream(self.guild_id)
+        if rec is None:
+            logger.warning("[Companion] All Vosk recognizers busy. Cannot open stream.")
+            return None
+        return RecognizerStream(pool, rec, self.discord_rate, self.vosk_rate, self.guild_id)
 
-    async def recognize(self, audio_data: bytes) -> Optional[str]:
+    async def recognize(self, audio_data: bytes, converted: bool = False) -> Optional[str]:
         """
         Processes raw PCM audio bytes locally using Vosk Speech Recognition.
+
+        `audio_data` is Discord's 48 kHz stereo PCM, or 16 kHz mono when
+        `converted` is True (see PcmRingBuffer.to_vosk).
         """
-        if not self.model:
+        pool = await self._get_pool()
+        if not pool:
             return None
             
-        # Audio conversion: Discord gives 48000 Hz, 16-bit, stereo.
-        # Vosk expects 16000 Hz, 16-bit, mono.
-        import audioop
-        
-        # 1. Convert Stereo to Mono
-        mono_audio = audioop.tomono(audio_data, 2, 0.5, 0.5)
-        
-        # 2. Resample from 48000 to 16000
-        converted_audio, _State = audioop.ratecv(mono_audio, 2, 1, self.discord_rate, self.vosk_rate, None)
-        
-        def run_kaldi(pcm_bytes):
-            # Create a fresh recognizer per chunk to clear context history between pauses
-            rec = KaldiRecognizer(self.model, self.vosk_rate)
-            # AcceptWaveform returns True if silence found, False if speech.
-            # We just want the final result of the chunk.
-            rec.AcceptWaveform(pcm_bytes)
-            return rec.FinalResult()
+        submitted = time.perf_counter()
+
+        def run_kaldi(audio_data):
+            metrics.observe("recognizer.queue", time.perf_counter() - submitted)
+            if converted:
+                pcm_bytes = audio_data
+            else:
+                resample_started = time.perf_counter()
+                # Audio conversion: Discord gives 48000 Hz, 16-bit, stereo.
+                # Vosk expects 16000 Hz, 16-bit, mono.
+                # Done here so the conversion also runs on the decode workers.
+                import audioop
+
+                # 1. Convert Stereo to Mono
+                mono_audio = audioop.tomono(audio_data, 2, 0.5, 0.5)
+
+                # 2. Resample from 48000 to 16000
+                pcm_bytes, _State = audioop.ratecv(mono_audio, 2, 1, self.discord_rate, self.vosk_rate, None)
+                metrics.observe("recognizer.resample", time.perf_counter() - resample_started)
+
+            if self.grammar_pool is not None:
+                with metrics.timer("recognizer.kaldi"):
+                    result = self._decode_grammar(pcm_bytes)
+                if result is None:
+                    logger.warning("[Companion] All Vosk recognizers busy. Dropping utterance.")
+                return result
+
+            # Borrow a pooled recognizer; it is Reset() on release so no context
+            # history leaks between pauses. Give up if every recognizer stays busy.
+            with pool.recognizer(timeout=5.0) as rec:
+                if rec is None:
+                    logger.warning("[Companion] All Vosk recognizers busy. Dropping utterance.")
+                    return None
+                # AcceptWaveform returns True if silence found, False if speech.
+                # We just want the final result of the chunk.
+                with metrics.timer("recognizer.kaldi"):
+                    rec.AcceptWaveform(pcm_bytes)
+                    return rec.FinalResult()
 
         try:
-            loop = asyncio.get_event_loop()
-            result_json_str = await loop.run_in_executor(None, run_kaldi, converted_audio)
+            # Dedicated, per-guild fair decode pool; returns None if back-pressure
+            # dropped this utterance as stale
+            result_json_str = await get_executor().submit(self.guild_id, run_kaldi, audio_data)
+            if not result_json_str:
+                return None
             result_dict = json.loads(result_json_str)
             
             transcript = result_dict.get("text", "").strip()
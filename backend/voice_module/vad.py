@@ -0,0 +1,138 @@
+"""
+vad.py — Frame-level voice activity detection for the companion listener.
+
+Runs on every 20 ms PCM frame in FlakeAudioSink.write, before anything is
+buffered or decoded:
+
+  - Energy gate: a frame's RMS must clear both a fixed floor and an adaptive
+    noise floor (tracked over every frame: drops at once to quieter frames,
+    creeps up over several seconds), so steady music bleed or fan noise
+    raises the bar instead of counting as speech, even when it is louder
+    than the fixed floor.
+  - Zero-crossing gate: broadband clicks/hiss (keyboards, breathing into the
+    mic) cross zero far more often than voiced speech and are rejected.
+  - Leading silence is trimmed except for a short pre-roll so word onsets
+    aren't clipped; trailing silence is kept only for a short hangover.
+  - Utterances with too little detected speech are dropped at flush time
+    instead of being sent to Vosk.
+
+Env vars:
+    VOICE_VAD                 "false" to disable (default: true)
+    VOICE_VAD_ENERGY          Minimum frame RMS treated as speech (default: 300)
+    VOICE_VAD_MIN_SPEECH_MS   Speech needed for an utterance to be decoded (default: 500)
+"""
+from __future__ import annotations
+
+import audioop
+import logging
+import os
+from collections import deque
+
+from backend.utils.env import env_number
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 20
+SAMPLE_WIDTH = 2
+CHANNELS = 2
+
+# Process-wide counters, surfaced through /bot/status
+_counters = {
+    "frames_seen": 0,
+    "frames_dropped": 0,
+    "utterances_dropped": 0,
+}
+
+
+def enabled() -> bool:
+    return os.getenv("VOICE_VAD", "true").lower() == "true"
+
+
+def stats() -> dict:
+    return dict(_counters)
+
+
+class VoiceActivityDetector:
+    """Per-speaker VAD state. Not thread-safe; one instance per user."""
+
+    def __init__(
+        self,
+        min_energy: float | None = None,
+        min_speech_ms: int | None = None,
+        noise_ratio: float = 2.5,
+        max_zcr: float = 0.35,
+        preroll_frames: int = 5,
+        hangover_frames: int = 15,
+        noise_rise: float = 0.003,
+    ):
+        if min_energy is None:
+            min_energy = env_number("VOICE_VAD_ENERGY", 300.0)
+        if min_speech_ms is None:
+            min_speech_ms = env_number("VOICE_VAD_MIN_SPEECH_MS", 500)
+        self.min_energy = min_energy
+        self.min_speech_frames = max(1, min_speech_ms // FRAME_MS)
+        self.noise_ratio = noise_ratio
+        self.max_zcr = max_zcr
+        self.hangover_frames = hangover_frames
+        # Per-frame rise rate of the noise floor (~7 s time constant at 20 ms):
+        # slow enough that a few seconds of speech barely lift it
+        self.noise_rise = noise_rise
+
+        self.noise_floor = min_energy / noise_ratio
+        self._preroll: deque = deque(maxlen=preroll_frames)
+        self._hangover = 0
+        self.speech_frames = 0
+
+    def is_speech(self, pcm: bytes) -> bool:
+        samples = len(pcm) // SAMPLE_WIDTH
+        if not samples:
+            return False
+        rms = audioop.rms(pcm, SAMPLE_WIDTH)
+        threshold = max(self.min_energy, self.noise_floor * self.noise_ratio)
+        # Track the background level from every frame: gaps between words pull
+        # it straight down, while sustained sound (music bleed) pushes it up
+        if rms < self.noise_floor:
+            self.noise_floor = rms
+        else:
+            self.noise_floor += (rms - self.noise_floor) * self.noise_rise
+        if rms < threshold:
+            return False
+        # Discord sends mono voice duplicated on both channels, so crossings of
+        # the interleaved stream equal the per-channel count: normalise per frame
+        zcr = audioop.cross(pcm, SAMPLE_WIDTH) / (samples / CHANNELS)
+        return zcr <= self.max_zcr
+
+    def accept(self, pcm: bytes) -> tuple:
+        """Return the frames to keep for this packet (pre-roll + the frame
+        itself on speech onset, the frame during hangover, nothing otherwise)."""
+        _counters["frames_seen"] += 1
+        if self.is_speech(pcm):
+            self.speech_frames += 1
+            self._hangover = self.hangover_frames
+            if self._preroll:
+                frames = (*self._preroll, pcm)
+                self._preroll.clear()
+                return frames
+            return (pcm,)
+
+        if self._hangover > 0:
+            self._hangover -= 1
+            return (pcm,)
+
+        # Silence before (or long after) speech: remember for pre-roll, drop
+        if len(self._preroll) == self._preroll.maxlen:
+            _counters["frames_dropped"] += 1
+        self._preroll.append(pcm)
+        return ()
+
+    def end_utterance(self) -> bool:
+        """Reset for the next utterance; True if the finished one had enough
+        speech to be worth decoding."""
+        worth_decoding = self.speech_frames >= self.min_speech_frames
+        _counters["frames_dropped"] += len(self._preroll)
+        if not worth_decoding and self.speech_frames:
+            _counters["utterances_dropped"] += 1
+        self.speech_frames = 0
+        self._hangover = 0
+        self._preroll.clear()
+        return worth_decoding
@@ -3,20 +3,7 @@ import { useState, useEffect, useRef } from "react";
 import { Player } from "@/types/player";
 import { formatTime } from "@/lib/utils";
 import { proxyThumb } from "@/lib/api";
-import { api } from "@/lib/api";
-
-interface SessionTrack {
-  title: string;
-  author: string;
-  uri: string;
-  thumbnail: string | null;
-  duration: number;
-}
-
-interface SessionQueue {
-  tracks: SessionTrack[];
-  current_index: number;
-}
+import { useSessionQueue } from "@/hooks/useSessionQueue";
 
 interface QueueSectionProps {
   currentPlayer: Player;
@@ -46,28 +33,10 @@ export default function QueueSection({
   const [searchResults, setSearchResults] = useState<any[]>([]);
   const [isSearching, setIsSearching] = useState(false);
 
-  // Session queue state
-  const [session, setSession] = useState<SessionQueue>({ tracks: [], current_index: -1 });
+  // Session queue: a window around the current track, polled every 3 seconds
+  const session = useSessionQueue(selectedGuild, isQueueActive === "Queue");
   const currentRowRef = useRef<HTMLDivElement | null>(null);
 
-  // Poll session queue every 3 seconds
-  useEffect(() => {
-    if (!selectedGuild || isQueueActive !== "Queue") return;
-
-    const fetch = async () => {
-      try {
-        const { data } = await api.get(`/bot/session-queue?guild_id=${selectedGuild}`);
-        setSession(data);
-      } catch {
-        // silent — bot may not be connected
-      }
-    };
-
-    fetch();
-    const id = setInterval(fetch, 3000);
-    return () => clearInterval(id);
-  }, [selectedGuild, isQueueActive]);
-
   // Auto-scroll to playing track when it changes
   useEffect(() => {
     currentRowRef.current?.scrollIntoView({ behavior: "smooth", block: "center" });
@@ -127,7 +96,7 @@ export default function QueueSection({
           }`}
           onClick={() => setQueueActive("Queue")}
         >
-          Queue ({session.tracks.length})
+          Queue ({session.total})
         </button>
         <button
           className={`w-1/2 text-base pb-4 text-center font-light uppercase border-b-2 ${
@@ -194,13 +163,15 @@ export default function QueueSection({
           <>
             {session.tracks.length > 0 ? (
               <div className="space-y-1 overflow-y-auto pr-1 h-full custom-scrollbar pb-40">
-                {session.tracks.map((track, index) => {
+                {session.tracks.map((track, i) => {
+                  // Position in the whole queue, which the controls expect
+                  const index = session.offset + i;
                   const isCurrent = index === session.current_index;
                   const isPlayed = index < session.current_index;
 
                   return (
                     <div
-                      key={index}
+                      key={track.id}
                       ref={isCurrent ? currentRowRef : null}
                       onClick={() => handleTrackClick(index)}
                       className={`relative group flex items-center space-x-3 p-2 rounded-lg transition-all cursor-pointer
@@ -0,0 +1,114 @@
+import { useEffect, useState } from 'react';
+import { api } from '@/lib/api';
+import { QueueOp, QueueTrack, QueueWindow } from '@/types/player';
+
+// Tracks fetched per window, and how many of them come before the current one
+export const QUEUE_WINDOW = 100;
+export const QUEUE_WINDOW_BEHIND = 10;
+
+const EMPTY: QueueWindow = { offset: 0, tracks: [], total: 0, current_index: -1, version: 0 };
+
+/**
+ * Apply queue ops to a window. Returns null when the window can't be kept
+ * in sync (an entry moved from outside it, whose old position is unknown)
+ * and has to be re-read.
+ */
+export function applyQueueOps(queue: QueueWindow, ops: QueueOp[]): QueueWindow | null {
+  let offset = queue.offset;
+  const tracks = [...queue.tracks];
+  for (const op of ops) {
+    const at = tracks.findIndex((t) => t.id === op.id);
+    if (op.op === 'replace') {
+      if (at >= 0 && op.track) tracks[at] = { ...op.track, id: op.id };
+      continue;
+    }
+    let moved: QueueTrack | undefined;
+    if (op.op === 'remove' || op.op === 'move') {
+      if (at >= 0) {
+        moved = tracks.splice(at, 1)[0];
+      } else if (op.op === 'move') {
+        return null;
+      } else if ((op.index ?? 0) < offset) {
+        offset -= 1;
+      }
+    }
+    if (op.op === 'insert' || op.op === 'move') {
+      const i = (op.index ?? 0) - offset;
+      if (i < 0) {
+        offset += 1;
+      } else if (i <= tracks.length) {
+        // A track removed again later still takes its place until its remove op
+        tracks.splice(i, 0, moved ?? { title: '', author: '', uri: '', thumbnail: null, duration: 0, ...op.track, id: op.id });
+      }
+    }
+  }
+  return { ...queue, offset, tracks };
+}
+
+/** Whether the window still shows the current track (or the queue is empty). */
+export function windowHoldsCurrent(queue: QueueWindow): boolean {
+  const { offset, tracks, total, current_index } = queue;
+  if (total === 0 || current_index < 0) return true;
+  return current_index >= offset && current_index < offset + tracks.length;
+}
+
+/**
+ * Poll a guild's session queue: a window around the current track, then
+ * only the ops since the last version seen. The window is re-read when the
+ * backend no longer has those ops, or the current track leaves it.
+ */
+export function useSessionQueue(guildId: string, enabled: boolean, intervalMs = 3000): QueueWindow {
+  const [session, setSession] = useState<QueueWindow>(EMPTY);
+
+  useEffect(() => {
+    if (!guildId || !enabled) return;
+    let known: QueueWindow | null = null;
+    let cancelled = false;
+
+    const fetchQueue = async (params: Record<string, number | string>) => {
+      const { data } = await api.get('/bot/session-queue', {
+        params: { guild_id: guildId, limit: QUEUE_WINDOW, ...params },
+      });
+      return data;
+    };
+    const around = (current: number) => ({ offset: Math.max(current - QUEUE_WINDOW_BEHIND, 0) });
+
+    const poll = async () => {
+      try {
+        let next: QueueWindow | null;
+        if (known === null) {
+          // The first read starts at the current track; re-read to show a few before it
+          next = (await fetchQueue({})) as QueueWindow;
+          if (next.offset > 0) next = await fetchQueue(around(next.current_index));
+        } else {
+          const data = await fetchQueue({ since_version: known.version, ...around(known.current_index) });
+          if (data.reset) {
+            next = data as QueueWindow;
+          } else {
+            next = applyQueueOps(known, data.ops as QueueOp[]);
+            if (next !== null) {
+              next = { ...next, total: data.total, current_index: data.current_index, version: data.version };
+            }
+            if (next === null || !windowHoldsCurrent(next)) {
+              next = await fetchQueue(around(data.current_index));
+            }
+          }
+        }
+        if (cancelled || next === null) return;
+        known = next;
+        setSession(next);
+      } catch {
+        // silent — bot may not be connected
+      }
+    };
+
+    poll();
+    const id = setInterval(poll, intervalMs);
+    return () => {
+      cancelled = true;
+      clearInterval(id);
+    };
+  }, [guildId, enabled, intervalMs]);
+
+  return session;
+}
@@ -25,9 +25,13 @@ import {
 } from "lucide-react";
 import { Player } from "@/types/player";
 import { api } from "@/lib/api";
+import { applyQueueOps, windowHoldsCurrent } from "@/hooks/useSessionQueue";
 import { useNavigate } from "react-router-dom";
 import { useAuthStore } from "@/store/useAuthStore";
 
+// Session queue tracks fetched per player; the cards only show the count
+const PLAYER_QUEUE_WINDOW = 20;
+
 interface BotStatus {
   botOnline: boolean;
   version?: string;
@@ -69,6 +73,10 @@ export default function Dashboard() {
   const [userVoiceGuilds, setUserVoiceGuilds] = useState<Record<string, boolean>>({});
 
   const selectedGuildRef = useRef(selectedGuild);
+  // Players as last merged, and the newest queue version among them: polls
+  // after the first only fetch the queue ops since then
+  const playersRef = useRef<Player[]>([]);
+  const queueVersionRef = useRef<number | null>(null);
 
   useEffect(() => {
     selectedGuildRef.current = selectedGuild;
@@ -126,10 +134,47 @@ export default function Dashboard() {
     }
   };
 
+  // Apply a player's queue ops to its previous window; null if it has to be re-read
+  const mergeQueue = (player: Player, previous: Player[]): Player | null => {
+    if (!player.queueOps) return player;
+    const prev = previous.find((p) => p.guildId === player.guildId);
+    if (!prev?.queue) return null;
+    const queue = applyQueueOps(
+      {
+        offset: prev.queueOffset ?? 0,
+        tracks: prev.queue,
+        total: player.queueTotal,
+        current_index: player.session_current_index,
+        version: player.queueVersion,
+      },
+      player.queueOps
+    );
+    if (queue === null || !windowHoldsCurrent(queue)) return null;
+    return { ...player, queue: queue.tracks, queueOffset: queue.offset, queueOps: undefined };
+  };
+
   const fetchPlayers = async (currentGuildIdFromRef?: string) => {
     try {
-      const response = await api.get("/bot/players");
-      const data: Player[] = response.data;
+      const base = playersRef.current;
+      const sinceVersion = queueVersionRef.current;
+      const response = await api.get("/bot/players", {
+        params: {
+          limit: PLAYER_QUEUE_WINDOW,
+          ...(sinceVersion !== null ? { since_version: sinceVersion } : {}),
+        },
+      });
+      // Another poll already moved on from the state these ops apply to
+      if (playersRef.current !== base) return;
+      const merged = (response.data as Player[]).map((p) => mergeQueue(p, base));
+      if (merged.some((p) => p === null)) {
+        // A new guild, or a window that fell out of step: read the windows afresh
+        queueVersionRef.current = null;
+        if (sinceVersion !== null) return fetchPlayers(currentGuildIdFromRef);
+        return;
+      }
+      const data = merged as Player[];
+      playersRef.current = data;
+      queueVersionRef.current = data.length > 0 ? Math.max(...data.map((p) => p.queueVersion)) : null;
       setPlayers(data);
 
       const guildIdToUse =
@@ -592,7 +637,7 @@ export default function Dashboard() {
                       </div>
                       <div className="flex justify-between">
                         <span>Queue:</span>
-                        <span>{player.queue.length} songs</span>
+                        <span>{player.queueTotal} songs</span>
                       </div>
                       <div className="flex justify-between">
                         <span>Volume:</span>
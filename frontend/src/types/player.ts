@@ -6,11 +6,32 @@ export interface PlayerCurrent {
   thumbnail?: string;
 }
 
-export interface PlayerQueueItem {
+export interface QueueTrack {
+  id: number;
   title: string;
-  author?: string;
-  duration?: number;
-  thumbnail?: string;
+  author: string;
+  uri: string;
+  thumbnail: string | null;
+  duration: number;
+  resolved?: boolean;
+}
+
+// One change to a session queue (see TrackList.ops_since in the backend)
+export interface QueueOp {
+  op: 'insert' | 'remove' | 'move' | 'replace';
+  id: number;
+  version: number;
+  index?: number;
+  track?: Omit<QueueTrack, 'id'> | null;
+}
+
+// A window of a session queue: `tracks` are positions offset..offset+tracks.length-1
+export interface QueueWindow {
+  offset: number;
+  tracks: QueueTrack[];
+  total: number;
+  current_index: number;
+  version: number;
 }
 
 export interface PlayerSettings {
@@ -30,6 +51,13 @@ export interface Player {
   position: number;
   volume: number;
   current?: PlayerCurrent | null;
-  queue: PlayerQueueItem[];
+  // Window of the session queue, or only the ops since the requested version
+  queue?: QueueTrack[];
+  queueOffset?: number;
+  queueReset?: boolean;
+  queueOps?: QueueOp[];
+  queueTotal: number;
+  queueVersion: number;
+  session_current_index: number;
   settings?: PlayerSettings;
 }